@@ -1,16 +1,29 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
 import json
 import time
-import io
+import uuid
+import asyncio
 import base64
 from typing import Dict, Any, List, Optional
 import openai
-import requests
+import aiofiles
+from services.document_intelligence_client import get_document_intelligence_client
+from services.document_service import DocumentService
+from services.image_preprocessor import get_image_preprocessor
+from services.thumbnails import get_thumbnail_renderer
+from services.extraction_cache import get_extraction_cache
+from services.storage_service import StorageService
+from services.storage_backend import get_storage_backend
+from services.signed_urls import get_signed_url_service
+from services.pagination import encode_cursor, decode_cursor, paginate, ndjson_lines, InvalidCursorError
+from services.job_queue import DocumentJobQueue, remove_upload
+from services.job_journal import get_job_journal
+from services.submission_scheduler import get_submission_scheduler
 
 # Load environment variables
 load_dotenv()
@@ -30,6 +43,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Uploads are spooled here until their processing job finishes
+UPLOAD_DIR = os.getenv("DOCUMENT_UPLOAD_DIR", "temp")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_BYTES = int(os.getenv("DOCUMENT_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+BATCH_MAX_FILES = int(os.getenv("DOCUMENT_BATCH_MAX_FILES", "50"))
+
+# Largest page the list endpoints return
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+
+# Time spent constructing services, reported at startup and in /metrics
+STARTUP_BEGAN = time.perf_counter()
+
+# Document processing pipeline (shared analysis client, extraction cache, storage)
+document_service = DocumentService()
+storage_service = StorageService()
+document_jobs = DocumentJobQueue(document_service, storage_service)
+
+# Clients and document metadata (Cosmos DB, or local SQLite with STORAGE_BACKEND=local)
+data_store = get_storage_backend()
+
+# Read-only SAS URLs for document files and thumbnails
+signed_urls = get_signed_url_service()
+
+# Stored clients and documents are read from the storage backend whenever one is
+# configured; DEMO_MODE only swaps in mock records when none is (otherwise it just
+# replaces remote analysis and AI calls)
+def use_mock_data() -> bool:
+    demo_mode = os.getenv("DEMO_MODE", "true").lower() == "true"
+    return demo_mode and not data_store.available
+
+# Error for reads when the selected storage backend cannot be used
+def storage_not_configured() -> HTTPException:
+    return HTTPException(status_code=503,
+                         detail=f"{data_store.title} is not configured (STORAGE_BACKEND={data_store.name})")
+
+STARTUP_REPORT = {
+    "seconds": None,
+    "azure_blob": storage_service.blob_configured,
+    "azure_cosmos": data_store.name == "cosmos" and data_store.available,
+    "storage_backend": data_store.name
+}
+
+# Start background workers
+@app.on_event("startup")
+async def start_document_jobs():
+    await document_jobs.start()
+    get_extraction_cache().schedule_cleanup()
+    # Storage clients and containers are resolved lazily, so startup does not wait on Azure
+    STARTUP_REPORT["seconds"] = round(time.perf_counter() - STARTUP_BEGAN, 3)
+    print(f"Startup took {STARTUP_REPORT['seconds']}s "
+          f"(blob storage {'configured' if STARTUP_REPORT['azure_blob'] else 'not configured'}, "
+          f"Cosmos DB {'configured' if STARTUP_REPORT['azure_cosmos'] else 'not configured'}, "
+          f"{STARTUP_REPORT['storage_backend']} storage backend)")
+
+# Stop workers and release pooled connections on shutdown
+@app.on_event("shutdown")
+async def close_http_clients():
+    await document_jobs.stop()
+    get_job_journal().close()
+    await get_document_intelligence_client().close()
+    await data_store.close()
+    get_image_preprocessor().close()
+    get_thumbnail_renderer().close()
+    signed_urls.close()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -37,6 +116,19 @@ async def health_check():
     mode = "demo" if demo_mode else "azure"
     return {"status": "healthy", "version": "0.1.0", "mode": mode}
 
+# Performance counters endpoint
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "extraction_cache": get_extraction_cache().get_stats(),
+        "document_tiers": document_service.tier_counts,
+        "text_layer_pages": document_service.text_layer_pages,
+        "submission_scheduler": get_submission_scheduler().get_stats(),
+        "read_cache": data_store.get_cache_stats(),
+        "signed_urls": signed_urls.get_stats(),
+        "startup": STARTUP_REPORT
+    }
+
 # Mock clients data
 MOCK_CLIENTS = [
     {"id": "client1", "name": "John Doe", "disability": "Autism", "job_status": "Employed"},
@@ -44,213 +136,153 @@ MOCK_CLIENTS = [
     {"id": "client3", "name": "Bob Johnson", "disability": "Physical disability", "job_status": "In training"}
 ]
 
+# Spool an upload to its own directory under the uploads folder, chunk by chunk
+async def spool_upload(file) -> str:
+    upload_dir = os.path.join(UPLOAD_DIR, str(uuid.uuid4()))
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, os.path.basename(file.filename or "upload"))
+    size = 0
+    async with aiofiles.open(file_path, "wb") as out:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                break
+            await out.write(chunk)
+    
+    if size > UPLOAD_MAX_BYTES:
+        remove_upload(file_path)
+        raise HTTPException(status_code=413, detail=f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit")
+    return file_path
+
+# Reject oversized requests before the multipart body is parsed
+def check_upload_size(request: Request, max_files: int = 1):
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES * max_files + UPLOAD_FORM_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {UPLOAD_MAX_BYTES} byte limit per file")
+
 # Document processing endpoint
 @app.post("/documents/process")
 async def process_document(request: Request):
+    check_upload_size(request)
     form_data = await request.form()
     client_id = form_data.get("client_id")
     document_type = form_data.get("document_type")
+    user_id = form_data.get("user_id", "anonymous")
     file = form_data.get("file")
+    priority = form_data.get("priority", "interactive")
+    wait = str(form_data.get("wait", request.query_params.get("wait", "false"))).lower() == "true"
+    
+    if not file or not client_id or not document_type:
+        raise HTTPException(status_code=400, detail="File, client ID and document type are required")
     
     print(f"Processing document for client {client_id}, type: {document_type}")
     print(f"File info: {file.filename}, content_type: {file.content_type}")
     
-    # Check if we're in demo mode
-    demo_mode = os.getenv("DEMO_MODE", "true").lower() == "true"
-    print(f"Demo mode: {demo_mode}")
+    # Hand the upload to the background pipeline (analyze, extract, save data, save file)
+    file_path = await spool_upload(file)
+    try:
+        job = await document_jobs.submit(file_path, client_id, document_type, file.filename, user_id, priority)
+    except asyncio.QueueFull:
+        remove_upload(file_path)
+        raise HTTPException(status_code=503, detail="Document processing queue is full, please retry shortly")
     
-    if demo_mode:
-        # Mock extraction based on document type
-        extracted_fields = {}
-        if document_type == "i9":
-            extracted_fields = {
-                "employee_name": "John Doe",
-                "address": "123 Main St, Anytown, USA 12345",
-                "ssn": "XXX-XX-1234",
-                "citizenship_status": "U.S. Citizen"
-            }
-        elif document_type == "schedule_a":
-            extracted_fields = {
-                "applicant_name": "Jane Smith",
-                "disability_type": "Hearing impairment",
-                "job_title": "Administrative Assistant",
-                "reasonable_accommodation": "Sign language interpreter for meetings"
-            }
-        elif document_type == "job_application":
-            extracted_fields = {
-                "applicant_name": "Bob Johnson",
-                "position": "Cashier",
-                "phone_number": "(555) 123-4567",
-                "email": "bob.johnson@example.com"
-            }
-    else:
-        # Use Azure Document Intelligence
-        try:
-            # Get Azure Document Intelligence credentials
-            endpoint = os.getenv("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT")
-            key = os.getenv("AZURE_DOCUMENT_INTELLIGENCE_KEY")
-            
-            print(f"Using Azure Document Intelligence at endpoint: {endpoint}")
-            
-            if not endpoint or not key:
-                raise HTTPException(status_code=500, detail="Azure Document Intelligence credentials not found")
-            
-            # Prepare the file for upload
-            file_content = await file.read()
-            file_bytes = io.BytesIO(file_content)
-            print(f"File size: {len(file_content)} bytes")
-            
-            # Choose the right model based on document type
-            model_id = "prebuilt-document" # Default model
-            if document_type == "i9":
-                model_id = "prebuilt-layout" # For form extraction
-            elif document_type == "schedule_a":
-                model_id = "prebuilt-document" # For document extraction
-            elif document_type == "job_application":
-                model_id = "prebuilt-layout" # For form extraction
-            
-            print(f"Using model: {model_id}")
-            
-            # Set up API endpoint
-            url = f"{endpoint}formrecognizer/documentModels/{model_id}:analyze?api-version=2023-07-31"
-            
-            # Call Azure Document Intelligence API
-            headers = {
-                "Content-Type": "application/octet-stream",
-                "Ocp-Apim-Subscription-Key": key
-            }
-            
-            # Make the request
-            print("Sending request to Azure Document Intelligence...")
-            response = requests.post(url, headers=headers, data=file_bytes)
-            
-            print(f"Response status: {response.status_code}")
-            print(f"Response headers: {response.headers}")
-            if response.status_code != 202:
-                print(f"Error response: {response.text}")
-                raise Exception(f"Failed to analyze document: {response.text}")
-            
-            # Get the operation location to check status
-            operation_location = response.headers["Operation-Location"]
-            print(f"Operation location: {operation_location}")
-            
-            # Poll for results (with timeout)
-            max_retries = 50
-            for i in range(max_retries):
-                # Check status
-                status_response = requests.get(
-                    operation_location, 
-                    headers={"Ocp-Apim-Subscription-Key": key}
-                )
-                
-                result = status_response.json()
-                print(f"Status check {i+1}: {result.get('status')}")
-                
-                if "status" in result:
-                    if result["status"] == "succeeded":
-                        break
-                    if result["status"] == "failed":
-                        print(f"Processing failed: {result}")
-                        raise Exception(f"Document analysis failed: {result}")
-                
-                # Wait before polling again
-                time.sleep(1)
-                
-                if i == max_retries - 1:
-                    raise Exception("Document analysis timed out")
-            
-            # Extract fields based on document type
-            extracted_fields = {}
-            
-            # Basic extraction from analysis results
-            if "analyzeResult" in result:
-                extracted_content = result["analyzeResult"]
-                print(f"Extracted content: {json.dumps(extracted_content, indent=2)}")
-                
-                # Simplified extraction - in a real app, you'd parse specific fields
-                if document_type == "i9":
-                    # Get form fields
-                    extracted_fields = {
-                        "document_type": "I-9 Form",
-                        "extracted_text": "Document processed with Azure Document Intelligence",
-                        "fields_detected": len(extracted_content.get("documents", [{}])[0].get("fields", {})) if "documents" in extracted_content and extracted_content["documents"] else 0
-                    }
-                    
-                    # Add all detected key-value pairs
-                    if "keyValuePairs" in extracted_content:
-                        for pair in extracted_content["keyValuePairs"]:
-                            if pair.get("key") and pair.get("value"):
-                                key = pair["key"].get("content", "").strip().lower().replace(" ", "_")
-                                value = pair["value"].get("content", "").strip()
-                                if key and value:
-                                    extracted_fields[key] = value
-                    
-                    print(f"Final extracted fields: {json.dumps(extracted_fields, indent=2)}")
-                    
-                elif document_type == "schedule_a":
-                    extracted_fields = {
-                        "document_type": "Schedule A Letter",
-                        "extracted_text": "Document processed with Azure Document Intelligence",
-                        "fields_detected": len(extracted_content.get("documents", [{}])[0].get("fields", {})) if "documents" in extracted_content and extracted_content["documents"] else 0
-                    }
-                elif document_type == "job_application":
-                    extracted_fields = {
-                        "document_type": "Job Application",
-                        "extracted_text": "Document processed with Azure Document Intelligence",
-                        "fields_detected": len(extracted_content.get("documents", [{}])[0].get("fields", {})) if "documents" in extracted_content and extracted_content["documents"] else 0
-                    }
-                else:
-                    extracted_fields = {
-                        "document_type": document_type,
-                        "extracted_text": "Document processed with Azure Document Intelligence",
-                        "fields_detected": len(extracted_content.get("documents", [{}])[0].get("fields", {})) if "documents" in extracted_content and extracted_content["documents"] else 0
-                    }
-            
-        except Exception as e:
-            print(f"Error processing document: {str(e)}")
-            # If Azure Document Intelligence fails, fallback to demo extraction
-            print(f"Error using Azure Document Intelligence: {str(e)}")
-            
-            # Fallback to mock data when real processing fails
-            extracted_fields = {
-                "error": f"Failed to process document with Azure: {str(e)}",
-                "fallback": "Using mock data instead"
-            }
-            
-            # Add mock data based on document type
-            if document_type == "i9":
-                extracted_fields["extracted_data"] = {
-                    "employee_name": "John Doe (Mock)",
-                    "address": "123 Main St, Anytown, USA 12345",
-                }
-            elif document_type == "schedule_a":
-                extracted_fields["extracted_data"] = {
-                    "applicant_name": "Jane Smith (Mock)",
-                    "disability_type": "Hearing impairment",
-                }
-            elif document_type == "job_application":
-                extracted_fields["extracted_data"] = {
-                    "applicant_name": "Bob Johnson (Mock)",
-                    "position": "Cashier",
-                }
+    if wait:
+        # Synchronous mode: hold the request until the job finishes
+        job = await document_jobs.wait(job["job_id"])
+        if job["status"] != "succeeded":
+            raise HTTPException(status_code=500, detail=f"Document processing failed: {job['error']}")
+        return {"job_id": job["job_id"], **job["result"]}
+    
+    return JSONResponse(status_code=202, content={
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/documents/jobs/{job['job_id']}"
+    })
+
+# Batch document processing endpoint
+@app.post("/documents/process/batch")
+async def process_document_batch(request: Request):
+    check_upload_size(request, BATCH_MAX_FILES)
+    form_data = await request.form()
+    client_id = form_data.get("client_id")
+    user_id = form_data.get("user_id", "anonymous")
+    files = form_data.getlist("file")
+    document_types = form_data.getlist("document_type")
+    priority = form_data.get("priority", "bulk")
+    concurrency = form_data.get("concurrency")
+    concurrency = int(concurrency) if concurrency and str(concurrency).isdigit() else None
     
-    # Generate a document ID (in production, you would save this to Azure Storage/Cosmos DB)
-    document_id = f"doc-{int(time.time())}"
+    if not files or not client_id or not document_types:
+        raise HTTPException(status_code=400, detail="Files, client ID and document types are required")
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {BATCH_MAX_FILES} files")
     
-    return {
-        "document_id": document_id,
-        "document_type": document_type,
-        "extracted_fields": extracted_fields
-    }
+    # One document_type per file, or a single type for every file
+    if len(document_types) == 1:
+        document_types = document_types * len(files)
+    elif len(document_types) != len(files):
+        raise HTTPException(status_code=400, detail="Provide one document_type per file or a single document_type")
+    
+    print(f"Processing batch of {len(files)} documents for client {client_id}")
+    
+    uploads = []
+    try:
+        for file, document_type in zip(files, document_types):
+            uploads.append({
+                "file_path": await spool_upload(file),
+                "client_id": client_id,
+                "document_type": document_type,
+                "original_file_name": file.filename,
+                "user_id": user_id,
+                "priority": priority
+            })
+    except HTTPException:
+        for upload in uploads:
+            remove_upload(upload["file_path"])
+        raise
+    
+    async def stream_results():
+        # One JSON line per file, in completion order
+        async for job in document_jobs.run_batch(uploads, concurrency):
+            yield json.dumps(job) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+# Document job status endpoint
+@app.get("/documents/jobs/{job_id}")
+async def get_document_job(job_id: str):
+    job = await document_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Decode a list cursor, rejecting malformed ones
+def parse_cursor(cursor: Optional[str]) -> Optional[str]:
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Page through a mock list the way Cosmos DB pages queries
+def paginate_mock(items: List[Dict[str, Any]], limit: Optional[int], continuation: Optional[str]):
+    try:
+        return paginate(items, limit, continuation)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 # Get client documents
 @app.get("/documents/{client_id}")
-async def get_client_documents(client_id: str):
-    # Check if we're in demo mode
-    demo_mode = os.getenv("DEMO_MODE", "true").lower() == "true"
+async def get_client_documents(client_id: str, limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_LIMIT),
+                               cursor: Optional[str] = None, document_type: Optional[str] = None,
+                               output: str = Query("json", alias="format", pattern="^(json|ndjson)$")):
+    continuation = parse_cursor(cursor)
+    paged = limit is not None or cursor is not None
     
-    if demo_mode:
-        # Return mock documents
+    # Mock documents, unless a storage backend is configured
+    if use_mock_data():
         mock_documents = [
             {
                 "id": "doc1",
@@ -258,6 +290,7 @@ async def get_client_documents(client_id: str):
                 "document_type": "i9",
                 "original_file_name": "i9_form.pdf",
                 "processed_at": "2023-08-15T14:30:00Z",
+                "thumbnail_url": f"mock-url/{client_id}/doc1/_thumbnail.jpg",
                 "data": {"employee_name": "John Doe", "ssn": "XXX-XX-1234"}
             },
             {
@@ -266,71 +299,64 @@ async def get_client_documents(client_id: str):
                 "document_type": "schedule_a",
                 "original_file_name": "schedule_a.pdf",
                 "processed_at": "2023-08-10T09:15:00Z",
+                "thumbnail_url": f"mock-url/{client_id}/doc2/_thumbnail.jpg",
                 "data": {"applicant_name": "John Doe", "disability_type": "Autism"}
             }
         ]
+        if document_type:
+            mock_documents = [doc for doc in mock_documents if doc["document_type"] == document_type]
+        if output == "ndjson":
+            documents, _ = paginate_mock(mock_documents, None, continuation)
+            return StreamingResponse(ndjson_lines(documents), media_type="application/x-ndjson")
+        if paged:
+            documents, next_token = paginate_mock(mock_documents, limit, continuation)
+            return {"client_id": client_id, "documents": documents, "next_cursor": encode_cursor(next_token)}
         return {"client_id": client_id, "documents": mock_documents}
     else:
-        # Use Azure Cosmos DB to retrieve document metadata
+        # Use the storage backend to retrieve document metadata
         try:
-            # Get Azure Cosmos DB credentials
-            cosmos_endpoint = os.getenv("AZURE_COSMOS_ENDPOINT")
-            cosmos_key = os.getenv("AZURE_COSMOS_KEY")
-            cosmos_database = os.getenv("AZURE_COSMOS_DATABASE_NAME")
-            
-            if not cosmos_endpoint or not cosmos_key or not cosmos_database:
-                raise HTTPException(status_code=500, detail="Azure Cosmos DB credentials not found")
+            if not data_store.available:
+                raise storage_not_configured()
+            
+            # File and thumbnail URLs are signed a page at a time, reusing recently signed URLs
+            if output == "ndjson":
+                # Stream the documents as each page of the query arrives
+                async def stream_documents():
+                    async for doc in data_store.iter_client_documents(client_id, continuation, document_type):
+                        yield (await signed_urls.sign_documents([doc]))[0]
+                
+                return StreamingResponse(ndjson_lines(stream_documents()), media_type="application/x-ndjson")
             
-            # Create a simple HTTP request to query documents
-            # In a real application, you would use the Azure Cosmos DB SDK
-            url = f"{cosmos_endpoint}dbs/{cosmos_database}/colls/documents/docs"
-            headers = {
-                "Authorization": f"type=master&ver=1.0&sig={cosmos_key}",
-                "Content-Type": "application/query+json",
-                "x-ms-version": "2018-12-31",
-                "x-ms-documentdb-isquery": "true",
-                "x-ms-documentdb-query-enablecrosspartition": "true"
-            }
+            if paged:
+                documents, next_token = await data_store.get_client_documents_page(
+                    client_id, limit, continuation, document_type
+                )
+                return {
+                    "client_id": client_id,
+                    "documents": await signed_urls.sign_documents(documents),
+                    "next_cursor": encode_cursor(next_token),
+                    "source": data_store.source
+                }
             
             # Query for documents belonging to this client
-            query = {
-                "query": "SELECT * FROM documents d WHERE d.client_id = @client_id",
-                "parameters": [
-                    {"name": "@client_id", "value": client_id}
-                ]
-            }
-            
-            # Make the request to Cosmos DB
-            response = requests.post(url, headers=headers, json=query)
-            
-            if response.status_code != 200:
-                print(f"Cosmos DB query failed: {response.text}")
-                raise Exception(f"Failed to query documents: {response.text}")
-            
-            documents = response.json().get("Documents", [])
+            documents = await data_store.get_client_documents(client_id)
+            if document_type:
+                documents = [doc for doc in documents if doc.get("document_type") == document_type]
             
             # If no documents found, return empty list
             if not documents:
-                print("No documents found for client in Cosmos DB")
-                return {"client_id": client_id, "documents": [], "source": "azure"}
-                
-            # For each document, get the file URLs from Azure Storage
-            storage_connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-            container_name = os.getenv("AZURE_STORAGE_CONTAINER_NAME")
+                print("No documents found for client in storage")
+                return {"client_id": client_id, "documents": [], "source": data_store.source}
             
-            if not storage_connection_string or not container_name:
-                # Return just the metadata without file URLs
-                return {"client_id": client_id, "documents": documents, "source": "azure"}
-            
-            # In a real app, you would generate SAS URLs for each file using Azure Storage SDK
-            for doc in documents:
-                doc["file_url"] = f"azure-storage://{container_name}/{doc.get('id')}.pdf"
-            
-            return {"client_id": client_id, "documents": documents, "source": "azure"}
+            return {"client_id": client_id, "documents": await signed_urls.sign_documents(documents), "source": data_store.source}
             
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        except HTTPException:
+            raise
         except Exception as e:
-            # If Azure services fail, fallback to mock data
-            print(f"Error using Azure services: {str(e)}")
+            # If the storage backend fails, fallback to mock data
+            print(f"Error reading documents from {data_store.title}: {str(e)}")
             
             # Fallback to mock data
             mock_documents = [
@@ -341,7 +367,7 @@ async def get_client_documents(client_id: str):
                     "original_file_name": "i9_form.pdf",
                     "processed_at": "2023-08-15T14:30:00Z",
                     "data": {"employee_name": "John Doe (Fallback)", "ssn": "XXX-XX-1234"},
-                    "error": f"Azure error: {str(e)}"
+                    "error": f"{data_store.title} error: {str(e)}"
                 },
                 {
                     "id": "doc2-fallback",
@@ -350,11 +376,33 @@ async def get_client_documents(client_id: str):
                     "original_file_name": "schedule_a.pdf",
                     "processed_at": "2023-08-10T09:15:00Z",
                     "data": {"applicant_name": "John Doe (Fallback)", "disability_type": "Autism"},
-                    "error": f"Azure error: {str(e)}"
+                    "error": f"{data_store.title} error: {str(e)}"
                 }
             ]
             return {"client_id": client_id, "documents": mock_documents, "source": "fallback"}
 
+# Get a single document of a client
+@app.get("/documents/{client_id}/{document_id}")
+async def get_client_document(client_id: str, document_id: str):
+    # Mock document, unless a storage backend is configured
+    if use_mock_data():
+        return {"document": await storage_service.get_document(client_id, document_id)}
+
+    if not data_store.available:
+        raise storage_not_configured()
+
+    try:
+        # Point read: the document's id within its client's partition
+        document = await data_store.get_document(client_id, document_id)
+    except Exception as e:
+        print(f"Error reading document details from {data_store.title}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to read document: {str(e)}")
+
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    document = (await signed_urls.sign_documents([document]))[0]
+    return {"document": document, "source": data_store.source}
+
 # AI Assistant query endpoint
 @app.post("/assistant/query")
 async def assistant_query(request: Request):
@@ -455,6 +503,19 @@ async def assistant_query(request: Request):
     
     return {"response": response}
 
+# Client a report is about: from the storage backend, or else the mock clients
+async def find_report_client(client_id: str) -> Optional[Dict[str, Any]]:
+    if not data_store.available:
+        print(f"{data_store.title} is not configured, using mock client data")
+        return next((c for c in MOCK_CLIENTS if c["id"] == client_id), None)
+    try:
+        client = await data_store.get_client(client_id)
+    except Exception as e:
+        print(f"Error querying client from {data_store.title}: {str(e)}")
+        client = None
+    # If client not found in storage, use mock client
+    return client or next((c for c in MOCK_CLIENTS if c["id"] == client_id), None)
+
 # Report generation endpoint
 @app.post("/reports/generate")
 async def generate_report(request: Request):
@@ -472,7 +533,7 @@ async def generate_report(request: Request):
         # Generate mock report based on type
         report = {
             "title": f"{report_type.capitalize()} Report",
-            "client": next((c for c in MOCK_CLIENTS if c["id"] == client_id), None),
+            "client": await find_report_client(client_id),
             "date": "2023-08-20",
             "content": f"This is a mock {report_type} report for demonstration purposes.",
             "sections": [
@@ -484,52 +545,7 @@ async def generate_report(request: Request):
         }
     else:
         try:
-            # Get client data from Azure Cosmos DB
-            cosmos_endpoint = os.getenv("AZURE_COSMOS_ENDPOINT")
-            cosmos_key = os.getenv("AZURE_COSMOS_KEY")
-            cosmos_database = os.getenv("AZURE_COSMOS_DATABASE_NAME")
-            
-            # If Cosmos DB credentials not available, use mock client
-            client = None
-            if not cosmos_endpoint or not cosmos_key or not cosmos_database:
-                print("Cosmos DB credentials not available, using mock client data")
-                client = next((c for c in MOCK_CLIENTS if c["id"] == client_id), None)
-            else:
-                # Try to get client from Cosmos DB
-                try:
-                    # Create a simple HTTP request to query specific client
-                    url = f"{cosmos_endpoint}dbs/{cosmos_database}/colls/clients/docs"
-                    headers = {
-                        "Authorization": f"type=master&ver=1.0&sig={cosmos_key}",
-                        "Content-Type": "application/query+json",
-                        "x-ms-version": "2018-12-31",
-                        "x-ms-documentdb-isquery": "true",
-                        "x-ms-documentdb-query-enablecrosspartition": "true"
-                    }
-                    
-                    # Query for specific client
-                    query = {
-                        "query": "SELECT * FROM clients c WHERE c.id = @client_id",
-                        "parameters": [
-                            {"name": "@client_id", "value": client_id}
-                        ]
-                    }
-                    
-                    response = requests.post(url, headers=headers, json=query)
-                    
-                    if response.status_code == 200:
-                        clients = response.json().get("Documents", [])
-                        if clients and len(clients) > 0:
-                            client = clients[0]
-                    
-                    # If client not found in Cosmos DB, use mock client
-                    if not client:
-                        client = next((c for c in MOCK_CLIENTS if c["id"] == client_id), None)
-                        
-                except Exception as e:
-                    print(f"Error querying client from Cosmos DB: {str(e)}")
-                    client = next((c for c in MOCK_CLIENTS if c["id"] == client_id), None)
-            
+            client = await find_report_client(client_id)
             if not client:
                 raise HTTPException(status_code=404, detail="Client not found")
             
@@ -631,6 +647,8 @@ async def generate_report(request: Request):
                         "source": "fallback"
                     }
                 
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Error in report generation: {str(e)}")
             # Complete fallback
@@ -649,125 +667,87 @@ async def generate_report(request: Request):
 
 # Get clients endpoint
 @app.get("/clients")
-async def get_clients():
-    # Check if we're in demo mode
-    demo_mode = os.getenv("DEMO_MODE", "true").lower() == "true"
+async def get_clients(limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_LIMIT), cursor: Optional[str] = None,
+                      output: str = Query("json", alias="format", pattern="^(json|ndjson)$")):
+    continuation = parse_cursor(cursor)
     
-    if demo_mode:
-        # Return mock clients
+    # Mock clients, unless a storage backend is configured
+    if use_mock_data():
+        if output == "ndjson":
+            clients, _ = paginate_mock(MOCK_CLIENTS, None, continuation)
+            return StreamingResponse(ndjson_lines(clients), media_type="application/x-ndjson")
+        if limit is not None or cursor is not None:
+            clients, next_token = paginate_mock(MOCK_CLIENTS, limit, continuation)
+            return {"clients": clients, "next_cursor": encode_cursor(next_token)}
         return {"clients": MOCK_CLIENTS}
     else:
-        # Use Azure Cosmos DB to retrieve clients
+        # Use the storage backend to retrieve clients
         try:
-            # Get Azure Cosmos DB credentials
-            cosmos_endpoint = os.getenv("AZURE_COSMOS_ENDPOINT")
-            cosmos_key = os.getenv("AZURE_COSMOS_KEY")
-            cosmos_database = os.getenv("AZURE_COSMOS_DATABASE_NAME")
+            if not data_store.available:
+                raise storage_not_configured()
             
-            if not cosmos_endpoint or not cosmos_key or not cosmos_database:
-                raise HTTPException(status_code=500, detail="Azure Cosmos DB credentials not found")
+            if output == "ndjson":
+                # Stream the clients as each page of the query arrives
+                return StreamingResponse(
+                    ndjson_lines(data_store.iter_clients(continuation)), media_type="application/x-ndjson"
+                )
             
-            # Create a simple HTTP request to query clients
-            # In a real application, you would use the Azure Cosmos DB SDK
-            url = f"{cosmos_endpoint}dbs/{cosmos_database}/colls/clients/docs"
-            headers = {
-                "Authorization": f"type=master&ver=1.0&sig={cosmos_key}",
-                "Content-Type": "application/query+json",
-                "x-ms-version": "2018-12-31",
-                "x-ms-documentdb-isquery": "true",
-                "x-ms-documentdb-query-enablecrosspartition": "true"
-            }
+            if limit is not None or cursor is not None:
+                clients, next_token = await data_store.list_clients_page(limit, continuation)
+                return {"clients": clients, "next_cursor": encode_cursor(next_token), "source": data_store.source}
             
             # Query for all clients
-            query = {
-                "query": "SELECT * FROM clients c"
-            }
-            
-            # Make the request to Cosmos DB
-            response = requests.post(url, headers=headers, json=query)
-            
-            if response.status_code != 200:
-                print(f"Cosmos DB query failed: {response.text}")
-                raise Exception(f"Failed to query clients: {response.text}")
-            
-            clients = response.json().get("Documents", [])
+            clients = await data_store.list_clients()
             
             # If no clients found, return empty list
             if not clients:
-                print("No clients found in Cosmos DB")
-                return {"clients": [], "source": "azure"}
+                print("No clients found in storage")
+                return {"clients": [], "source": data_store.source}
                 
-            return {"clients": clients, "source": "azure"}
+            return {"clients": clients, "source": data_store.source}
             
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        except HTTPException:
+            raise
         except Exception as e:
-            # If Azure services fail, fallback to mock data
-            print(f"Error using Azure services for clients: {str(e)}")
+            # If the storage backend fails, fallback to mock data
+            print(f"Error reading clients from {data_store.title}: {str(e)}")
             return {"clients": MOCK_CLIENTS, "source": "fallback", "error": str(e)}
 
 # Get client details endpoint
 @app.get("/clients/{client_id}")
 async def get_client(client_id: str):
-    # Check if we're in demo mode
-    demo_mode = os.getenv("DEMO_MODE", "true").lower() == "true"
-    
-    if demo_mode:
-        # Return mock client
+    # Mock client, unless a storage backend is configured
+    if use_mock_data():
         client = next((c for c in MOCK_CLIENTS if c["id"] == client_id), None)
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
         return {"client": client}
     else:
-        # Use Azure Cosmos DB to retrieve client
+        # Use the storage backend to retrieve client
         try:
-            # Get Azure Cosmos DB credentials
-            cosmos_endpoint = os.getenv("AZURE_COSMOS_ENDPOINT")
-            cosmos_key = os.getenv("AZURE_COSMOS_KEY")
-            cosmos_database = os.getenv("AZURE_COSMOS_DATABASE_NAME")
-            
-            if not cosmos_endpoint or not cosmos_key or not cosmos_database:
-                raise HTTPException(status_code=500, detail="Azure Cosmos DB credentials not found")
-            
-            # Create a simple HTTP request to query specific client
-            # In a real application, you would use the Azure Cosmos DB SDK
-            url = f"{cosmos_endpoint}dbs/{cosmos_database}/colls/clients/docs"
-            headers = {
-                "Authorization": f"type=master&ver=1.0&sig={cosmos_key}",
-                "Content-Type": "application/query+json",
-                "x-ms-version": "2018-12-31",
-                "x-ms-documentdb-isquery": "true",
-                "x-ms-documentdb-query-enablecrosspartition": "true"
-            }
+            if not data_store.available:
+                raise storage_not_configured()
             
             # Query for specific client
-            query = {
-                "query": "SELECT * FROM clients c WHERE c.id = @client_id",
-                "parameters": [
-                    {"name": "@client_id", "value": client_id}
-                ]
-            }
-            
-            # Make the request to Cosmos DB
-            response = requests.post(url, headers=headers, json=query)
-            
-            if response.status_code != 200:
-                print(f"Cosmos DB query failed: {response.text}")
-                raise Exception(f"Failed to query client: {response.text}")
-            
-            clients = response.json().get("Documents", [])
+            client = await data_store.get_client(client_id)
             
             # If client not found
-            if not clients or len(clients) == 0:
+            if not client:
                 # Try fallback
                 client = next((c for c in MOCK_CLIENTS if c["id"] == client_id), None)
                 if not client:
                     raise HTTPException(status_code=404, detail="Client not found")
                 return {"client": client, "source": "fallback"}
                 
-            return {"client": clients[0], "source": "azure"}
+            return {"client": client, "source": data_store.source}
             
+        except HTTPException:
+            raise
         except Exception as e:
-            # If Azure services fail, fallback to mock data
-            print(f"Error using Azure services for client details: {str(e)}")
+            # If the storage backend fails, fallback to mock data
+            print(f"Error reading client details from {data_store.title}: {str(e)}")
             
             # Try to find client in mock data
             client = next((c for c in MOCK_CLIENTS if c["id"] == client_id), None)
@@ -0,0 +1,144 @@
+import os
+import re
+import logging
+from dotenv import load_dotenv
+from typing import Dict, Any, Optional, Tuple
+
+# Conditionally import the local PDF library
+try:
+    import pypdf  # noqa: F401
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+    logging.warning("pypdf not available. AcroForm field extraction will be disabled.")
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Array indices in fully qualified field names, e.g. "form1[0].LastName[0]"
+FIELD_INDEX = re.compile(r"\[\d+\]")
+
+
+def normalize_field_name(name: str) -> str:
+    """Reduce an AcroForm field name to lowercase letters and digits
+
+    Only the field's own name (its /T entry) is passed in, never the fully
+    qualified name, so dots in labels are kept as part of the label:
+    "Last Name (Family Name)[0]" -> "lastnamefamilyname", "Apt. Number" -> "aptnumber"
+    """
+    return "".join(ch for ch in FIELD_INDEX.sub("", name).lower() if ch.isalnum())
+
+
+def field_value(value: Any) -> str:
+    """Text of a field value; unchecked boxes and empty fields give ''"""
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(filter(None, (field_value(item) for item in value)))
+    text = str(value).strip()
+    if text.startswith("/"):
+        # Checkbox and radio states are PDF names, e.g. /Off, /1, /Yes
+        text = "" if text == "/Off" else text[1:]
+    return text
+
+
+def map_acroform_fields(values: Dict[str, str],
+                        field_map: Dict[str, Tuple[str, ...]]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Map filled AcroForm fields onto schema field names
+
+    Args:
+        values: Filled AcroForm fields, by field name
+        field_map: Schema field -> AcroForm field names it may appear under
+
+    Returns:
+        (mapped schema fields, remaining unmapped AcroForm fields)
+    """
+    by_normalized = {normalize_field_name(name): name for name in values}
+    mapped: Dict[str, str] = {}
+    used = set()
+    for field, candidates in field_map.items():
+        for candidate in candidates:
+            name = by_normalized.get(normalize_field_name(candidate))
+            if name is not None and name not in used:
+                mapped[field] = values[name]
+                used.add(name)
+                break
+    unmapped = {name: value for name, value in values.items() if name not in used}
+    return mapped, unmapped
+
+
+class AcroFormExtractor:
+    """Reads the filled fields of fillable PDF forms locally
+
+    Fillable forms such as the USCIS I-9 carry their values as AcroForm
+    fields, so they can be read directly instead of OCR-ing the rendered page.
+    The PDF is opened by PdfContent, once per upload.
+    """
+
+    def __init__(self):
+        """Initialize the extractor from environment settings"""
+        self.enabled = PYPDF_AVAILABLE and os.getenv("ACROFORM_ENABLED", "true").lower() == "true"
+
+    def read_fields(self, reader) -> Optional[Dict[str, str]]:
+        """
+        Read the filled fields of an open PDF
+
+        Args:
+            reader: pypdf reader of the document
+
+        Returns:
+            Filled field values by field name (e.g. "Apt. Number" rather than
+            "topmostSubform[0].Page1[0].Apt. Number[0]"), or None if the PDF
+            has no filled fields
+        """
+        try:
+            fields = reader.get_fields()
+        except Exception as e:
+            logger.warning(f"Could not read form fields: {str(e)}")
+            return None
+
+        if not fields:
+            return None
+
+        values = {}
+        for qualified_name, field in fields.items():
+            value = field_value(field.get("/V"))
+            if not value:
+                continue
+            # Key by the field's own name, without its parents' names; a name
+            # already taken by another field keeps its fully qualified form
+            name = FIELD_INDEX.sub("", str(field.get("/T") or qualified_name))
+            if name in values:
+                name = FIELD_INDEX.sub("", qualified_name)
+            values[name] = value
+        return values or None
+
+    @staticmethod
+    def read_page_fields(page) -> Dict[str, str]:
+        """
+        Read the filled fields whose widgets are on one page of an open PDF
+
+        Args:
+            page: pypdf page
+
+        Returns:
+            Filled field values by field name
+        """
+        values = {}
+        for annotation in page.get("/Annots") or []:
+            widget = annotation.get_object()
+            if widget.get("/Subtype") != "/Widget":
+                continue
+            # A widget is either the field itself or a kid of the field
+            field = widget
+            while "/T" not in field and "/Parent" in field:
+                field = field["/Parent"].get_object()
+            value = field_value(field.get("/V"))
+            if "/T" in field and value:
+                values[FIELD_INDEX.sub("", str(field["/T"]))] = value
+        return values
+
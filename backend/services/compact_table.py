@@ -0,0 +1,88 @@
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+
+class CompactTable:
+    """A table as its dimensions plus a flat row-major array of cell strings
+
+    Cell (row, column) lives at cells[row * column_count + column]; empty and
+    covered cells are "". Only cells that span more than one row or column
+    carry span metadata, so a table costs one list of strings instead of one
+    dict per cell.
+    """
+
+    __slots__ = ("row_count", "column_count", "cells", "spans")
+
+    def __init__(self, row_count: int, column_count: int, cells: Optional[List[str]] = None,
+                 spans: Optional[Dict[int, Tuple[int, int]]] = None):
+        self.row_count = row_count
+        self.column_count = column_count
+        self.cells = cells if cells is not None else [""] * (row_count * column_count)
+        # Flat cell index -> (row_span, column_span), for spanning cells only
+        self.spans = spans or {}
+
+    @classmethod
+    def from_analyze_table(cls, table: Dict[str, Any]) -> "CompactTable":
+        """
+        Build a table from an analyzeResult table
+
+        Args:
+            table: Table object with rowCount, columnCount and cells
+
+        Returns:
+            The compact table
+        """
+        cells = table.get("cells", [])
+        row_count = table.get("rowCount") or max((cell.get("rowIndex", 0) + 1 for cell in cells), default=0)
+        column_count = table.get("columnCount") or max((cell.get("columnIndex", 0) + 1 for cell in cells), default=0)
+
+        compact = cls(row_count, column_count)
+        for cell in cells:
+            row, column = cell.get("rowIndex", 0), cell.get("columnIndex", 0)
+            if row >= row_count or column >= column_count:
+                continue
+            index = row * column_count + column
+            compact.cells[index] = cell.get("content", "")
+            row_span, column_span = cell.get("rowSpan", 1), cell.get("columnSpan", 1)
+            if row_span > 1 or column_span > 1:
+                compact.spans[index] = (row_span, column_span)
+        return compact
+
+    def cell(self, row: int, column: int) -> str:
+        """Content of a cell"""
+        return self.cells[row * self.column_count + column]
+
+    def rows(self) -> Iterator[List[str]]:
+        """Iterate over the rows as lists of cell strings"""
+        for start in range(0, len(self.cells), self.column_count or 1):
+            yield self.cells[start:start + self.column_count]
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Columnar JSON form: one array of cell strings per column
+
+        Spans, when present, are [row, column, row_span, column_span] lists.
+        """
+        data: Dict[str, Any] = {
+            "row_count": self.row_count,
+            "column_count": self.column_count,
+            "columns": [self.cells[column::self.column_count] for column in range(self.column_count)]
+        }
+        if self.spans:
+            data["spans"] = [
+                [index // self.column_count, index % self.column_count, row_span, column_span]
+                for index, (row_span, column_span) in sorted(self.spans.items())
+            ]
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "CompactTable":
+        """Rebuild a table from its columnar JSON form"""
+        row_count, column_count = data["row_count"], data["column_count"]
+        cells = [""] * (row_count * column_count)
+        for column, values in enumerate(data.get("columns", [])):
+            cells[column::column_count] = values
+        spans = {
+            row * column_count + column: (row_span, column_span)
+            for row, column, row_span, column_span in data.get("spans", [])
+        }
+        return cls(row_count, column_count, cells, spans)
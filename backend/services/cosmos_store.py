@@ -0,0 +1,318 @@
+import os
+import asyncio
+import logging
+from dotenv import load_dotenv
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+# Conditionally import the async Cosmos DB SDK
+try:
+    from azure.cosmos.aio import CosmosClient
+    from azure.cosmos import PartitionKey
+    from azure.cosmos.exceptions import CosmosResourceNotFoundError
+    COSMOS_AIO_AVAILABLE = True
+except ImportError:
+    COSMOS_AIO_AVAILABLE = False
+    logging.warning("Azure Cosmos DB async SDK not available. Client and document metadata will be mocked.")
+
+from services.read_cache import ReadThroughCache
+from services.storage_backend import StorageBackend
+from services.provisioning import get_provisioned_marker
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class CosmosStore(StorageBackend):
+    """Shared async data access for clients and document metadata in Cosmos DB
+
+    One instance is shared per process. Its async SDK client keeps a single
+    pooled HTTP session, so concurrent requests reuse connections and never
+    block the event loop. All queries are parameterized.
+
+    Documents are partitioned by client_id and clients by id, so single items
+    are fetched with point reads and list queries stay within one partition.
+    Lists can be read a page at a time, resuming from a continuation token,
+    or streamed item by item as pages arrive.
+
+    Client profiles and whole document lists are served through read-through
+    caches; saving document metadata invalidates the client's list. Pages and
+    streams always go to Cosmos DB.
+    """
+
+    name = "cosmos"
+    title = "Azure Cosmos DB"
+    source = "azure"
+
+    def __init__(self):
+        """Initialize the store with Azure credentials (the SDK client is created on first use)"""
+        self.endpoint = os.getenv("AZURE_COSMOS_ENDPOINT")
+        self.key = os.getenv("AZURE_COSMOS_KEY")
+        self.database_name = os.getenv("AZURE_COSMOS_DATABASE_NAME", "job-coach-assistant")
+        self.documents_container_name = os.getenv("AZURE_COSMOS_CONTAINER_NAME", "documents")
+        self.clients_container_name = os.getenv("AZURE_COSMOS_CLIENTS_CONTAINER_NAME", "clients")
+        # Items fetched per round trip when a list is streamed or no page size is given
+        self.page_size = int(os.getenv("AZURE_COSMOS_PAGE_SIZE", "100"))
+
+        cache_enabled = os.getenv("READ_CACHE_ENABLED", "true").lower() == "true"
+        max_entries = int(os.getenv("READ_CACHE_MAX_ENTRIES", "1000"))
+        self.client_cache = ReadThroughCache(
+            "clients",
+            ttl=float(os.getenv("CLIENT_CACHE_TTL", "60")),
+            negative_ttl=float(os.getenv("CLIENT_CACHE_NEGATIVE_TTL", "10")),
+            max_entries=max_entries,
+            enabled=cache_enabled
+        )
+        self.document_list_cache = ReadThroughCache(
+            "documents",
+            ttl=float(os.getenv("DOCUMENT_LIST_CACHE_TTL", "30")),
+            negative_ttl=0,
+            max_entries=max_entries,
+            enabled=cache_enabled
+        )
+        self._client: Optional["CosmosClient"] = None
+        # The database and containers are checked on first use, once per marker
+        self.provisioned = get_provisioned_marker()
+        self._provision_checked = False
+        self._provision_lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Whether the SDK is installed and credentials are configured"""
+        return COSMOS_AIO_AVAILABLE and bool(self.endpoint and self.key)
+
+    def _get_client(self) -> "CosmosClient":
+        """Return the shared SDK client, creating it on first use"""
+        if self._client is None:
+            self._client = CosmosClient(self.endpoint, credential=self.key)
+        return self._client
+
+    def _container(self, name: str):
+        """Return a container proxy (no network round trip)"""
+        return self._get_client().get_database_client(self.database_name).get_container_client(name)
+
+    async def provision(self) -> None:
+        """Create the database and containers if they do not exist"""
+        client = self._get_client()
+        database = await client.create_database_if_not_exists(id=self.database_name)
+        await database.create_container_if_not_exists(
+            id=self.documents_container_name, partition_key=PartitionKey(path="/client_id")
+        )
+        await database.create_container_if_not_exists(
+            id=self.clients_container_name, partition_key=PartitionKey(path="/id")
+        )
+        logger.info(f"Azure Cosmos DB containers initialized in database: {self.database_name}")
+
+    async def _ensure_provisioned(self) -> None:
+        """Provision on first use, unless the provisioned marker says it was already done"""
+        if self._provision_checked:
+            return
+        async with self._provision_lock:
+            if self._provision_checked:
+                return
+            marker_key = (f"cosmos:{self.endpoint}/{self.database_name}/"
+                          f"{self.documents_container_name}/{self.clients_container_name}")
+            if not self.provisioned.is_provisioned(marker_key):
+                try:
+                    await self.provision()
+                    self.provisioned.mark(marker_key)
+                except Exception as e:
+                    # Keys without create rights can still read and write existing containers
+                    logger.error(f"Error initializing Azure Cosmos DB: {str(e)}")
+            self._provision_checked = True
+
+    def _items(self, container_name: str, query: str, parameters: Optional[List[Dict[str, Any]]] = None,
+               partition_key: Optional[str] = None, page_size: Optional[int] = None):
+        """Start a parameterized query, within one partition if a key is given"""
+        options = {"partition_key": partition_key} if partition_key is not None else {}
+        return self._container(container_name).query_items(
+            query=query, parameters=parameters or [], max_item_count=page_size or self.page_size, **options
+        )
+
+    async def _query(self, container_name: str, query: str,
+                     parameters: Optional[List[Dict[str, Any]]] = None,
+                     partition_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Run a parameterized query and collect all the results"""
+        await self._ensure_provisioned()
+        return [item async for item in self._items(container_name, query, parameters, partition_key)]
+
+    async def _query_page(self, container_name: str, query: str, parameters: Optional[List[Dict[str, Any]]],
+                          partition_key: Optional[str], limit: Optional[int],
+                          continuation: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Run one page of a query, resuming from a continuation token"""
+        await self._ensure_provisioned()
+        pages = self._items(container_name, query, parameters, partition_key, limit).by_page(continuation)
+        try:
+            page = await pages.__anext__()
+        except StopAsyncIteration:
+            return [], None
+        items = [item async for item in page]
+        return items, pages.continuation_token
+
+    async def _query_stream(self, container_name: str, query: str, parameters: Optional[List[Dict[str, Any]]],
+                            partition_key: Optional[str],
+                            continuation: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the results of a query as each page arrives, resuming from a continuation token"""
+        await self._ensure_provisioned()
+        async for page in self._items(container_name, query, parameters, partition_key).by_page(continuation):
+            async for item in page:
+                yield item
+
+    async def _read(self, container_name: str, item_id: str, partition_key: str) -> Optional[Dict[str, Any]]:
+        """Point-read an item by id and partition key"""
+        await self._ensure_provisioned()
+        try:
+            return await self._container(container_name).read_item(item=item_id, partition_key=partition_key)
+        except CosmosResourceNotFoundError:
+            return None
+
+    async def list_clients(self) -> List[Dict[str, Any]]:
+        """
+        Get all clients
+
+        Returns:
+            List of client records
+        """
+        return await self._query(self.clients_container_name, "SELECT * FROM c")
+
+    async def list_clients_page(self, limit: Optional[int] = None,
+                                continuation: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of clients
+
+        Args:
+            limit: Maximum number of clients in the page
+            continuation: Continuation token of the previous page
+
+        Returns:
+            (clients, continuation token of the next page or None)
+        """
+        return await self._query_page(self.clients_container_name, "SELECT * FROM c", None, None,
+                                      limit, continuation)
+
+    def iter_clients(self, continuation: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all clients, starting after a continuation token"""
+        return self._query_stream(self.clients_container_name, "SELECT * FROM c", None, None, continuation)
+
+    async def get_client(self, client_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a specific client
+
+        Args:
+            client_id: ID of the client
+
+        Returns:
+            The client record, or None if it does not exist
+        """
+        return await self.client_cache.get(
+            client_id, lambda: self._read(self.clients_container_name, client_id, client_id)
+        )
+
+    async def upsert_client(self, client: Dict[str, Any]) -> None:
+        """Insert or replace a client record, invalidating its cached profile"""
+        await self._ensure_provisioned()
+        try:
+            await self._container(self.clients_container_name).upsert_item(body=client)
+        finally:
+            self.client_cache.invalidate(client["id"])
+
+    def _documents_query(self, client_id: str,
+                         document_type: Optional[str]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Query for a client's documents, optionally of one document type"""
+        query = "SELECT * FROM c WHERE c.client_id = @client_id"
+        parameters = [{"name": "@client_id", "value": client_id}]
+        if document_type:
+            query += " AND c.document_type = @document_type"
+            parameters.append({"name": "@document_type", "value": document_type})
+        return query, parameters
+
+    async def get_client_documents(self, client_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the document metadata of a client
+
+        Args:
+            client_id: ID of the client
+
+        Returns:
+            List of document metadata (shared with the cache; do not modify)
+        """
+        return await self.document_list_cache.get(client_id, lambda: self._query(
+            self.documents_container_name,
+            "SELECT * FROM c WHERE c.client_id = @client_id",
+            [{"name": "@client_id", "value": client_id}],
+            partition_key=client_id
+        ))
+
+    async def get_client_documents_page(self, client_id: str, limit: Optional[int] = None,
+                                        continuation: Optional[str] = None, document_type: Optional[str] = None
+                                        ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of a client's document metadata
+
+        Args:
+            client_id: ID of the client
+            limit: Maximum number of documents in the page
+            continuation: Continuation token of the previous page
+            document_type: Only return documents of this type
+
+        Returns:
+            (documents, continuation token of the next page or None)
+        """
+        query, parameters = self._documents_query(client_id, document_type)
+        return await self._query_page(
+            self.documents_container_name, query, parameters, client_id, limit, continuation
+        )
+
+    def iter_client_documents(self, client_id: str, continuation: Optional[str] = None,
+                              document_type: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a client's document metadata, starting after a continuation token"""
+        query, parameters = self._documents_query(client_id, document_type)
+        return self._query_stream(self.documents_container_name, query, parameters, client_id, continuation)
+
+    async def get_document(self, client_id: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata of a specific document
+
+        Args:
+            client_id: ID of the client the document belongs to
+            document_id: ID of the document
+
+        Returns:
+            The document metadata, or None if it does not exist
+        """
+        return await self._read(self.documents_container_name, document_id, client_id)
+
+    async def upsert_document(self, document: Dict[str, Any]) -> None:
+        """Insert or replace document metadata, invalidating the client's cached list"""
+        await self._ensure_provisioned()
+        try:
+            await self._container(self.documents_container_name).upsert_item(body=document)
+        finally:
+            # Even a failed write may have been applied
+            self.document_list_cache.invalidate(document["client_id"])
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return hit rate and staleness of the read caches"""
+        return {
+            "clients": self.client_cache.get_stats(),
+            "documents": self.document_list_cache.get_stats()
+        }
+
+    async def close(self) -> None:
+        """Close the pooled connections"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+_store: Optional[CosmosStore] = None
+
+
+def get_cosmos_store() -> CosmosStore:
+    """Return the process-wide Cosmos DB store"""
+    global _store
+    if _store is None:
+        _store = CosmosStore()
+    return _store
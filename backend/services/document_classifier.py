@@ -0,0 +1,82 @@
+import os
+import logging
+from dotenv import load_dotenv
+from typing import Dict, Iterable, Optional, Tuple
+
+from services.form_schemas import FORM_SCHEMAS
+from services.acroform import normalize_field_name
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# A form title counts for this many keywords
+PAGE_MARKER_WEIGHT = 3.0
+
+
+class DocumentClassifier:
+    """Predicts the document type from the first page before any remote call
+
+    Scores every registered form schema by the form titles (page_markers) and
+    keywords (classifier_keywords) found in the first page's text, and by the
+    names of its filled form fields that the schema maps (acroform_fields),
+    which is how fillable PDFs without a text layer are recognized. A
+    prediction is only made when the best score is high enough and clearly
+    ahead of the runner-up.
+    """
+
+    def __init__(self):
+        """Initialize the classifier from environment settings"""
+        self.enabled = os.getenv("DOCUMENT_CLASSIFIER_ENABLED", "true").lower() == "true"
+        self.min_score = float(os.getenv("DOCUMENT_CLASSIFIER_MIN_SCORE", "3"))
+        self.min_margin = float(os.getenv("DOCUMENT_CLASSIFIER_MIN_MARGIN", "2"))
+
+    def score(self, text: str, field_names: Iterable[str] = ()) -> Dict[str, float]:
+        """
+        Score each document type against a page's text and form fields
+
+        Args:
+            text: First-page text
+            field_names: Names of the document's filled form fields
+
+        Returns:
+            Score per document type, for types with any matching feature
+        """
+        text = text.lower()
+        fields = {normalize_field_name(name) for name in field_names}
+        scores = {}
+        for document_type, schema in FORM_SCHEMAS.items():
+            score = sum(PAGE_MARKER_WEIGHT for marker in schema.page_markers if marker.lower() in text)
+            score += sum(1.0 for keyword in schema.classifier_keywords if keyword.lower() in text)
+            if fields and schema.acroform_fields:
+                score += sum(
+                    1.0 for candidates in schema.acroform_fields.values()
+                    if any(normalize_field_name(name) in fields for name in candidates)
+                )
+            if score:
+                scores[document_type] = score
+        return scores
+
+    def classify(self, text: str, field_names: Iterable[str] = ()) -> Tuple[Optional[str], Dict[str, float]]:
+        """
+        Predict the document type of a page
+
+        Args:
+            text: First-page text
+            field_names: Names of the document's filled form fields
+
+        Returns:
+            (predicted type or None if not confident, scores per type)
+        """
+        scores = self.score(text, field_names)
+        if not self.enabled or not scores:
+            return None, scores
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_type, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best_score < self.min_score or best_score - runner_up < self.min_margin:
+            return None, scores
+        return best_type, scores
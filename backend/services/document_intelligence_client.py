@@ -0,0 +1,397 @@
+import io
+import os
+import re
+import json
+import asyncio
+import logging
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from dotenv import load_dotenv
+from typing import Dict, Any, List, Optional, Union, AsyncIterator
+import httpx
+import aiofiles
+
+from services.result_projection import ResultProjection
+
+# Conditionally import the local PDF library
+try:
+    from pypdf import PdfReader
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+API_VERSION = "2023-07-31"
+
+# Matches individual page objects in a PDF (but not the /Pages tree nodes);
+# only used when pypdf is unavailable or cannot read the file
+PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+
+# Files are streamed to the service in chunks of this size
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# A document is either raw bytes or the path of a file on local disk
+DocumentSource = Union[bytes, str]
+
+
+class DocumentAnalysisError(Exception):
+    """Raised when Azure AI Document Intelligence rejects or fails an analysis"""
+
+
+def estimate_page_count(document: DocumentSource, pages: Optional[str] = None) -> int:
+    """
+    Estimate how many pages an analysis will cover
+
+    Args:
+        document: Raw document bytes or a file path
+        pages: Optional page selection passed to the analyze call (e.g. "1-3,5")
+
+    Returns:
+        Estimated number of pages (at least 1)
+    """
+    if pages:
+        count = 0
+        for part in pages.split(","):
+            bounds = part.strip().split("-")
+            try:
+                count += int(bounds[-1]) - int(bounds[0]) + 1
+            except ValueError:
+                count += 1
+        return max(1, count)
+
+    if isinstance(document, str):
+        with open(document, "rb") as f:
+            if f.read(5) != b"%PDF-":
+                return 1
+    elif document[:5] != b"%PDF-":
+        return 1
+
+    # Page objects inside compressed object streams are invisible to a byte
+    # scan, so read the page tree when possible
+    page_count = _read_pdf_page_count(document)
+    if page_count is not None:
+        return max(1, page_count)
+
+    if isinstance(document, str):
+        return _count_pdf_pages_in_file(document)
+    return max(1, len(PDF_PAGE_PATTERN.findall(document)))
+
+
+def _read_pdf_page_count(document: DocumentSource) -> Optional[int]:
+    """Number of pages in a PDF's page tree (None if pypdf cannot read it)"""
+    if not PYPDF_AVAILABLE:
+        return None
+    try:
+        reader = PdfReader(document if isinstance(document, str) else io.BytesIO(document))
+        return len(reader.pages)
+    except Exception as e:
+        logger.debug(f"Falling back to scanning for page objects: {str(e)}")
+        return None
+
+
+def _count_pdf_pages_in_file(file_path: str) -> int:
+    """Count PDF page objects by scanning a file in fixed-size chunks"""
+    count = 0
+    carry = b""
+    with open(file_path, "rb") as f:
+        if f.read(5) != b"%PDF-":
+            return 1
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            window = carry + chunk
+            # Matches ending near the edge may continue into the next chunk;
+            # count them on the next pass, once they are fully visible
+            counted_up_to = len(carry) - 32
+            limit = len(window) - 32
+            count += sum(1 for m in PDF_PAGE_PATTERN.finditer(window) if counted_up_to < m.end() <= limit)
+            carry = window[-64:]
+        count += sum(1 for m in PDF_PAGE_PATTERN.finditer(carry) if m.end() > len(carry) - 32)
+    return max(1, count)
+
+
+def split_page_ranges(page_count: int, range_size: int) -> List[str]:
+    """
+    Split a page count into contiguous page selections
+
+    Args:
+        page_count: Number of pages in the document
+        range_size: Pages per range
+
+    Returns:
+        Page selections for the analyze call, e.g. ["1-10", "11-20", "21-23"]
+    """
+    ranges = []
+    for first in range(1, page_count + 1, range_size):
+        last = min(first + range_size - 1, page_count)
+        ranges.append(f"{first}-{last}" if last > first else str(first))
+    return ranges
+
+
+def format_page_selection(page_numbers: List[int]) -> str:
+    """
+    Collapse page numbers into a page selection for the analyze call
+
+    Args:
+        page_numbers: 1-based page numbers, in any order
+
+    Returns:
+        A page selection, e.g. [1, 2, 3, 7, 9, 10] -> "1-3,7,9-10"
+    """
+    parts = []
+    numbers = sorted(set(page_numbers))
+    start = 0
+    for index in range(1, len(numbers) + 1):
+        if index == len(numbers) or numbers[index] != numbers[index - 1] + 1:
+            first, last = numbers[start], numbers[index - 1]
+            parts.append(f"{first}-{last}" if last > first else str(first))
+            start = index
+    return ",".join(parts)
+
+
+def merge_analyze_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge analyzeResults of page ranges of one document into a single result
+
+    Pages are ordered by page number; tables, key/value pairs, paragraphs and
+    documents are concatenated in range order. Span offsets still refer to
+    each range's own content string.
+
+    Args:
+        results: analyzeResult payloads, one per page range
+
+    Returns:
+        A combined analyzeResult
+    """
+    if not results:
+        return {}
+
+    merged = {key: value for key, value in results[0].items() if not isinstance(value, list)}
+    merged["content"] = "\n".join(result.get("content", "") for result in results if result.get("content"))
+    for key in ("pages", "tables", "keyValuePairs", "paragraphs", "documents", "styles"):
+        items = [item for result in results for item in result.get(key, [])]
+        if items:
+            merged[key] = items
+    if "pages" in merged:
+        merged["pages"].sort(key=lambda page: page.get("pageNumber", 0))
+    return merged
+
+
+class DocumentIntelligenceClient:
+    """Shared async client for the Azure AI Document Intelligence REST API
+
+    One instance is shared per process so that analysis submissions and status
+    polls reuse pooled keep-alive connections. Polling waits with asyncio.sleep,
+    so any number of analyses can be in flight without blocking the event loop.
+    """
+
+    def __init__(self, endpoint: Optional[str] = None, key: Optional[str] = None):
+        """Initialize the client with Azure credentials and pool settings"""
+        self.endpoint = (endpoint or os.getenv("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT") or "").rstrip("/")
+        self.key = key or os.getenv("AZURE_DOCUMENT_INTELLIGENCE_KEY")
+
+        # Connection pool settings
+        self.max_connections = int(os.getenv("DOCUMENT_INTELLIGENCE_MAX_CONNECTIONS", "100"))
+        self.max_keepalive_connections = int(os.getenv("DOCUMENT_INTELLIGENCE_MAX_KEEPALIVE", "20"))
+
+        # Poll scheduler settings (seconds)
+        self.poll_timeout = float(os.getenv("DOCUMENT_INTELLIGENCE_POLL_TIMEOUT", "120"))
+        self.min_poll_interval = float(os.getenv("DOCUMENT_INTELLIGENCE_MIN_POLL_INTERVAL", "0.5"))
+        self.max_poll_interval = float(os.getenv("DOCUMENT_INTELLIGENCE_MAX_POLL_INTERVAL", "10"))
+        self.per_page_poll_interval = 0.25
+        self.poll_backoff = 1.5
+        self.max_submit_retries = 3
+
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def configured(self) -> bool:
+        """Whether an endpoint and key are available"""
+        return bool(self.endpoint and self.key)
+
+    def _get_http(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client, creating it on first use"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections
+                ),
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                headers={"Ocp-Apim-Subscription-Key": self.key or ""}
+            )
+        return self._http
+
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+
+    async def analyze(self, model_id: str, document: DocumentSource, pages: Optional[str] = None,
+                      content_type: str = "application/octet-stream",
+                      projection: Optional[ResultProjection] = None) -> Dict[str, Any]:
+        """
+        Analyze a document and wait for the result
+
+        Args:
+            model_id: Document Intelligence model (e.g. "prebuilt-layout")
+            document: Raw document bytes, or a file path to stream from disk
+            pages: Optional page selection (e.g. "1-3,5")
+            content_type: MIME type of the document
+            projection: Optional subset of the analyzeResult to materialize
+
+        Returns:
+            The analyzeResult section of the completed operation
+        """
+        operation_location = await self.submit(model_id, document, pages, content_type)
+        page_count = await asyncio.to_thread(estimate_page_count, document, pages)
+        return await self.poll(operation_location, page_count, projection)
+
+    async def submit(self, model_id: str, document: DocumentSource, pages: Optional[str] = None,
+                     content_type: str = "application/octet-stream") -> str:
+        """
+        Submit a document for analysis
+
+        Args:
+            model_id: Document Intelligence model
+            document: Raw document bytes, or a file path to stream from disk
+            pages: Optional page selection
+            content_type: MIME type of the document
+
+        Returns:
+            Operation-Location URL to poll for the result
+        """
+        if not self.configured:
+            raise DocumentAnalysisError("Azure Document Intelligence credentials not found")
+
+        url = f"{self.endpoint}/formrecognizer/documentModels/{model_id}:analyze"
+        params = {"api-version": API_VERSION}
+        if pages:
+            params["pages"] = pages
+
+        http = self._get_http()
+        for attempt in range(self.max_submit_retries + 1):
+            headers = {"Content-Type": content_type}
+            if isinstance(document, str):
+                # Stream the file so memory use does not grow with document size
+                headers["Content-Length"] = str(os.path.getsize(document))
+                content = self._stream_file(document)
+            else:
+                content = document
+
+            response = await http.post(url, params=params, content=content, headers=headers)
+
+            if response.status_code == 202:
+                operation_location = response.headers.get("Operation-Location")
+                if not operation_location:
+                    raise DocumentAnalysisError("Failed to analyze document: no Operation-Location in the response")
+                return operation_location
+
+            # Throttled: wait as long as the service asks before resubmitting
+            if response.status_code in (429, 503) and attempt < self.max_submit_retries:
+                delay = self._retry_after(response) or float(2 ** attempt)
+                logger.warning(f"Analysis submission throttled ({response.status_code}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            raise DocumentAnalysisError(f"Failed to analyze document: {response.text}")
+
+        raise DocumentAnalysisError("Failed to analyze document: retries exhausted")
+
+    async def poll(self, operation_location: str, page_count: int = 1,
+                   projection: Optional[ResultProjection] = None) -> Dict[str, Any]:
+        """
+        Poll an analysis operation until it completes
+
+        The first wait grows with the page count; later waits back off
+        exponentially. Both are capped at max_poll_interval, and a
+        Retry-After header from the service is never undercut. With a
+        projection, the response is parsed as it streams in and only the
+        projected parts of the analyzeResult are built.
+
+        Args:
+            operation_location: URL returned by submit()
+            page_count: Estimated number of pages being analyzed
+            projection: Optional subset of the analyzeResult to materialize
+
+        Returns:
+            The analyzeResult section of the completed operation
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.poll_timeout
+        interval = self._initial_poll_interval(page_count)
+        http = self._get_http()
+
+        await asyncio.sleep(interval)
+        while True:
+            async with http.stream("GET", operation_location) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    result = None
+                elif projection is not None:
+                    result = await projection.parse_operation(response.aiter_bytes())
+                else:
+                    result = json.loads(await response.aread())
+
+            if response.status_code not in (429, 503):
+                if response.status_code >= 400:
+                    raise DocumentAnalysisError(f"Failed to get analysis status: {response.text}")
+
+                status = result.get("status")
+                if status == "succeeded":
+                    return result.get("analyzeResult", {})
+                if status == "failed":
+                    raise DocumentAnalysisError(f"Document analysis failed: {result.get('error', result)}")
+
+            delay = max(self._retry_after(response) or 0.0, interval)
+            delay += random.uniform(0, delay * 0.1)
+            if loop.time() + delay > deadline:
+                raise DocumentAnalysisError("Document analysis timed out")
+
+            await asyncio.sleep(delay)
+            interval = min(self.max_poll_interval, interval * self.poll_backoff)
+
+    async def _stream_file(self, file_path: str) -> AsyncIterator[bytes]:
+        """Yield a file's content in fixed-size chunks"""
+        async with aiofiles.open(file_path, "rb") as f:
+            while True:
+                chunk = await f.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _initial_poll_interval(self, page_count: int) -> float:
+        """First poll delay, scaled by the number of pages being analyzed"""
+        interval = self.min_poll_interval + self.per_page_poll_interval * max(0, page_count - 1)
+        return min(self.max_poll_interval, interval)
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        """Parse a Retry-After header (seconds or HTTP date)"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+
+_client: Optional[DocumentIntelligenceClient] = None
+
+
+def get_document_intelligence_client() -> DocumentIntelligenceClient:
+    """Return the process-wide Document Intelligence client"""
+    global _client
+    if _client is None:
+        _client = DocumentIntelligenceClient()
+    return _client
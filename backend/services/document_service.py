@@ -1,10 +1,24 @@
 import os
+import asyncio
 import logging
 import json
 from dotenv import load_dotenv
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, Union
+from services.document_intelligence_client import (
+    get_document_intelligence_client, estimate_page_count, split_page_ranges,
+    format_page_selection, merge_analyze_results, DocumentAnalysisError
+)
+from services.extraction_cache import get_extraction_cache, hash_bytes, hash_file
+from services.job_journal import get_job_journal
+from services.submission_scheduler import get_submission_scheduler
+from services.result_projection import ResultProjection, PAGE_TEXT_PATHS
+from services.form_schemas import get_form_schema, extract_with_schema, page_text
+from services.pdf_text_layer import PdfTextLayerExtractor
+from services.acroform import AcroFormExtractor, map_acroform_fields
+from services.pdf_content import PdfContent
+from services.image_preprocessor import get_image_preprocessor
+from services.document_classifier import DocumentClassifier
+from services.document_splitter import find_segments, write_segment, PYPDF_AVAILABLE
 
 # Load environment variables
 load_dotenv()
@@ -17,262 +31,518 @@ class DocumentService:
 
     def __init__(self):
         """Initialize the document service with Azure credentials"""
-        self.endpoint = os.getenv("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT")
-        self.key = os.getenv("AZURE_DOCUMENT_INTELLIGENCE_KEY")
+        # Shared async client (pooled connections, non-blocking polling)
+        self.client = get_document_intelligence_client()
         
-        if not self.endpoint or not self.key:
-            logger.warning("Azure Document Intelligence credentials not found. Using mock data.")
-            self.client = None
+        # Demo mode flag
+        self.demo_mode = os.getenv("DEMO_MODE", "true").lower() == "true"
+        self.use_azure = not self.demo_mode and self.client.configured
+        
+        if not self.use_azure:
+            logger.warning("Azure Document Intelligence credentials not found or demo mode enabled. Using mock data.")
         else:
-            self.client = DocumentAnalysisClient(
-                endpoint=self.endpoint, 
-                credential=AzureKeyCredential(self.key)
-            )
             logger.info("Document Intelligence client initialized")
         
+        # Content-addressed cache of analyze results
+        self.cache = get_extraction_cache()
+        
+        # Priority and fair-share admission for remote analyses
+        self.scheduler = get_submission_scheduler()
+        
+        # Submitted operations, so analyses interrupted by a restart are polled, not resubmitted
+        self.journal = get_job_journal()
+        
+        # Local text-layer tier for born-digital PDFs
+        self.text_layer = PdfTextLayerExtractor()
+        
+        # Fillable-field tier for PDF forms
+        self.acroform = AcroFormExtractor()
+        
+        # Shrinks photos and scans before they are uploaded for analysis
+        self.preprocessor = get_image_preprocessor()
+        
+        # Predicts the document type from the first page before any remote call
+        self.classifier = DocumentClassifier()
+        
+        # Which tier served each processed document; text_layer+<tier> when only
+        # the sparse pages of a born-digital PDF were analyzed
+        self.tier_counts = {"acroform": 0, "text_layer": 0, "text_layer+cache": 0, "text_layer+azure": 0,
+                            "cache": 0, "azure": 0, "mock": 0}
+        # Pages read from the PDF text layer instead of being analyzed
+        self.text_layer_pages = 0
+        
+        # Parallel page-range mode for long documents
+        self.page_range_size = int(os.getenv("DOCUMENT_PAGE_RANGE_SIZE", "10"))
+        self.parallel_min_pages = int(os.getenv("DOCUMENT_PARALLEL_MIN_PAGES", "20"))
+        self.page_range_concurrency = int(os.getenv("DOCUMENT_PAGE_RANGE_CONCURRENCY", "8"))
+        
         # Document type mappings
         self.document_types = {
             "i9": self._process_i9_form,
             "schedule_a": self._process_schedule_a_form,
             "tax_1040": self._process_tax_1040_form,
             "job_application": self._process_job_application,
-            "generic": self._process_generic_document
+            "generic": self._process_generic_document,
+            "packet": self._process_packet
         }
 
-    async def process_document(self, file_path: str, document_type: str) -> Dict[str, Any]:
+    async def process_document(self, file_path: str, document_type: str,
+                               report: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Process a document using Azure AI Document Intelligence
         
+        Unless the document is a packet, the first page is classified locally
+        and a confident prediction overrides the requested type ("auto" asks
+        for classification only), so mislabeled uploads go straight to the
+        right model.
+        
         Args:
             file_path: Path to the document file
-            document_type: Type of document to process
+            document_type: Type of document to process, or "auto"
+            report: Optional dict that receives processing details, such as
+                the tier that served the document and the type it was processed as
             
         Returns:
-            Extracted fields from the document
+            Extracted fields from the document (mock data only in demo mode
+            or when Azure is not configured)
+            
+        Raises:
+            Exception: If the document could not be analyzed
         """
+        if report is None:
+            report = {}
+        # Parsed at most once, then shared by the classifier and the local tiers
+        pdf = PdfContent(file_path, self.text_layer, self.acroform)
         try:
+            if document_type != "packet" and (self.classifier.enabled or document_type == "auto"):
+                predicted = await self._classify(pdf, report)
+                if predicted and predicted != document_type:
+                    logger.info(f"Classified document as {predicted} (requested {document_type})")
+                    report["requested_type"] = document_type
+                    document_type = predicted
+                elif document_type == "auto":
+                    document_type = "generic"
+            report["document_type"] = document_type
+            
             # Check if we have a specialized processor for this document type
             if document_type in self.document_types:
                 processor = self.document_types[document_type]
-                return await processor(file_path)
+                return await processor(file_path, report, pdf)
             else:
                 # Default to generic document processing
-                return await self._process_generic_document(file_path)
+                return await self._process_generic_document(file_path, report, pdf)
         except Exception as e:
+            # Fail the job (and let the queue retry it) rather than persist made-up fields
             logger.error(f"Error processing document: {str(e)}")
-            # For demo purposes, return mock data if an error occurs
-            return self._get_mock_data(document_type)
+            raise
+        finally:
+            pdf.close()
+    
+    async def _classify(self, pdf: PdfContent, report: Dict[str, Any]) -> Optional[str]:
+        """
+        Predict the document type from the first page's text and form fields
+        
+        Args:
+            pdf: The document's parsed PDF
+            report: Dict that receives the classifier's prediction and scores
+            
+        Returns:
+            The predicted document type, or None if the classifier is not confident
+        """
+        text, field_names = await asyncio.to_thread(self._first_page_signature, pdf)
+        predicted, scores = self.classifier.classify(text, field_names)
+        report["classifier"] = {"predicted": predicted, "scores": scores}
+        return predicted
     
-    async def _process_i9_form(self, file_path: str) -> Dict[str, Any]:
+    def _first_page_signature(self, pdf: PdfContent) -> Tuple[str, List[str]]:
+        """First-page text and the names of the first page's filled form fields (blocking)"""
+        page_lines = pdf.page_lines(page_limit=1)
+        return "\n".join(page_lines[0]) if page_lines else "", pdf.first_page_fields()
+    
+    async def _process_i9_form(self, file_path: str, report: Optional[Dict[str, Any]] = None,
+                               pdf: Optional[PdfContent] = None) -> Dict[str, Any]:
         """Process an I-9 Employment Eligibility Verification form"""
-        try:
-            # If we have a client, use Azure Document Intelligence
-            if self.client:
-                with open(file_path, "rb") as f:
-                    logger.info("Starting I-9 form analysis with prebuilt-document model")
-                    poller = self.client.begin_analyze_document(
-                        "prebuilt-document", document=f.read()
-                    )
-                result = poller.result()
-                
-                # Extract relevant fields for I-9 form
-                extracted_data = {
-                    "document_type": "I-9 Form",
-                    "fields_detected": 0,
-                    "fields": {},
-                    "tables": []
-                }
-
-                # Extract all text content first
-                all_text = ""
-                for page in result.pages:
-                    for line in page.lines:
-                        all_text += line.content + "\n"
-                
-                # Look for common I-9 fields in the text
-                field_patterns = {
-                    "last_name": r"Last Name.{0,50}?([A-Za-z\- ]+)",
-                    "first_name": r"First Name.{0,50}?([A-Za-z\- ]+)",
-                    "middle_initial": r"Middle Initial.{0,50}?([A-Za-z])",
-                    "address": r"Address.{0,50}?([A-Za-z0-9\- ,\.]+)",
-                    "apt_number": r"Apt\. Number.{0,50}?([A-Za-z0-9\- ]+)",
-                    "city": r"City.{0,50}?([A-Za-z\- ]+)",
-                    "state": r"State.{0,50}?([A-Z]{2})",
-                    "zip_code": r"ZIP Code.{0,50}?(\d{5})",
-                    "ssn": r"Social Security Number.{0,50}?(\d{3}-\d{2}-\d{4})",
-                    "email": r"E-mail Address.{0,50}?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})",
-                    "phone": r"Telephone Number.{0,50}?(\(\d{3}\) \d{3}-\d{4}|\d{3}-\d{3}-\d{4})"
-                }
-
-                import re
-                for field, pattern in field_patterns.items():
-                    match = re.search(pattern, all_text)
-                    if match:
-                        extracted_data["fields"][field] = match.group(1).strip()
-                        extracted_data["fields_detected"] += 1
-
-                # Extract tables (for List A/B/C documents)
-                if hasattr(result, 'tables'):
-                    for table in result.tables:
-                        table_data = []
-                        for cell in table.cells:
-                            table_data.append({
-                                "row_index": cell.row_index,
-                                "column_index": cell.column_index,
-                                "content": cell.content
-                            })
-                        extracted_data["tables"].append(table_data)
-
-                # Extract key-value pairs
-                if hasattr(result, 'key_value_pairs'):
-                    for field in result.key_value_pairs:
-                        key = field.key.content if field.key else ""
-                        value = field.value.content if field.value else ""
-                        
-                        clean_key = key.strip().replace(" ", "_").lower()
-                        if clean_key and value:
-                            extracted_data["fields"][clean_key] = value.strip()
-                            extracted_data["fields_detected"] += 1
-                
-                logger.info(f"Completed I-9 form analysis. Detected {extracted_data['fields_detected']} fields.")
-                return extracted_data
-            else:
-                # Return mock data if no client
-                logger.warning("No Azure client available, returning mock data")
-                return self._get_mock_data("i9")
-        except Exception as e:
-            logger.error(f"Error processing I-9 form: {str(e)}")
-            return self._get_mock_data("i9")
+        return await self._process_with_schema(file_path, "i9", report, pdf)
     
-    async def _process_schedule_a_form(self, file_path: str) -> Dict[str, Any]:
+    async def _process_schedule_a_form(self, file_path: str, report: Optional[Dict[str, Any]] = None,
+                                       pdf: Optional[PdfContent] = None) -> Dict[str, Any]:
         """Process a Schedule A form for Federal Employment"""
-        try:
-            # Similar implementation as _process_i9_form
-            # Would use Document Intelligence with custom model trained for Schedule A forms
-            if self.client:
-                with open(file_path, "rb") as f:
-                    poller = self.client.begin_analyze_document(
-                        "prebuilt-document", document=f.read()
-                    )
-                result = poller.result()
-                
-                # Extract relevant fields for Schedule A form
-                extracted_data = {}
-                
-                # Extract specific fields from form
-                for field in result.key_value_pairs:
-                    key = field.key.content if field.key else ""
-                    value = field.value.content if field.value else ""
-                    
-                    # Map common Schedule A fields
-                    clean_key = key.strip().replace(" ", "_").lower()
-                    if clean_key and value:
-                        extracted_data[clean_key] = value
-                
-                return extracted_data
-            else:
-                return self._get_mock_data("schedule_a")
-        except Exception as e:
-            logger.error(f"Error processing Schedule A form: {str(e)}")
-            return self._get_mock_data("schedule_a")
+        return await self._process_with_schema(file_path, "schedule_a", report, pdf)
     
-    async def _process_tax_1040_form(self, file_path: str) -> Dict[str, Any]:
+    async def _process_tax_1040_form(self, file_path: str, report: Optional[Dict[str, Any]] = None,
+                                     pdf: Optional[PdfContent] = None) -> Dict[str, Any]:
         """Process a 1040 tax form"""
-        try:
-            # Similar implementation
-            if self.client:
-                with open(file_path, "rb") as f:
-                    poller = self.client.begin_analyze_document(
-                        "prebuilt-tax.us.1040", document=f.read()
-                    )
-                result = poller.result()
-                
-                # Extract tax form data
-                extracted_data = {}
-                
-                for field in result.fields.items():
-                    field_name, field_value = field
-                    extracted_data[field_name] = field_value.value if field_value else ""
-                
-                return extracted_data
+        return await self._process_with_schema(file_path, "tax_1040", report, pdf)
+    
+    async def _process_job_application(self, file_path: str, report: Optional[Dict[str, Any]] = None,
+                                       pdf: Optional[PdfContent] = None) -> Dict[str, Any]:
+        """Process a job application form"""
+        return await self._process_with_schema(file_path, "job_application", report, pdf)
+    
+    async def _process_generic_document(self, file_path: str, report: Optional[Dict[str, Any]] = None,
+                                        pdf: Optional[PdfContent] = None) -> Dict[str, Any]:
+        """Process a generic document for text extraction"""
+        return await self._process_with_schema(file_path, "generic", report, pdf)
+    
+    async def _process_packet(self, file_path: str, report: Optional[Dict[str, Any]] = None,
+                              pdf: Optional[PdfContent] = None) -> Dict[str, Any]:
+        """
+        Split a multi-form PDF at form boundaries and process the forms concurrently
+        
+        Each segment is written to its own PDF and dispatched to the processor
+        for its form, so the packet takes about as long as its slowest form.
+        
+        Args:
+            file_path: Path to the document file
+            report: Optional dict that receives the tier of each segment
+            pdf: The document's parsed PDF, if it was already opened
+            
+        Returns:
+            The combined result, with one entry per segment
+        """
+        if report is None:
+            report = {}
+        if pdf is None:
+            pdf = PdfContent(file_path, self.text_layer, self.acroform)
+        
+        page_texts = await self._page_texts(file_path, pdf)
+        segments = find_segments(page_texts) if page_texts and PYPDF_AVAILABLE else []
+        if len(segments) <= 1:
+            document_type = segments[0]["document_type"] if segments else "generic"
+            segments = [{"document_type": document_type, "first_page": 1, "last_page": len(page_texts or [1])}]
+            logger.info(f"Packet has a single form, processing it as {document_type}")
+        else:
+            logger.info(f"Split packet into {len(segments)} forms")
+            # Each segment is written to and parsed from its own file
+            pdf.close()
+        
+        async def process_segment(index: int, segment: Dict[str, Any]) -> Dict[str, Any]:
+            segment_report: Dict[str, Any] = {}
+            processor = self.document_types[segment["document_type"]]
+            if len(segments) == 1:
+                extracted = await processor(file_path, segment_report, pdf)
             else:
-                return self._get_mock_data("tax_1040")
+                segment_path = f"{file_path}.segment{index}.pdf"
+                try:
+                    await asyncio.to_thread(write_segment, file_path, segment["first_page"],
+                                            segment["last_page"], segment_path)
+                    extracted = await processor(segment_path, segment_report)
+                finally:
+                    if os.path.exists(segment_path):
+                        os.remove(segment_path)
+            
+            first, last = segment["first_page"], segment["last_page"]
+            return {
+                "document_type": segment["document_type"],
+                "pages": f"{first}-{last}" if last > first else str(first),
+                "tier": segment_report.get("tier"),
+                "extracted_fields": extracted
+            }
+        
+        results = await asyncio.gather(*(process_segment(i, s) for i, s in enumerate(segments)))
+        report["tier"] = "split"
+        report["segments"] = [
+            {"document_type": r["document_type"], "pages": r["pages"], "tier": r["tier"]} for r in results
+        ]
+        return {
+            "document_type": "packet",
+            "segments_detected": len(results),
+            "segments": list(results)
+        }
+    
+    async def _page_texts(self, file_path: str, pdf: PdfContent) -> Optional[List[str]]:
+        """
+        Text of each page, from the PDF text layer or else a read-model analysis
+        
+        Args:
+            file_path: Path to the document file
+            pdf: The document's parsed PDF
+            
+        Returns:
+            One string per page, or None if the text could not be obtained
+        """
+        page_lines = await asyncio.to_thread(pdf.page_lines)
+        if page_lines and any(page_lines):
+            return ["\n".join(lines) for lines in page_lines]
+        
+        if not self.use_azure:
+            return None
+        try:
+            # Scanned packet: OCR it once with the cheapest model to find the boundaries
+            result = await self.analyze(file_path, "prebuilt-read",
+                                        projection=ResultProjection(PAGE_TEXT_PATHS))
         except Exception as e:
-            logger.error(f"Error processing 1040 tax form: {str(e)}")
-            return self._get_mock_data("tax_1040")
+            logger.error(f"Error reading packet pages: {str(e)}")
+            return None
+        return [page_text(page) for page in result.get("pages", [])] or None
     
-    async def _process_job_application(self, file_path: str) -> Dict[str, Any]:
-        """Process a job application form"""
+    async def _process_with_schema(self, file_path: str, document_type: str,
+                                   report: Optional[Dict[str, Any]] = None,
+                                   pdf: Optional[PdfContent] = None) -> Dict[str, Any]:
+        """
+        Analyze a document and extract its fields with the registered form schema
+        
+        Args:
+            file_path: Path to the document file
+            document_type: Type of document (selects the form schema)
+            report: Optional dict that receives the tier that served the document
+            pdf: The document's parsed PDF, if it was already opened
+            
+        Returns:
+            Extracted data in the schema's layout
+        """
+        if report is None:
+            report = {}
+        if pdf is None:
+            pdf = PdfContent(file_path, self.text_layer, self.acroform)
+        schema = get_form_schema(document_type)
         try:
-            # Similar implementation
-            if self.client:
-                with open(file_path, "rb") as f:
-                    poller = self.client.begin_analyze_document(
-                        "prebuilt-document", document=f.read()
-                    )
-                result = poller.result()
-                
-                # Extract job application data
-                extracted_data = {}
-                
-                for field in result.key_value_pairs:
-                    key = field.key.content if field.key else ""
-                    value = field.value.content if field.value else ""
-                    
-                    # Map common job application fields
-                    clean_key = key.strip().replace(" ", "_").lower()
-                    if clean_key and value:
-                        extracted_data[clean_key] = value
-                
+            # Filled PDF forms: read the field values instead of OCR-ing the page
+            if schema.acroform_fields is not None:
+                result = await asyncio.to_thread(self._read_acroform, schema, pdf)
+                if result is not None:
+                    self._record_tier(report, "acroform")
+                    logger.info(f"Extracted {schema.title} from its fillable fields")
+                    return extract_with_schema(schema, result)
+            
+            # Born-digital PDFs: read the embedded text layer instead of paying for OCR
+            if schema.local_text_layer:
+                result = await self._read_text_layer(file_path, pdf, schema, report)
+                if result is not None:
+                    return extract_with_schema(schema, result)
+            
+            # Nothing more is read locally; free the parsed file before a long analysis
+            pdf.close()
+            if self.use_azure:
+                logger.info(f"Starting {schema.title} analysis with {schema.model_id} model")
+                result = await self.analyze(file_path, schema.model_id, report, schema.projection)
+                extracted_data = extract_with_schema(schema, result)
+                logger.info(f"Completed {schema.title} analysis")
                 return extracted_data
             else:
-                return self._get_mock_data("job_application")
+                # Return mock data if no client
+                logger.warning("No Azure client available, returning mock data")
+                self._record_tier(report, "mock")
+                return self._get_mock_data(document_type)
         except Exception as e:
-            logger.error(f"Error processing job application: {str(e)}")
-            return self._get_mock_data("job_application")
+            logger.error(f"Error processing {schema.title}: {str(e)}")
+            raise
     
-    async def _process_generic_document(self, file_path: str) -> Dict[str, Any]:
-        """Process a generic document for text extraction"""
+    async def _read_text_layer(self, file_path: str, pdf: PdfContent, schema,
+                               report: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Build an analyzeResult from the PDF text layer, OCR-ing only the sparse pages
+        
+        Pages with too little embedded text (scans inserted into a
+        born-digital PDF) are sent to analysis as one page selection and
+        merged with the pages read locally.
+        
+        Args:
+            file_path: Path to the document file
+            pdf: The document's parsed PDF
+            schema: Form schema of the document
+            report: Dict that receives the tier that served the document
+            
+        Returns:
+            An analyzeResult-shaped dict, or None if the text layer is missing
+            or every page is too sparse
+        """
+        page_lines = await asyncio.to_thread(pdf.page_lines)
+        if not page_lines:
+            return None
+        sparse = self.text_layer.sparse_pages(page_lines)
+        if len(sparse) == len(page_lines):
+            return None
+        
+        dense = [number for number in range(1, len(page_lines) + 1) if number not in sparse]
+        local_result = self.text_layer.build_result(page_lines, dense)
+        self.text_layer_pages += len(dense)
+        if not sparse or not self.use_azure:
+            # Without Azure, the pages that do have text are the best available
+            self._record_tier(report, "text_layer")
+            logger.info(f"Extracted {schema.title} from the PDF text layer")
+            return local_result
+        
+        pages = format_page_selection(sparse)
+        logger.info(f"Read {len(dense)} pages of {schema.title} from the PDF text layer, "
+                    f"analyzing pages {pages} with {schema.model_id} model")
+        pdf.close()
+        # Recorded as text_layer+azure or text_layer+cache
+        report["text_layer_pages"] = len(dense)
+        remote_result = await self.analyze(file_path, schema.model_id, report, schema.projection, pages)
+        return merge_analyze_results([remote_result, local_result])
+    
+    def _read_acroform(self, schema, pdf: PdfContent) -> Optional[Dict[str, Any]]:
+        """
+        Read a PDF's filled form fields as key/value pairs of an analyzeResult (blocking)
+        
+        Args:
+            schema: Form schema with AcroForm field names
+            pdf: The document's parsed PDF
+            
+        Returns:
+            An analyzeResult-shaped dict, or None if the required fields are
+            not all filled
+        """
+        values = pdf.form_values()
+        if not values:
+            return None
+        
+        mapped, unmapped = map_acroform_fields(values, schema.acroform_fields)
+        if any(field not in mapped for field in schema.acroform_required):
+            return None
+        if len(values) < schema.acroform_min_fields:
+            return None
+        
+        # Forms without a template (e.g. Schedule A letters) take every filled field;
+        # otherwise only mapped fields are schema fields and the rest are kept apart
+        pairs = mapped if schema.acroform_fields else unmapped
+        result = {
+            "modelId": "local-acroform",
+            "keyValuePairs": [
+                {"key": {"content": key}, "value": {"content": value}} for key, value in pairs.items()
+            ]
+        }
+        if schema.acroform_fields and unmapped:
+            result["unmappedFields"] = unmapped
+        return result
+    
+    def _record_tier(self, report: Dict[str, Any], tier: str) -> None:
+        """Record which tier served a document (prefixed with text_layer+ when part of it was read locally)"""
+        if report.get("text_layer_pages") and tier != "text_layer":
+            tier = f"text_layer+{tier}"
+        report["tier"] = tier
+        self.tier_counts[tier] = self.tier_counts.get(tier, 0) + 1
+    
+    async def analyze(self, document: Union[bytes, str], model_id: str,
+                      report: Optional[Dict[str, Any]] = None,
+                      projection: Optional[ResultProjection] = None,
+                      pages: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Analyze a document, reusing a cached result for identical uploads
+        
+        Args:
+            document: Raw document bytes, or a file path (streamed, never read whole)
+            model_id: Document Intelligence model to use
+            report: Optional dict that receives the tier that served the document
+            projection: Optional subset of the analyzeResult to materialize
+                (the whole result if omitted)
+            pages: Optional page selection (e.g. "2,5-6"; the whole document if omitted)
+            
+        Returns:
+            The analyzeResult of the analysis
+        """
+        if isinstance(document, str):
+            content_hash = await asyncio.to_thread(hash_file, document)
+        else:
+            content_hash = hash_bytes(document)
+        if report is not None:
+            report["content_hash"] = content_hash
+        # Projected results are cached apart from whole ones
+        cache_model_id = f"{model_id}.{projection.key}" if projection is not None else model_id
+        if pages:
+            cache_model_id = f"{cache_model_id}.p{pages}"
+        cached = await self.cache.get(content_hash, cache_model_id)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {model_id} document {content_hash[:12]}")
+            self._record_tier(report if report is not None else {}, "cache")
+            return cached
+        
+        # Cache keys use the original upload; only the analysis sees the smaller file
+        prepared = document
+        if isinstance(document, str):
+            prepared, stats = await self.preprocessor.preprocess(document)
+            if stats is not None and report is not None:
+                report["preprocess"] = stats
+        
         try:
-            if self.client:
-                with open(file_path, "rb") as f:
-                    poller = self.client.begin_analyze_document(
-                        "prebuilt-document", document=f.read()
-                    )
-                result = poller.result()
-                
-                # Extract text content and any key-value pairs
-                extracted_data = {
-                    "content": [],
-                    "key_value_pairs": {}
-                }
-                
-                # Extract text by page
-                for page in result.pages:
-                    page_text = ""
-                    for line in page.lines:
-                        page_text += line.content + "\n"
-                    
-                    extracted_data["content"].append({
-                        "page_number": page.page_number,
-                        "text": page_text
-                    })
-                
-                # Extract key-value pairs
-                for field in result.key_value_pairs:
-                    key = field.key.content if field.key else ""
-                    value = field.value.content if field.value else ""
-                    
-                    clean_key = key.strip().replace(" ", "_").lower()
-                    if clean_key and value:
-                        extracted_data["key_value_pairs"][clean_key] = value
-                
-                return extracted_data
+            page_count = await asyncio.to_thread(estimate_page_count, prepared, pages)
+            if not pages and self.parallel_min_pages > 0 and page_count >= self.parallel_min_pages:
+                result = await self._analyze_page_ranges(prepared, model_id, page_count, content_hash, projection)
             else:
-                return self._get_mock_data("generic")
-        except Exception as e:
-            logger.error(f"Error processing generic document: {str(e)}")
-            return self._get_mock_data("generic")
+                result = await self._submit_and_poll(content_hash, model_id, prepared, pages, projection)
+        finally:
+            if prepared != document:
+                os.remove(prepared)
+        self._record_tier(report if report is not None else {}, "azure")
+        await self.cache.put(content_hash, cache_model_id, result)
+        return result
+    
+    async def _analyze_page_ranges(self, document: Union[bytes, str], model_id: str,
+                                   page_count: int, content_hash: str,
+                                   projection: Optional[ResultProjection] = None) -> Dict[str, Any]:
+        """
+        Analyze a long document as concurrent page ranges and merge the results
+        
+        Args:
+            document: Raw document bytes or a file path
+            model_id: Document Intelligence model to use
+            page_count: Number of pages in the document
+            content_hash: SHA-256 of the original upload
+            projection: Optional subset of the analyzeResult to materialize
+            
+        Returns:
+            The merged analyzeResult, shaped like a single whole-document analysis
+        """
+        page_ranges = split_page_ranges(page_count, self.page_range_size)
+        semaphore = asyncio.Semaphore(self.page_range_concurrency)
+        
+        async def analyze_range(pages: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._submit_and_poll(content_hash, model_id, document, pages, projection)
+        
+        logger.info(f"Analyzing {page_count} pages as {len(page_ranges)} parallel ranges")
+        tasks = [asyncio.create_task(analyze_range(pages)) for pages in page_ranges]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException as e:
+            # Stop the other ranges so they do not hold scheduler slots or keep polling
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not isinstance(e, DocumentAnalysisError):
+                raise
+            # The page estimate can be off for unusual PDFs; fall back to one call
+            logger.warning(f"Page-range analysis failed, analyzing whole document: {str(e)}")
+            return await self._submit_and_poll(content_hash, model_id, document, projection=projection)
+        return merge_analyze_results(list(results))
+    
+    async def _submit_and_poll(self, content_hash: str, model_id: str, document: Union[bytes, str],
+                               pages: Optional[str] = None,
+                               projection: Optional[ResultProjection] = None) -> Dict[str, Any]:
+        """
+        Analyze a document, resuming a journaled operation if one is still held
+        
+        The analysis holds a scheduler slot from submission until its result
+        is in, so it is admitted by priority class and coach.
+        
+        Args:
+            content_hash: SHA-256 of the original upload
+            model_id: Document Intelligence model to use
+            document: Raw document bytes or a file path
+            pages: Optional page selection
+            projection: Optional subset of the analyzeResult to materialize
+            
+        Returns:
+            The analyzeResult of the completed analysis
+        """
+        page_count = await asyncio.to_thread(estimate_page_count, document, pages)
+        operation_location = await asyncio.to_thread(self.journal.get_operation, content_hash, model_id, pages)
+        async with self.scheduler.slot():
+            if operation_location:
+                logger.info(f"Resuming {model_id} analysis of document {content_hash[:12]}")
+                try:
+                    result = await self.client.poll(operation_location, page_count, projection)
+                    await asyncio.to_thread(self.journal.delete_operation, content_hash, model_id, pages)
+                    return result
+                except DocumentAnalysisError as e:
+                    logger.warning(f"Could not resume analysis, resubmitting: {str(e)}")
+            
+            operation_location = await self.client.submit(model_id, document, pages)
+            await asyncio.to_thread(self.journal.save_operation, content_hash, model_id, pages, operation_location)
+            result = await self.client.poll(operation_location, page_count, projection)
+            await asyncio.to_thread(self.journal.delete_operation, content_hash, model_id, pages)
+            return result
     
     def _get_mock_data(self, document_type: str) -> Dict[str, Any]:
         """Return mock data for demonstration purposes"""
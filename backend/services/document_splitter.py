@@ -0,0 +1,92 @@
+import os
+import logging
+from dotenv import load_dotenv
+from typing import Dict, Any, List, Optional
+
+from services.form_schemas import FORM_SCHEMAS
+
+# Conditionally import the local PDF library
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+    logging.warning("pypdf not available. Multi-form PDFs will be processed as one document.")
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Form titles are looked for near the top of each page
+HEADER_CHARS = int(os.getenv("DOCUMENT_SPLIT_HEADER_CHARS", "600"))
+
+
+def classify_page(text: str) -> Optional[str]:
+    """
+    Identify the form that starts or continues on a page
+
+    Args:
+        text: Text of the page
+
+    Returns:
+        The document type whose page markers appear in the page header, or
+        None if the page carries no recognizable form title
+    """
+    header = text[:HEADER_CHARS].lower()
+    for document_type, schema in FORM_SCHEMAS.items():
+        if any(marker.lower() in header for marker in schema.page_markers):
+            return document_type
+    return None
+
+
+def find_segments(page_texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Split a packet into runs of consecutive pages of the same form
+
+    Pages without a form title belong to the form before them; leading
+    untitled pages form a generic segment.
+
+    Args:
+        page_texts: Text of each page, in order
+
+    Returns:
+        Segments as dicts with document_type, first_page and last_page (1-based)
+    """
+    segments: List[Dict[str, Any]] = []
+    for page_number, text in enumerate(page_texts, start=1):
+        document_type = classify_page(text)
+        if segments and document_type in (None, segments[-1]["document_type"]):
+            segments[-1]["last_page"] = page_number
+        else:
+            segments.append({
+                "document_type": document_type or "generic",
+                "first_page": page_number,
+                "last_page": page_number
+            })
+    return segments
+
+
+def write_segment(file_path: str, first_page: int, last_page: int, output_path: str) -> str:
+    """
+    Copy a page range of a PDF into a new file
+
+    Blocking; run it in a worker thread.
+
+    Args:
+        file_path: Path to the source PDF
+        first_page: First page to copy (1-based)
+        last_page: Last page to copy (inclusive)
+        output_path: Path of the PDF to write
+
+    Returns:
+        output_path
+    """
+    reader = PdfReader(file_path)
+    writer = PdfWriter()
+    for index in range(first_page - 1, last_page):
+        writer.add_page(reader.pages[index])
+    with open(output_path, "wb") as f:
+        writer.write(f)
+    return output_path
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dotenv import load_dotenv
+from typing import Dict, Any, Optional, Tuple
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# The backend directory, so default locations do not depend on where the process starts
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prefix of every cache key. Bump it when the cached payload behind an
+# existing key changes (v2: projected results are keyed by their projection);
+# entries written under other versions are never read again and are removed
+# by remove_stale_entries().
+CACHE_KEY_VERSION = "v2"
+
+
+def hash_bytes(data: bytes) -> str:
+    """Return the SHA-256 hex digest of a byte string"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Content-addressed cache of Document Intelligence analyze results
+
+    Entries are keyed by the SHA-256 of the uploaded bytes plus the model id,
+    so re-uploading the same file never spends analysis quota twice. A bounded
+    in-memory LRU sits over a JSON file store on local disk. Entries are
+    kept as JSON text and parsed on every hit, so each caller gets its own
+    copy and later changes to a result never reach the cache.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: Optional[int] = None):
+        """Initialize the cache from environment settings"""
+        self.enabled = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+        self.cache_dir = cache_dir or os.getenv("EXTRACTION_CACHE_DIR", os.path.join(BACKEND_DIR, "cache", "extractions"))
+        self.max_entries = max_entries or int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "256"))
+
+        # Cache key -> JSON text of the result
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._cleanup: Optional[asyncio.Task] = None
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "stale_removed": 0
+        }
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            logger.info(f"Extraction cache initialized at {self.cache_dir} (max {self.max_entries} in memory)")
+
+    @staticmethod
+    def make_key(content_hash: str, model_id: str) -> str:
+        """Build the cache key for a document hash and model id"""
+        return f"{CACHE_KEY_VERSION}-{model_id}-{content_hash}"
+
+    async def get(self, content_hash: str, model_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached analyze result
+
+        Args:
+            content_hash: SHA-256 of the document bytes
+            model_id: Document Intelligence model the result was produced with
+
+        Returns:
+            The cached analyzeResult, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = self.make_key(content_hash, model_id)
+        text = self._memory.get(key)
+        if text is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return await asyncio.to_thread(json.loads, text)
+
+        entry = await asyncio.to_thread(self._read, key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        text, result = entry
+        self.stats["disk_hits"] += 1
+        self._remember(key, text)
+        return result
+
+    async def put(self, content_hash: str, model_id: str, result: Dict[str, Any]) -> None:
+        """
+        Store an analyze result
+
+        Args:
+            content_hash: SHA-256 of the document bytes
+            model_id: Document Intelligence model the result was produced with
+            result: The analyzeResult to cache
+        """
+        if not self.enabled:
+            return
+
+        key = self.make_key(content_hash, model_id)
+        text = await asyncio.to_thread(json.dumps, result)
+        self._remember(key, text)
+        try:
+            await asyncio.to_thread(self._write, key, text)
+            self.stats["stores"] += 1
+        except OSError as e:
+            logger.error(f"Error writing extraction cache entry: {str(e)}")
+
+    def schedule_cleanup(self) -> None:
+        """Remove entries of older key versions in the background (once per process)"""
+        if self.enabled and self._cleanup is None:
+            self._cleanup = asyncio.create_task(self.remove_stale_entries())
+
+    async def remove_stale_entries(self) -> int:
+        """
+        Delete disk entries written under another CACHE_KEY_VERSION, and
+        temporary files left behind by interrupted writes
+
+        Returns:
+            Number of files removed
+        """
+        try:
+            removed = await asyncio.to_thread(self._remove_stale)
+        except OSError as e:
+            logger.warning(f"Could not clean up the extraction cache: {str(e)}")
+            return 0
+        self.stats["stale_removed"] += removed
+        if removed:
+            logger.info(f"Removed {removed} stale extraction cache entries")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current hit rate"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
+
+    def _remember(self, key: str, text: str) -> None:
+        """Insert into the in-memory LRU, evicting the oldest entry"""
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        """Disk location for a cache key (sharded by hash prefix)"""
+        content_hash = key.rsplit("-", 1)[-1]
+        return os.path.join(self.cache_dir, content_hash[:2], f"{key}.json")
+
+    def _read(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return the JSON text and parsed result of a disk entry (blocking; run in a worker thread)"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            return text, json.loads(text)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable extraction cache entry {path}: {str(e)}")
+            return None
+
+    def _remove_stale(self) -> int:
+        """Delete stale entries (blocking; run in a worker thread)"""
+        prefix = f"{CACHE_KEY_VERSION}-"
+        stale_tmp_before = time.time() - 3600
+        removed = 0
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    stale = entry.stat().st_mtime < stale_tmp_before
+                else:
+                    stale = entry.name.endswith(".json") and not entry.name.startswith(prefix)
+                if stale:
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
+
+    def _write(self, key: str, text: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Return the process-wide extraction cache"""
+    global _cache
+    if _cache is None:
+        _cache = ExtractionCache()
+    return _cache
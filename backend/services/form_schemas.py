@@ -0,0 +1,306 @@
+import re
+import logging
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from services.compact_table import CompactTable
+from services.result_projection import (
+    ResultProjection, PAGE_TEXT_PATHS, KEY_VALUE_PATHS, DOCUMENT_FIELD_PATHS, TABLE_PATHS
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_key(key: str) -> str:
+    """Default key normalizer: "First Name " -> "first_name" """
+    return key.strip().replace(" ", "_").lower()
+
+
+class FormSchema:
+    r"""Declarative extraction rules for one document type
+
+    Text fields are declared as (label, value pattern) pairs, e.g.
+    ("ZIP Code", r"\d{5}"): the value is the first match of the pattern within
+    50 characters after the literal label. All labels are compiled once into a
+    single scanner, so the document text is searched in one pass.
+
+    Schemas with local_text_layer set are first read from the PDF text layer
+    and only sent to Document Intelligence when that is missing or sparse.
+
+    Schemas with acroform_fields set are first read from the fillable fields
+    of the PDF: acroform_fields maps each field to the AcroForm field names it
+    may be stored under, and the document is only analyzed remotely when a
+    field in acroform_required is missing or fewer than acroform_min_fields
+    fields are filled. Filled fields that map to no schema field are not
+    schema fields; the form layout returns them under unmapped_fields. An
+    empty acroform_fields takes every filled field as a key/value pair.
+
+    Only the parts of the analyzeResult the schema reads (its projection)
+    are materialized when the analysis response is parsed.
+
+    page_markers are form titles that identify the form's pages when a
+    multi-form packet is split; together with classifier_keywords they let
+    the document classifier recognize the form from its first page.
+
+    Layouts:
+        form  - {"document_type", "fields_detected", "fields", "tables"},
+                plus "unmapped_fields" for fillable forms with extra fields
+        flat  - a single dict of field name -> value
+        pages - {"content": [{"page_number", "text"}], "key_value_pairs"}
+    """
+
+    def __init__(self, document_type: str, title: str, model_id: str = "prebuilt-document",
+                 layout: str = "flat", text_fields: Optional[Dict[str, Tuple[str, str]]] = None,
+                 key_value_pairs: bool = True, document_fields: bool = False,
+                 tables: bool = False, local_text_layer: bool = False,
+                 acroform_fields: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 acroform_required: Tuple[str, ...] = (), acroform_min_fields: int = 1,
+                 page_markers: Tuple[str, ...] = (), classifier_keywords: Tuple[str, ...] = (),
+                 key_normalizer: Callable[[str], str] = normalize_key):
+        self.document_type = document_type
+        self.title = title
+        self.model_id = model_id
+        self.layout = layout
+        self.text_fields = text_fields or {}
+        self.key_value_pairs = key_value_pairs
+        self.document_fields = document_fields
+        self.tables = tables
+        self.local_text_layer = local_text_layer
+        self.acroform_fields = acroform_fields
+        self.acroform_required = acroform_required
+        self.acroform_min_fields = acroform_min_fields
+        self.page_markers = page_markers
+        self.classifier_keywords = classifier_keywords
+        self.key_normalizer = key_normalizer
+
+        # Compiled once: one scanner over all labels, one anchored pattern per field
+        self.field_patterns = {
+            field: re.compile(re.escape(label) + r".{0,50}?(" + value + ")")
+            for field, (label, value) in self.text_fields.items()
+        }
+        labels = sorted({label for label, _ in self.text_fields.values()}, key=len, reverse=True)
+        # Longest labels first, so the scanner reports the longest label at a position
+        self.scanner = re.compile("|".join(re.escape(label) for label in labels)) if labels else None
+        self.fields_within = {label: self._fields_within(label) for label in labels}
+
+        # The analyzeResult paths extract_with_schema reads
+        paths = []
+        if self.text_fields or layout == "pages":
+            paths.extend(PAGE_TEXT_PATHS)
+        if key_value_pairs or layout == "pages":
+            paths.extend(KEY_VALUE_PATHS)
+        if document_fields:
+            paths.extend(DOCUMENT_FIELD_PATHS)
+        if tables:
+            paths.extend(TABLE_PATHS)
+        self.projection = ResultProjection(paths)
+
+    def _fields_within(self, label: str) -> List[Tuple[int, str]]:
+        """
+        Fields whose label may start inside a label the scanner reports
+
+        The scanner consumes each label it reports, so shorter labels sharing
+        its start, labels nested in it and labels overlapping its end are
+        looked up from this table instead of being scanned for again.
+
+        Returns:
+            (offset in the label, field) pairs, in offset order
+        """
+        return [
+            (offset, field)
+            for offset in range(len(label))
+            for field, (other, _) in self.text_fields.items()
+            if label.startswith(other, offset) or other.startswith(label[offset:])
+        ]
+
+    def scan(self, text: str) -> Dict[str, str]:
+        """Return the first value of every text field, in a single pass over the text"""
+        found: Dict[str, str] = {}
+        if self.scanner is None:
+            return found
+        for hit in self.scanner.finditer(text):
+            for offset, field in self.fields_within[hit.group()]:
+                if field not in found:
+                    match = self.field_patterns[field].match(text, hit.start() + offset)
+                    if match:
+                        found[field] = match.group(1).strip()
+            if len(found) == len(self.text_fields):
+                break
+        return found
+
+
+def page_text(page: Dict[str, Any]) -> str:
+    """Join a page's lines into one string"""
+    return "".join(line["content"] + "\n" for line in page.get("lines", []))
+
+
+def document_text(pages: List[Dict[str, Any]]) -> str:
+    """Join the lines of all pages into one string (the same text as joining each page_text)"""
+    lines = [line["content"] for page in pages for line in page.get("lines", [])]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def extract_key_value_pairs(result: Dict[str, Any],
+                            key_normalizer: Callable[[str], str] = normalize_key) -> Dict[str, str]:
+    """Collect normalized key/value pairs from an analyzeResult"""
+    pairs = {}
+    for pair in result.get("keyValuePairs", []):
+        key = pair.get("key")
+        value = pair.get("value")
+        if not key or not value:
+            continue
+        clean_key = key_normalizer(key.get("content", ""))
+        clean_value = value.get("content", "").strip()
+        if clean_key and clean_value:
+            pairs[clean_key] = clean_value
+    return pairs
+
+
+def extract_document_fields(result: Dict[str, Any]) -> Dict[str, str]:
+    """Collect the typed fields of the first analyzed document"""
+    documents = result.get("documents") or [{}]
+    return {
+        name: field.get("content", "") if field else ""
+        for name, field in documents[0].get("fields", {}).items()
+    }
+
+
+def extract_tables(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Collect the tables of an analyzeResult in compact columnar form"""
+    return [CompactTable.from_analyze_table(table).to_json() for table in result.get("tables", [])]
+
+
+def extract_with_schema(schema: FormSchema, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract structured data from an analyzeResult using a form schema
+
+    Args:
+        schema: Form schema for the document type
+        result: analyzeResult payload from Document Intelligence
+
+    Returns:
+        Extracted data in the schema's layout
+    """
+    pages = result.get("pages", [])
+
+    if schema.layout == "pages":
+        return {
+            "content": [
+                {"page_number": page.get("pageNumber"), "text": page_text(page)}
+                for page in pages
+            ],
+            "key_value_pairs": extract_key_value_pairs(result, schema.key_normalizer)
+        }
+
+    fields: Dict[str, Any] = {}
+    if schema.scanner is not None:
+        fields.update(schema.scan(document_text(pages)))
+    if schema.document_fields:
+        fields.update(extract_document_fields(result))
+    if schema.key_value_pairs:
+        fields.update(extract_key_value_pairs(result, schema.key_normalizer))
+
+    if schema.layout == "form":
+        extracted = {
+            "document_type": schema.title,
+            "fields_detected": len(fields),
+            "fields": fields,
+            "tables": extract_tables(result) if schema.tables else []
+        }
+        if result.get("unmappedFields"):
+            extracted["unmapped_fields"] = result["unmappedFields"]
+        return extracted
+
+    return fields
+
+
+# Form schema registry
+FORM_SCHEMAS: Dict[str, FormSchema] = {}
+
+
+def register_form_schema(schema: FormSchema) -> FormSchema:
+    """Add (or replace) the schema for a document type"""
+    FORM_SCHEMAS[schema.document_type] = schema
+    return schema
+
+
+def get_form_schema(document_type: str) -> FormSchema:
+    """Return the schema for a document type, falling back to generic"""
+    return FORM_SCHEMAS.get(document_type, FORM_SCHEMAS["generic"])
+
+
+register_form_schema(FormSchema(
+    document_type="i9",
+    title="I-9 Form",
+    layout="form",
+    text_fields={
+        "last_name": ("Last Name", r"[A-Za-z\- ]+"),
+        "first_name": ("First Name", r"[A-Za-z\- ]+"),
+        "middle_initial": ("Middle Initial", r"[A-Za-z]"),
+        "address": ("Address", r"[A-Za-z0-9\- ,\.]+"),
+        "apt_number": ("Apt. Number", r"[A-Za-z0-9\- ]+"),
+        "city": ("City", r"[A-Za-z\- ]+"),
+        "state": ("State", r"[A-Z]{2}"),
+        "zip_code": ("ZIP Code", r"\d{5}"),
+        "ssn": ("Social Security Number", r"\d{3}-\d{2}-\d{4}"),
+        "email": ("E-mail Address", r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"),
+        "phone": ("Telephone Number", r"\(\d{3}\) \d{3}-\d{4}|\d{3}-\d{3}-\d{4}")
+    },
+    tables=True,  # List A/B/C documents
+    # Section 1 field names of the fillable USCIS form (2019 and 2023 editions)
+    acroform_fields={
+        "last_name": ("Last Name (Family Name)", "Last Name"),
+        "first_name": ("First Name Given Name", "First Name (Given Name)"),
+        "middle_initial": ("Employee Middle Initial (if any)", "Middle Initial"),
+        "address": ("Address Street Number and Name", "Address (Street Number and Name)"),
+        "apt_number": ("Apt Number (if any)", "Apt. Number"),
+        "city": ("City or Town",),
+        "state": ("State",),
+        "zip_code": ("ZIP Code",),
+        "ssn": ("US Social Security Number", "U.S. Social Security Number"),
+        "email": ("Employees E-mail Address", "Employee's E-mail Address"),
+        "phone": ("Telephone Number", "Employee's Telephone Number")
+    },
+    acroform_required=("last_name", "first_name", "address", "city", "state", "zip_code"),
+    page_markers=("Employment Eligibility Verification",),
+    classifier_keywords=("Form I-9", "USCIS", "Attestation", "Alien Registration Number",
+                         "List A", "Employee Middle Initial", "Social Security Number")
+))
+
+register_form_schema(FormSchema(
+    document_type="schedule_a",
+    title="Schedule A Letter",
+    # No standard template: take every filled field as a key/value pair
+    acroform_fields={},
+    acroform_min_fields=3,
+    page_markers=("Schedule A Letter", "Schedule A hiring authority", "5 CFR 213.3102"),
+    classifier_keywords=("Schedule A", "disability", "certify", "licensed medical professional",
+                         "vocational rehabilitation", "targeted disability")
+))
+
+register_form_schema(FormSchema(
+    document_type="tax_1040",
+    title="1040 Tax Form",
+    model_id="prebuilt-tax.us.1040",
+    key_value_pairs=False,
+    document_fields=True,
+    page_markers=("Individual Income Tax Return",),
+    classifier_keywords=("Form 1040", "Internal Revenue Service", "Filing Status",
+                         "Adjusted gross income", "Standard deduction", "Taxable income")
+))
+
+register_form_schema(FormSchema(
+    document_type="job_application",
+    title="Job Application",
+    local_text_layer=True,
+    page_markers=("Application for Employment",),
+    classifier_keywords=("Job Application", "Position Applied For", "Employment History",
+                         "Desired Salary", "References", "Date Available")
+))
+
+register_form_schema(FormSchema(
+    document_type="generic",
+    title="Generic Document",
+    layout="pages",
+    local_text_layer=True
+))
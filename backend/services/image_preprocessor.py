@@ -0,0 +1,185 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from typing import Dict, Any, Optional, Tuple
+
+# Conditionally import the imaging libraries
+try:
+    from PIL import Image, ImageOps, ImageSequence
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    logging.warning("Pillow not available. Uploads will be analyzed without image pre-processing.")
+
+try:
+    from pypdf import PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Formats rewritten as a single grayscale JPEG
+SINGLE_PAGE_FORMATS = {"JPEG", "PNG", "WEBP", "BMP", "GIF"}
+
+
+def _prepare_image(image: "Image.Image", max_dimension: int, grayscale: bool) -> "Image.Image":
+    """Auto-orient, downsample and (optionally) convert one page image"""
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L" if grayscale else "RGB")
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return image
+
+
+def preprocess_file(file_path: str, output_base: str, max_dimension: int, jpeg_quality: int,
+                    grayscale: bool) -> Dict[str, Any]:
+    """
+    Shrink a photo, scan or image-only PDF to what the OCR model needs
+
+    Runs in a worker process, so it only takes and returns picklable values.
+
+    Args:
+        file_path: Path to the uploaded document
+        output_base: Path (without extension) to write the result to
+        max_dimension: Longest side, in pixels, of each page image
+        jpeg_quality: JPEG quality of the recompressed images
+        grayscale: Whether to convert pages to grayscale
+
+    Returns:
+        Stats with format, pages, input_bytes, output_bytes and output_path
+        (None when the document was left unchanged)
+    """
+    stats: Dict[str, Any] = {
+        "format": None,
+        "pages": 0,
+        "input_bytes": os.path.getsize(file_path),
+        "output_bytes": None,
+        "output_path": None
+    }
+
+    with open(file_path, "rb") as f:
+        is_pdf = f.read(5) == b"%PDF-"
+
+    if is_pdf:
+        if not PYPDF_AVAILABLE:
+            return stats
+        stats["format"] = "PDF"
+        output_path = output_base + ".pdf"
+        writer = PdfWriter(clone_from=file_path)
+        stats["pages"] = len(writer.pages)
+        changed = False
+        for page in writer.pages:
+            for embedded in page.images:
+                image = embedded.image
+                if max(image.size) <= max_dimension and (image.mode == "L" or not grayscale):
+                    continue
+                embedded.replace(_prepare_image(image, max_dimension, grayscale), quality=jpeg_quality)
+                changed = True
+        if not changed:
+            return stats
+        with open(output_path, "wb") as f:
+            writer.write(f)
+    else:
+        with Image.open(file_path) as image:
+            stats["format"] = image.format
+            frames = [
+                _prepare_image(frame.copy(), max_dimension, grayscale)
+                for frame in ImageSequence.Iterator(image)
+            ]
+        stats["pages"] = len(frames)
+        if stats["format"] in SINGLE_PAGE_FORMATS and len(frames) == 1:
+            output_path = output_base + ".jpg"
+            frames[0].save(output_path, "JPEG", quality=jpeg_quality, optimize=True)
+        else:
+            # Multi-page TIFFs (and anything else) become a multi-page PDF of JPEG pages
+            output_path = output_base + ".pdf"
+            frames[0].save(output_path, "PDF", save_all=True, append_images=frames[1:],
+                           quality=jpeg_quality)
+
+    output_bytes = os.path.getsize(output_path)
+    if output_bytes >= stats["input_bytes"]:
+        os.remove(output_path)
+        return stats
+
+    stats["output_bytes"] = output_bytes
+    stats["output_path"] = output_path
+    return stats
+
+
+class ImagePreprocessor:
+    """Shrinks uploads before they are sent for analysis
+
+    Phone photos and scans are auto-oriented, downsampled, converted to
+    grayscale and recompressed in a process pool, so the CPU-heavy work stays
+    off the event loop. The original upload is left untouched for storage.
+    """
+
+    def __init__(self):
+        """Initialize the pre-processor from environment settings"""
+        self.enabled = PIL_AVAILABLE and os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+        self.workers = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "2"))
+        self.min_bytes = int(os.getenv("IMAGE_PREPROCESS_MIN_BYTES", str(1024 * 1024)))
+        self.max_dimension = int(os.getenv("IMAGE_MAX_DIMENSION", "2500"))
+        self.jpeg_quality = int(os.getenv("IMAGE_JPEG_QUALITY", "80"))
+        self.grayscale = os.getenv("IMAGE_GRAYSCALE", "true").lower() == "true"
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def preprocess(self, file_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Pre-process a document if it is large enough to be worth it
+
+        Args:
+            file_path: Path to the uploaded document
+
+        Returns:
+            (path to analyze, stats or None if the stage was skipped). The
+            caller removes the returned path when it differs from file_path.
+        """
+        if not self.enabled or os.path.getsize(file_path) < self.min_bytes:
+            return file_path, None
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            stats = await loop.run_in_executor(
+                self._pool, preprocess_file, file_path, f"{file_path}.prepared",
+                self.max_dimension, self.jpeg_quality, self.grayscale
+            )
+        except Exception as e:
+            logger.warning(f"Image pre-processing failed, analyzing the original: {str(e)}")
+            return file_path, None
+        stats["elapsed"] = round(time.perf_counter() - start, 3)
+
+        output_path = stats.pop("output_path")
+        if output_path is None:
+            return file_path, stats
+        logger.info(f"Pre-processed {stats['format']} upload: {stats['input_bytes']} -> {stats['output_bytes']} bytes")
+        return output_path, stats
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_preprocessor: Optional[ImagePreprocessor] = None
+
+
+def get_image_preprocessor() -> ImagePreprocessor:
+    """Return the process-wide image pre-processor"""
+    global _preprocessor
+    if _preprocessor is None:
+        _preprocessor = ImagePreprocessor()
+    return _preprocessor
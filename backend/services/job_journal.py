@@ -0,0 +1,216 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from typing import Dict, Any, List, Optional
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default locations are under the backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Job statuses that still need work after a restart
+UNFINISHED_STATUSES = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stage TEXT,
+    file_path TEXT NOT NULL,
+    content_hash TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    job TEXT NOT NULL,
+    partial TEXT NOT NULL DEFAULT '{}',
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS operations (
+    content_hash TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    pages TEXT NOT NULL,
+    operation_location TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    PRIMARY KEY (content_hash, model_id, pages)
+);
+"""
+
+
+class JobJournal:
+    """SQLite journal of document jobs and in-flight analysis operations
+
+    Jobs are checkpointed as they move through the pipeline, together with
+    the partial results of finished stages. Submitted analyses are recorded
+    by upload hash, model and page range with their Operation-Location, so a
+    job resumed after a restart polls the analysis it already paid for
+    instead of submitting the document again.
+
+    All methods block; call them from a worker thread.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Open (or create) the journal database"""
+        self.enabled = os.getenv("DOCUMENT_JOB_JOURNAL_ENABLED", "true").lower() == "true"
+        self.path = path or os.getenv("DOCUMENT_JOB_JOURNAL_PATH", os.path.join(BACKEND_DIR, "cache", "document_jobs.db"))
+
+        # Analysis results are kept by the service for 24 hours
+        self.operation_ttl = timedelta(hours=float(os.getenv("DOCUMENT_OPERATION_TTL_HOURS", "23")))
+
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the database connection, creating the schema on first use"""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def save_job(self, job: Dict[str, Any], file_path: str, partial: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Insert or update a job checkpoint
+
+        Args:
+            job: The job record
+            file_path: Path to the spooled upload
+            partial: Results of finished stages to merge into the checkpoint
+        """
+        if not self.enabled:
+            return
+        now = datetime.utcnow().isoformat()
+        content_hash = job.get("analysis", {}).get("content_hash")
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT partial FROM jobs WHERE job_id = ?", (job["job_id"],)).fetchone()
+            merged = json.loads(row[0]) if row else {}
+            merged.update(partial or {})
+            db.execute(
+                "INSERT OR REPLACE INTO jobs "
+                "(job_id, status, stage, file_path, content_hash, attempts, job, partial, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job["job_id"], job["status"], job["stage"], file_path, content_hash, job.get("attempts", 0),
+                 json.dumps(job, default=str), json.dumps(merged, default=str), now)
+            )
+
+    def delete_job(self, job_id: str) -> None:
+        """Forget a job that was never accepted"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._connect().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the last checkpointed record of a job"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._connect().execute("SELECT job FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def unfinished_jobs(self) -> List[Dict[str, Any]]:
+        """
+        Return jobs that were queued or running when the process stopped
+
+        Returns:
+            Dicts with job, file_path and partial, oldest first
+        """
+        if not self.enabled:
+            return []
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT job, file_path, partial FROM jobs WHERE status IN (?, ?) ORDER BY rowid",
+                UNFINISHED_STATUSES
+            ).fetchall()
+        return [
+            {"job": json.loads(job), "file_path": file_path, "partial": json.loads(partial)}
+            for job, file_path, partial in rows
+        ]
+
+    def prune(self, keep: int) -> None:
+        """Delete the oldest finished jobs beyond the most recent `keep`"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._connect().execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND rowid NOT IN "
+                "(SELECT rowid FROM jobs ORDER BY rowid DESC LIMIT ?)",
+                (*UNFINISHED_STATUSES, keep)
+            )
+
+    def get_operation(self, content_hash: str, model_id: str, pages: Optional[str] = None) -> Optional[str]:
+        """
+        Return the Operation-Location of an analysis still held by the service
+
+        Args:
+            content_hash: SHA-256 of the document
+            model_id: Document Intelligence model
+            pages: Page selection of the analysis (None for the whole document)
+
+        Returns:
+            The operation URL, or None if there is no recent submission
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT operation_location, submitted_at FROM operations "
+                "WHERE content_hash = ? AND model_id = ? AND pages = ?",
+                (content_hash, model_id, pages or "")
+            ).fetchone()
+        if row is None:
+            return None
+        if datetime.utcnow() - datetime.fromisoformat(row[1]) > self.operation_ttl:
+            self.delete_operation(content_hash, model_id, pages)
+            return None
+        return row[0]
+
+    def save_operation(self, content_hash: str, model_id: str, pages: Optional[str],
+                       operation_location: str) -> None:
+        """Record a submitted analysis"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO operations VALUES (?, ?, ?, ?, ?)",
+                (content_hash, model_id, pages or "", operation_location, datetime.utcnow().isoformat())
+            )
+
+    def delete_operation(self, content_hash: str, model_id: str, pages: Optional[str] = None) -> None:
+        """Forget a finished or expired analysis"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._connect().execute(
+                "DELETE FROM operations WHERE content_hash = ? AND model_id = ? AND pages = ?",
+                (content_hash, model_id, pages or "")
+            )
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_journal: Optional[JobJournal] = None
+
+
+def get_job_journal() -> JobJournal:
+    """Return the process-wide job journal"""
+    global _journal
+    if _journal is None:
+        _journal = JobJournal()
+    return _journal
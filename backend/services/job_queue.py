@@ -0,0 +1,446 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+
+from services.job_journal import get_job_journal
+from services.submission_scheduler import FairQueue, set_submitter
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def remove_upload(file_path: str) -> None:
+    """Delete a spooled upload and its per-upload directory"""
+    try:
+        os.remove(file_path)
+        os.rmdir(os.path.dirname(file_path))
+    except OSError:
+        pass
+
+
+class DocumentJobQueue:
+    """Bounded background worker pool for the document processing pipeline
+
+    Uploads are accepted as jobs and run through DocumentService (analyze and
+    extract) and StorageService (save file, save metadata) by a fixed number of
+    workers, so request latency no longer depends on analysis time. Workers
+    take queued jobs the way analyses are admitted: interactive before bulk
+    (with bulk's share) and round-robin across coaches.
+
+    Jobs are checkpointed to the job journal with the results of each
+    finished stage. On startup, jobs that were queued or running when the
+    process stopped are resumed from their last checkpoint. Failed jobs are
+    retried with back-off; after DOCUMENT_JOB_MAX_ATTEMPTS attempts they are
+    moved to the dead_letter state.
+    """
+
+    def __init__(self, document_service, storage_service, workers: Optional[int] = None,
+                 max_queue_size: Optional[int] = None):
+        """Initialize the queue with the services that make up the pipeline"""
+        self.document_service = document_service
+        self.storage_service = storage_service
+
+        self.workers = workers or int(os.getenv("DOCUMENT_JOB_WORKERS", "4"))
+        self.max_queue_size = max_queue_size or int(os.getenv("DOCUMENT_JOB_QUEUE_SIZE", "100"))
+        self.max_finished_jobs = int(os.getenv("DOCUMENT_JOB_HISTORY", "1000"))
+        self.batch_concurrency = int(os.getenv("DOCUMENT_BATCH_CONCURRENCY", "8"))
+        self.max_attempts = int(os.getenv("DOCUMENT_JOB_MAX_ATTEMPTS", "3"))
+        self.retry_delay = float(os.getenv("DOCUMENT_JOB_RETRY_DELAY", "5"))
+
+        self.journal = get_job_journal()
+
+        self._queue: Optional[FairQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: set = set()
+        self._finished_since_prune = 0
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._done: Dict[str, asyncio.Event] = {}
+
+    async def start(self) -> None:
+        """Start the worker pool"""
+        if self._tasks:
+            return
+        self._queue = FairQueue(self.max_queue_size, key=self._queue_key)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Document job queue started with {self.workers} workers")
+        await self._resume()
+
+    async def stop(self) -> None:
+        """Cancel the worker pool (interrupted jobs resume on the next start)"""
+        tasks = self._tasks + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._retries.clear()
+
+    async def _resume(self) -> None:
+        """Re-queue journaled jobs that did not finish before the last shutdown"""
+        try:
+            entries = await asyncio.to_thread(self.journal.unfinished_jobs)
+        except Exception as e:
+            logger.error(f"Could not read the document job journal: {str(e)}")
+            return
+
+        resumed = 0
+        for entry in entries:
+            job, file_path, partial = entry["job"], entry["file_path"], entry["partial"]
+            self._jobs[job["job_id"]] = job
+            self._done[job["job_id"]] = asyncio.Event()
+
+            needs_upload = "extracted_fields" not in partial or "file_url" not in partial
+            if needs_upload and not os.path.exists(file_path):
+                job["error"] = "Upload no longer available"
+            elif job.get("attempts", 0) >= self.max_attempts:
+                job["error"] = job.get("error") or f"Interrupted {job['attempts']} times"
+            else:
+                job["status"] = "queued"
+                try:
+                    self._queue.put_nowait((job, file_path, time.perf_counter(), partial))
+                except asyncio.QueueFull:
+                    # Stays journaled as queued and is picked up on the next start
+                    self._forget(job["job_id"])
+                    continue
+                resumed += 1
+                continue
+
+            await self._finish(job, file_path, "dead_letter")
+
+        if entries:
+            logger.info(f"Resumed {resumed} of {len(entries)} unfinished document jobs")
+        await self._prune_journal()
+
+    async def submit(self, file_path: str, client_id: str, document_type: str,
+                     original_file_name: str, user_id: str, priority: str = "interactive") -> Dict[str, Any]:
+        """
+        Queue an uploaded document for processing
+
+        Args:
+            file_path: Path to the spooled upload (removed when the job finishes)
+            client_id: ID of the client
+            document_type: Type of document
+            original_file_name: Name of the uploaded file
+            user_id: ID of the user who uploaded the document
+            priority: Scheduling class of the analysis ("interactive" or "bulk")
+
+        Returns:
+            The new job record
+
+        Raises:
+            asyncio.QueueFull: If the queue is at capacity
+        """
+        await self.start()
+
+        job = self._create_job(client_id, document_type, original_file_name, user_id, priority)
+        if self._queue.full():
+            self._forget(job["job_id"])
+            raise asyncio.QueueFull()
+
+        # Journal the job before a worker can pick it up
+        await self._checkpoint(job, file_path)
+        try:
+            self._queue.put_nowait((job, file_path, time.perf_counter(), {}))
+        except asyncio.QueueFull:
+            self._forget(job["job_id"])
+            await asyncio.to_thread(self.journal.delete_job, job["job_id"])
+            raise
+
+        logger.info(f"Queued document job {job['job_id']} ({document_type}) for client {client_id}")
+        return job
+
+    async def run_batch(self, uploads: List[Dict[str, Any]],
+                        concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process several uploads concurrently, yielding each job as it finishes
+
+        Batch jobs bypass the shared queue and are bounded by their own
+        semaphore, so total time is close to that of the slowest document.
+
+        Args:
+            uploads: Dicts with file_path, client_id, document_type,
+                original_file_name, user_id and optionally priority
+                (defaults to "bulk")
+            concurrency: Maximum number of documents processed at once
+                (capped at DOCUMENT_BATCH_CONCURRENCY)
+
+        Yields:
+            Finished job records (with their batch_index), in completion order
+        """
+        await self.start()
+        limit = min(concurrency, self.batch_concurrency) if concurrency else self.batch_concurrency
+        semaphore = asyncio.Semaphore(limit)
+
+        async def run_one(job: Dict[str, Any], file_path: str) -> Dict[str, Any]:
+            queued_at = time.perf_counter()
+            try:
+                async with semaphore:
+                    await self._execute(job, file_path, queued_at, {})
+                # A failed attempt is retried on the shared queue
+                await self._done[job["job_id"]].wait()
+            except asyncio.CancelledError:
+                job["status"] = "cancelled"
+                # Shielded so the journal write completes even if the batch is torn down again
+                await asyncio.shield(self._checkpoint(job, file_path))
+                remove_upload(file_path)
+                raise
+            return job
+
+        jobs = []
+        tasks = []
+        try:
+            for index, upload in enumerate(uploads):
+                job = self._create_job(upload["client_id"], upload["document_type"],
+                                       upload["original_file_name"], upload["user_id"],
+                                       upload.get("priority", "bulk"))
+                job["batch_index"] = index
+                jobs.append(job)
+                await self._checkpoint(job, upload["file_path"])
+                tasks.append(asyncio.create_task(run_one(job, upload["file_path"])))
+
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Stop outstanding work if the caller goes away mid-batch
+            for task in tasks:
+                task.cancel()
+            # Jobs the caller left before they were started, and uploads it left before they became jobs
+            for job, upload in zip(jobs[len(tasks):], uploads[len(tasks):]):
+                job["status"] = "cancelled"
+                await asyncio.shield(self._checkpoint(job, upload["file_path"]))
+            for upload in uploads[len(tasks):]:
+                remove_upload(upload["file_path"])
+
+    def _create_job(self, client_id: str, document_type: str, original_file_name: str,
+                    user_id: str, priority: str = "interactive") -> Dict[str, Any]:
+        """Build and register a new job record"""
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "stage": None,
+            "client_id": client_id,
+            "document_type": document_type,
+            "original_file_name": original_file_name,
+            "processed_by": user_id,
+            "priority": priority,
+            "created_at": datetime.utcnow().isoformat(),
+            "completed_at": None,
+            "attempts": 0,
+            "timings": {},
+            "analysis": {},
+            "result": None,
+            "error": None
+        }
+
+        self._jobs[job_id] = job
+        self._done[job_id] = asyncio.Event()
+        self._trim_history()
+        return job
+
+    @staticmethod
+    def _queue_key(item: Tuple[Dict[str, Any], str, float, Dict[str, Any]]) -> Tuple[str, str]:
+        """Coach and priority class of a queued (job, file_path, queued_at, partial) item"""
+        job = item[0]
+        return job["processed_by"], job.get("priority", "interactive")
+
+    def _forget(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        self._done.pop(job_id, None)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job record by ID, falling back to the journal for older jobs"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = await asyncio.to_thread(self.journal.get_job, job_id)
+        return job
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a job to finish
+
+        Args:
+            job_id: ID of the job
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The job record (possibly still running if the timeout elapsed)
+        """
+        event = self._done.get(job_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return await self.get_job(job_id)
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job, file_path, queued_at, partial = await self._queue.get()
+            try:
+                await self._execute(job, file_path, queued_at, partial)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Dict[str, Any], file_path: str, queued_at: float,
+                       partial: Dict[str, Any]) -> None:
+        """Run one attempt of a job, then finish it or schedule a retry"""
+        job["timings"]["queued"] = round(time.perf_counter() - queued_at, 3)
+        job["attempts"] = job.get("attempts", 0) + 1
+        try:
+            await self._run(job, file_path, partial)
+        except Exception as e:
+            logger.error(f"Document job {job['job_id']} failed at stage {job['stage']} "
+                         f"(attempt {job['attempts']} of {self.max_attempts}): {str(e)}")
+            job["error"] = str(e)
+            if job["attempts"] < self.max_attempts:
+                job["status"] = "queued"
+                await self._checkpoint(job, file_path, partial)
+                self._schedule_retry(job, file_path, partial)
+            else:
+                await self._finish(job, file_path, "dead_letter")
+            return
+        job["error"] = None
+        await self._finish(job, file_path, "succeeded")
+
+    async def _finish(self, job: Dict[str, Any], file_path: str, status: str) -> None:
+        """Record a job's final state and clean up its upload"""
+        job["status"] = status
+        job["stage"] = None
+        job["completed_at"] = datetime.utcnow().isoformat()
+        await self._checkpoint(job, file_path)
+        remove_upload(file_path)
+        event = self._done.get(job["job_id"])
+        if event is not None:
+            event.set()
+
+        self._finished_since_prune += 1
+        if self._finished_since_prune >= 100:
+            await self._prune_journal()
+
+    async def _prune_journal(self) -> None:
+        """Drop the oldest finished jobs from the journal beyond the history limit"""
+        self._finished_since_prune = 0
+        try:
+            await asyncio.to_thread(self.journal.prune, self.max_finished_jobs)
+        except Exception as e:
+            logger.warning(f"Could not prune the document job journal: {str(e)}")
+
+    def _schedule_retry(self, job: Dict[str, Any], file_path: str, partial: Dict[str, Any]) -> None:
+        """Re-queue a failed job after an exponential back-off"""
+        delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+
+        async def requeue() -> None:
+            await asyncio.sleep(delay)
+            await self._queue.put((job, file_path, time.perf_counter(), partial))
+
+        task = asyncio.create_task(requeue())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _checkpoint(self, job: Dict[str, Any], file_path: str,
+                          partial: Optional[Dict[str, Any]] = None) -> None:
+        """Journal the job's state and the results of its finished stages"""
+        # Snapshot the mutable parts; the job keeps changing while the write runs
+        snapshot = dict(job, timings=dict(job["timings"]), analysis=dict(job["analysis"]))
+        try:
+            await asyncio.to_thread(self.journal.save_job, snapshot, file_path, dict(partial or {}))
+        except Exception as e:
+            logger.warning(f"Could not journal document job {job['job_id']}: {str(e)}")
+
+    async def _run(self, job: Dict[str, Any], file_path: str, partial: Dict[str, Any]) -> None:
+        """
+        Run one job through the processing pipeline, timing each stage
+
+        Stages whose results are already in `partial` (from an earlier attempt
+        or from the journal) are skipped.
+        """
+        job["status"] = "running"
+        document_id = partial.setdefault("document_id", str(uuid.uuid4()))
+        await self._checkpoint(job, file_path, partial)
+
+        # The spooled file is read independently by the analysis submission and
+        # the blob upload, so both stream it concurrently in bounded chunks
+        job["stage"] = "analyze"
+        analysis = asyncio.ensure_future(self._analyze_stage(job, file_path, partial))
+        upload = asyncio.ensure_future(self._save_file_stage(job, file_path, partial))
+        try:
+            extracted_fields, file_url = await asyncio.gather(analysis, upload)
+        except BaseException:
+            analysis.cancel()
+            upload.cancel()
+            raise
+
+        # The classifier may have routed the document to a different type
+        job["document_type"] = partial.get("document_type", job["document_type"])
+
+        job["stage"] = "save_data"
+        await self._timed(
+            job, "save_data",
+            self.storage_service.save_document_data(
+                job["client_id"], job["document_type"], extracted_fields,
+                job["original_file_name"], job["processed_by"], document_id=document_id,
+                thumbnail_url=partial.get("thumbnail_url"), blob_url=file_url
+            )
+        )
+
+        job["result"] = {
+            "document_id": document_id,
+            "document_type": job["document_type"],
+            "extracted_fields": extracted_fields,
+            "file_url": file_url,
+            "thumbnail_url": partial.get("thumbnail_url")
+        }
+
+    async def _analyze_stage(self, job: Dict[str, Any], file_path: str, partial: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze and extract the document, unless an earlier attempt already did"""
+        if "extracted_fields" not in partial:
+            # Analyses started from here are scheduled for this coach and class
+            set_submitter(job["processed_by"], job.get("priority", "interactive"))
+            partial["extracted_fields"] = await self._timed(
+                job, "analyze",
+                self.document_service.process_document(file_path, job["document_type"], job["analysis"])
+            )
+            partial["document_type"] = job["analysis"].get("document_type", job["document_type"])
+            await self._checkpoint(job, file_path, partial)
+        return partial["extracted_fields"]
+
+    async def _save_file_stage(self, job: Dict[str, Any], file_path: str, partial: Dict[str, Any]) -> str:
+        """Upload the document file and its thumbnail, unless an earlier attempt already did"""
+        if "file_url" not in partial:
+            partial["file_url"] = await self._timed(
+                job, "save_file",
+                self.storage_service.save_document_file(
+                    file_path, job["client_id"], partial["document_id"], partial
+                )
+            )
+            await self._checkpoint(job, file_path, partial)
+        return partial["file_url"]
+
+    async def _timed(self, job: Dict[str, Any], stage: str, coro) -> Any:
+        """Await a pipeline stage and record how long it took"""
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            job["timings"][stage] = round(time.perf_counter() - start, 3)
+
+    def _trim_history(self) -> None:
+        """Forget the oldest finished jobs beyond the history limit"""
+        excess = len(self._jobs) - self.max_finished_jobs
+        if excess <= 0:
+            return
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id]["status"] in ("succeeded", "dead_letter", "cancelled"):
+                self._forget(job_id)
+                excess -= 1
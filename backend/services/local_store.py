@@ -0,0 +1,318 @@
+import os
+import json
+import shutil
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+from services.storage_backend import StorageBackend
+from services.pagination import InvalidCursorError
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default locations are under the backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Documents are listed newest first. Both indexes end in (processed_at, id),
+# so a page, with or without a document type, is a single index range scan.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    client_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    document_type TEXT,
+    processed_at TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL,
+    PRIMARY KEY (client_id, id)
+);
+CREATE INDEX IF NOT EXISTS documents_client_processed ON documents (client_id, processed_at, id);
+CREATE INDEX IF NOT EXISTS documents_client_type ON documents (client_id, document_type, processed_at, id);
+"""
+
+
+class LocalStore(StorageBackend):
+    """Clients and document metadata in SQLite, document files on the local filesystem
+
+    For demo, local development and on-prem installs without Azure. The
+    database runs in WAL mode: writes go through one connection, while each
+    worker thread reads through its own connection, so list queries run
+    concurrently with each other and with writes. Pages resume from the
+    last key of the previous page (keyset pagination) instead of an offset,
+    so deep pages cost the same as the first.
+    """
+
+    name = "local"
+    title = "Local SQLite storage"
+    source = "local"
+    stores_files = True
+
+    def __init__(self, path: Optional[str] = None, files_dir: Optional[str] = None):
+        """Initialize the store from environment settings (the database is opened on first use)"""
+        self.path = path or os.getenv("LOCAL_STORAGE_PATH", os.path.join(BACKEND_DIR, "data", "storage.db"))
+        self.files_dir = files_dir or os.getenv("LOCAL_STORAGE_FILES_DIR", os.path.join(BACKEND_DIR, "data", "files"))
+        # Items fetched per query when a list is streamed or no page size is given
+        self.page_size = int(os.getenv("LOCAL_STORAGE_PAGE_SIZE", "100"))
+
+        self._write_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._readers = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+
+    @property
+    def available(self) -> bool:
+        """The local store needs no credentials"""
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA busy_timeout=5000")
+        self._connections.append(connection)
+        return connection
+
+    def _write_connection(self) -> sqlite3.Connection:
+        """Return the writer connection, creating the database and schema on first use"""
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._writer = self._connect()
+            self._writer.execute("PRAGMA journal_mode=WAL")
+            self._writer.execute("PRAGMA synchronous=NORMAL")
+            self._writer.executescript(SCHEMA)
+            logger.info(f"Local storage database opened: {self.path}")
+        return self._writer
+
+    def _read_connection(self) -> sqlite3.Connection:
+        """Return this thread's reader connection"""
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            with self._write_lock:
+                self._write_connection()
+                connection = self._connect()
+            connection.execute("PRAGMA query_only=ON")
+            self._readers.connection = connection
+        return connection
+
+    def _fetch(self, query: str, parameters: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+        """Run a read query (blocking; run in a worker thread)"""
+        return self._read_connection().execute(query, parameters).fetchall()
+
+    def _write(self, query: str, parameters: Tuple[Any, ...]) -> None:
+        """Run a write statement (blocking; run in a worker thread)"""
+        with self._write_lock:
+            self._write_connection().execute(query, parameters)
+
+    async def _client_page(self, limit: Optional[int],
+                           continuation: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of clients by id, after the id in the continuation token"""
+        limit = limit or self.page_size
+        rows = await asyncio.to_thread(
+            self._fetch, "SELECT id, body FROM clients WHERE id > ? ORDER BY id LIMIT ?",
+            (continuation or "", limit + 1)
+        )
+        next_token = rows[limit - 1][0] if len(rows) > limit else None
+        return [json.loads(body) for _, body in rows[:limit]], next_token
+
+    async def _document_page(self, client_id: str, limit: Optional[int], continuation: Optional[str],
+                             document_type: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of a client's documents, newest first, after the (processed_at, id) in the token"""
+        limit = limit or self.page_size
+        conditions = ["client_id = ?"]
+        parameters: List[Any] = [client_id]
+        if document_type:
+            conditions.append("document_type = ?")
+            parameters.append(document_type)
+        if continuation:
+            try:
+                processed_at, document_id = json.loads(continuation)
+            except (ValueError, TypeError):
+                raise InvalidCursorError("Invalid cursor")
+            conditions.append("(processed_at, id) < (?, ?)")
+            parameters.extend([processed_at, document_id])
+        rows = await asyncio.to_thread(
+            self._fetch,
+            f"SELECT processed_at, id, body FROM documents WHERE {' AND '.join(conditions)} "
+            "ORDER BY processed_at DESC, id DESC LIMIT ?",
+            (*parameters, limit + 1)
+        )
+        next_token = json.dumps(list(rows[limit - 1][:2])) if len(rows) > limit else None
+        return [json.loads(body) for _, _, body in rows[:limit]], next_token
+
+    async def list_clients(self) -> List[Dict[str, Any]]:
+        """
+        Get all clients
+
+        Returns:
+            List of client records
+        """
+        rows = await asyncio.to_thread(self._fetch, "SELECT body FROM clients ORDER BY id", ())
+        return [json.loads(body) for (body,) in rows]
+
+    async def list_clients_page(self, limit: Optional[int] = None,
+                                continuation: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of clients
+
+        Args:
+            limit: Maximum number of clients in the page
+            continuation: Continuation token of the previous page
+
+        Returns:
+            (clients, continuation token of the next page or None)
+        """
+        return await self._client_page(limit, continuation)
+
+    async def iter_clients(self, continuation: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all clients, starting after a continuation token"""
+        while True:
+            clients, continuation = await self._client_page(None, continuation)
+            for client in clients:
+                yield client
+            if continuation is None:
+                return
+
+    async def get_client(self, client_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a specific client
+
+        Args:
+            client_id: ID of the client
+
+        Returns:
+            The client record, or None if it does not exist
+        """
+        rows = await asyncio.to_thread(self._fetch, "SELECT body FROM clients WHERE id = ?", (client_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    async def upsert_client(self, client: Dict[str, Any]) -> None:
+        """Insert or replace a client record"""
+        await asyncio.to_thread(
+            self._write, "INSERT OR REPLACE INTO clients (id, body) VALUES (?, ?)",
+            (client["id"], json.dumps(client, default=str))
+        )
+
+    async def get_client_documents(self, client_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the document metadata of a client
+
+        Args:
+            client_id: ID of the client
+
+        Returns:
+            List of document metadata, newest first
+        """
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT body FROM documents WHERE client_id = ? ORDER BY processed_at DESC, id DESC",
+            (client_id,)
+        )
+        return [json.loads(body) for (body,) in rows]
+
+    async def get_client_documents_page(self, client_id: str, limit: Optional[int] = None,
+                                        continuation: Optional[str] = None, document_type: Optional[str] = None
+                                        ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of a client's document metadata, newest first
+
+        Args:
+            client_id: ID of the client
+            limit: Maximum number of documents in the page
+            continuation: Continuation token of the previous page
+            document_type: Only return documents of this type
+
+        Returns:
+            (documents, continuation token of the next page or None)
+
+        Raises:
+            InvalidCursorError: If the continuation token is malformed
+        """
+        return await self._document_page(client_id, limit, continuation, document_type)
+
+    async def iter_client_documents(self, client_id: str, continuation: Optional[str] = None,
+                                    document_type: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a client's document metadata, starting after a continuation token"""
+        while True:
+            documents, continuation = await self._document_page(client_id, None, continuation, document_type)
+            for document in documents:
+                yield document
+            if continuation is None:
+                return
+
+    async def get_document(self, client_id: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata of a specific document
+
+        Args:
+            client_id: ID of the client the document belongs to
+            document_id: ID of the document
+
+        Returns:
+            The document metadata, or None if it does not exist
+        """
+        rows = await asyncio.to_thread(
+            self._fetch, "SELECT body FROM documents WHERE client_id = ? AND id = ?", (client_id, document_id)
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def upsert_document(self, document: Dict[str, Any]) -> None:
+        """Insert or replace document metadata"""
+        await asyncio.to_thread(
+            self._write,
+            "INSERT OR REPLACE INTO documents (client_id, id, document_type, processed_at, body) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (document["client_id"], document["id"], document.get("document_type"),
+             document.get("processed_at") or "", json.dumps(document, default=str))
+        )
+
+    def _copy_file(self, file_path: str, blob_name: str) -> str:
+        """Copy a file under the files directory (blocking; run in a worker thread)"""
+        destination = Path(self.files_dir, *blob_name.split("/")).resolve()
+        if not destination.is_relative_to(Path(self.files_dir).resolve()):
+            raise ValueError(f"Invalid file name: {blob_name}")
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(file_path, destination)
+        return destination.as_uri()
+
+    async def save_file(self, file_path: str, blob_name: str) -> str:
+        """
+        Keep a copy of a document file under the files directory
+
+        Args:
+            file_path: Path to the file
+            blob_name: Name the file would have in Blob Storage ({client_id}/{document_id}/{name})
+
+        Returns:
+            file:// URL of the copy
+        """
+        return await asyncio.to_thread(self._copy_file, file_path, blob_name)
+
+    async def close(self) -> None:
+        """Close the database connections"""
+        with self._write_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+            self._writer = None
+            self._readers = threading.local()
+
+
+_store: Optional[LocalStore] = None
+
+
+def get_local_store() -> LocalStore:
+    """Return the process-wide local store"""
+    global _store
+    if _store is None:
+        _store = LocalStore()
+    return _store
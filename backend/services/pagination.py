@@ -0,0 +1,61 @@
+import json
+import base64
+import binascii
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+
+class InvalidCursorError(ValueError):
+    """A cursor or continuation token that could not be decoded"""
+
+
+def encode_cursor(token: Optional[str]) -> Optional[str]:
+    """Wrap a continuation token in a URL-safe cursor (None when there are no more pages)"""
+    if token is None:
+        return None
+    return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    """
+    Unwrap a cursor returned by encode_cursor
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise InvalidCursorError("Invalid cursor")
+
+
+def paginate(items: List[Dict[str, Any]], limit: Optional[int],
+             token: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Page through an in-memory list the way the Cosmos DB store pages queries
+
+    Args:
+        items: All items
+        limit: Page size (the rest of the list if None)
+        token: Continuation token of a previous page (the item offset)
+
+    Returns:
+        (items of the page, continuation token of the next page or None)
+    """
+    try:
+        start = int(token) if token else 0
+    except ValueError:
+        raise InvalidCursorError("Invalid cursor")
+    end = len(items) if limit is None else start + limit
+    return items[start:end], str(end) if end < len(items) else None
+
+
+async def ndjson_lines(items: Union[AsyncIterator[Dict[str, Any]], Iterable[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """Serialize items as newline-delimited JSON, one line per item as it arrives"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield json.dumps(item) + "\n"
+    else:
+        for item in items:
+            yield json.dumps(item) + "\n"
@@ -0,0 +1,127 @@
+import os
+import logging
+from dotenv import load_dotenv
+from typing import Dict, List, Optional
+
+from services.pdf_text_layer import PdfTextLayerExtractor
+from services.acroform import AcroFormExtractor
+
+# Conditionally import the local PDF library
+try:
+    from pypdf import PdfReader
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class PdfContent:
+    """One upload's PDF, parsed once and shared by the classifier and the local tiers
+
+    Parsing a PDF (cross-reference table, object streams, page tree) is the
+    costly part of reading it locally, so a job opens its upload once: the
+    classifier reads the first page's text and fields, the AcroForm tier the
+    filled fields and the text-layer tier every page, all from the same
+    reader. Page text is extracted on demand and kept, so the first page is
+    never extracted twice.
+
+    Blocking; call its methods from a worker thread, one at a time.
+    """
+
+    def __init__(self, file_path: str, text_layer: PdfTextLayerExtractor, acroform: AcroFormExtractor):
+        """Wrap an upload; the file is not opened until something is read"""
+        self.file_path = file_path
+        self.text_layer = text_layer
+        self.acroform = acroform
+
+        self._reader: Optional["PdfReader"] = None
+        self._opened = False
+        self._page_count: Optional[int] = None
+        self._lines: List[List[str]] = []
+        self._form_values: Optional[Dict[str, str]] = None
+        self._form_read = False
+
+    def _open(self) -> Optional["PdfReader"]:
+        """Return the reader, parsing the file on first use (None if it is not a readable PDF)"""
+        if self._opened:
+            return self._reader
+        self._opened = True
+        if not PYPDF_AVAILABLE or not (self.text_layer.enabled or self.acroform.enabled):
+            return None
+        with open(self.file_path, "rb") as f:
+            if f.read(5) != b"%PDF-":
+                return None
+        try:
+            reader = PdfReader(self.file_path)
+            if reader.is_encrypted:
+                return None
+            self._page_count = len(reader.pages)
+        except Exception as e:
+            logger.warning(f"Could not read PDF {os.path.basename(self.file_path)}: {str(e)}")
+            return None
+        self._reader = reader
+        return reader
+
+    def page_lines(self, page_limit: Optional[int] = None) -> Optional[List[List[str]]]:
+        """
+        Read the non-empty text lines of every page, however sparse
+
+        Args:
+            page_limit: Only read this many leading pages
+
+        Returns:
+            One list of lines per page, or None if the text layer cannot be read
+        """
+        if not self.text_layer.enabled:
+            return None
+        reader = self._open()
+        if self._page_count is None or self._page_count > self.text_layer.max_pages:
+            return None
+
+        wanted = self._page_count if page_limit is None else min(page_limit, self._page_count)
+        if len(self._lines) < wanted:
+            if reader is None:
+                # Closed before these pages were read
+                return None
+            try:
+                for page in reader.pages[len(self._lines):wanted]:
+                    self._lines.append(self.text_layer.page_lines(page))
+            except Exception as e:
+                logger.warning(f"Could not read PDF text layer of {os.path.basename(self.file_path)}: {str(e)}")
+                return None
+        return self._lines[:wanted]
+
+    def form_values(self) -> Optional[Dict[str, str]]:
+        """Filled form fields by field name, or None if there are none"""
+        if not self.acroform.enabled:
+            return None
+        if not self._form_read:
+            reader = self._open()
+            if reader is None:
+                return None
+            self._form_values = self.acroform.read_fields(reader)
+            self._form_read = True
+        return self._form_values
+
+    def first_page_fields(self) -> List[str]:
+        """Names of the filled form fields on the first page"""
+        if not self.acroform.enabled:
+            return []
+        reader = self._open()
+        if reader is None or not self._page_count:
+            return []
+        try:
+            return list(self.acroform.read_page_fields(reader.pages[0]))
+        except Exception as e:
+            logger.warning(f"Could not read form fields of {os.path.basename(self.file_path)}: {str(e)}")
+            return []
+
+    def close(self) -> None:
+        """Drop the parsed file; text and fields already read stay available"""
+        self._opened = True
+        self._reader = None
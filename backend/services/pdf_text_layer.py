@@ -0,0 +1,96 @@
+import os
+import re
+import logging
+from dotenv import load_dotenv
+from typing import Dict, Any, List, Optional
+
+# Conditionally import the local PDF library
+try:
+    import pypdf  # noqa: F401
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+    logging.warning("pypdf not available. Local PDF text extraction will be disabled.")
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# "Label: value" lines in born-digital forms
+KEY_VALUE_LINE = re.compile(r"^\s*([A-Za-z][A-Za-z0-9 /#&().'-]{0,60}?)\s*:\s*(\S.*?)\s*$")
+
+
+class PdfTextLayerExtractor:
+    """Reads the embedded text layer of born-digital PDFs locally
+
+    Pages are read through PdfContent, which parses each upload once. Produces an analyzeResult-shaped payload (pages, lines and key/value
+    pairs) so the form schemas can extract from it exactly as they would from
+    a Document Intelligence response. Sparseness is judged per page, so a
+    caller can OCR just the scanned pages of an otherwise born-digital PDF.
+    """
+
+    def __init__(self):
+        """Initialize the extractor from environment settings"""
+        self.enabled = PYPDF_AVAILABLE and os.getenv("PDF_TEXT_LAYER_ENABLED", "true").lower() == "true"
+        self.min_chars_per_page = int(os.getenv("PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE", "200"))
+        self.max_pages = int(os.getenv("PDF_TEXT_LAYER_MAX_PAGES", "200"))
+
+    def sparse_pages(self, page_lines: List[List[str]]) -> List[int]:
+        """
+        Find the pages whose text layer is too sparse to extract from
+
+        Args:
+            page_lines: One list of lines per page, as returned by PdfContent.page_lines()
+
+        Returns:
+            Page numbers (1-based) with fewer than min_chars_per_page characters,
+            typically scanned pages inserted into a born-digital PDF
+        """
+        return [
+            page_number for page_number, lines in enumerate(page_lines, start=1)
+            if sum(len(line) for line in lines) < self.min_chars_per_page
+        ]
+
+    def build_result(self, page_lines: List[List[str]],
+                     page_numbers: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Build an analyzeResult-shaped dict from text layer lines
+
+        Args:
+            page_lines: One list of lines per page, as returned by PdfContent.page_lines()
+            page_numbers: Only include these pages (1-based; all pages if omitted)
+
+        Returns:
+            The pages, content and key/value-like lines of the selected pages
+        """
+        selected = set(page_numbers) if page_numbers is not None else None
+        pages: List[Dict[str, Any]] = []
+        key_value_pairs: List[Dict[str, Any]] = []
+        content: List[str] = []
+        for page_number, lines in enumerate(page_lines, start=1):
+            if selected is not None and page_number not in selected:
+                continue
+            pages.append({"pageNumber": page_number, "lines": [{"content": line} for line in lines]})
+            content.extend(lines)
+            for line in lines:
+                match = KEY_VALUE_LINE.match(line)
+                if match:
+                    key_value_pairs.append({
+                        "key": {"content": match.group(1)},
+                        "value": {"content": match.group(2)}
+                    })
+
+        return {
+            "modelId": "local-text-layer",
+            "content": "\n".join(content),
+            "pages": pages,
+            "keyValuePairs": key_value_pairs
+        }
+
+    @staticmethod
+    def page_lines(page) -> List[str]:
+        """Non-empty text lines of one page of an open PDF"""
+        return [line.strip() for line in (page.extract_text() or "").splitlines() if line.strip()]
+
@@ -0,0 +1,82 @@
+import os
+import json
+import logging
+import threading
+from dotenv import load_dotenv
+from typing import Dict, Optional
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default locations are under the backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ProvisionedMarker:
+    """Local record of storage resources already known to exist
+
+    Creating a container or database "if not exists" costs a round trip per
+    resource on every cold start. Once a resource has been created (or found),
+    its key is written to a small JSON file, and later processes skip the
+    check. Keys are cleared again when a resource turns out to be missing.
+    Delete the file to force the checks.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize the marker from environment settings"""
+        self.path = path or os.getenv("STORAGE_PROVISIONED_MARKER", os.path.join(BACKEND_DIR, "cache", "provisioned.json"))
+        self._lock = threading.Lock()
+        self._keys: Optional[Dict[str, bool]] = None
+
+    def _load(self) -> Dict[str, bool]:
+        if self._keys is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._keys = json.load(f)
+            except (OSError, ValueError):
+                self._keys = {}
+        return self._keys
+
+    def _save(self) -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._keys, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # Without the marker the next start simply checks again
+            logger.warning(f"Could not write provisioned marker: {str(e)}")
+
+    def is_provisioned(self, key: str) -> bool:
+        """Whether a resource is recorded as existing"""
+        with self._lock:
+            return self._load().get(key, False)
+
+    def mark(self, key: str) -> None:
+        """Record that a resource exists"""
+        with self._lock:
+            self._load()[key] = True
+            self._save()
+
+    def clear(self, key: str) -> None:
+        """Forget a resource that turned out to be missing"""
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+
+_marker: Optional[ProvisionedMarker] = None
+
+
+def get_provisioned_marker() -> ProvisionedMarker:
+    """Return the process-wide provisioned marker"""
+    global _marker
+    if _marker is None:
+        _marker = ProvisionedMarker()
+    return _marker
@@ -0,0 +1,143 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cached marker for a lookup that found nothing
+_MISSING = object()
+
+
+class ReadThroughCache:
+    """In-memory read-through cache for slowly changing records
+
+    Entries live for a TTL and are evicted least-recently-used beyond a size
+    bound. Lookups that find nothing are cached too, for a shorter TTL, so
+    repeated requests for a missing record do not each cost a query. While
+    a key is loading, further lookups for it wait on the same load instead
+    of starting their own (single flight). Writers invalidate the keys they
+    change; a load that overlaps an invalidation is returned but not cached.
+    """
+
+    def __init__(self, name: str, ttl: float, negative_ttl: float, max_entries: int, enabled: bool = True):
+        """
+        Initialize the cache
+
+        Args:
+            name: Name used in logs
+            ttl: Seconds a loaded record is served from the cache
+            negative_ttl: Seconds a "not found" result is served from the cache
+            max_entries: Maximum number of cached keys
+            enabled: Whether to cache at all (loads still run single flight)
+        """
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+
+        # key -> (value, loaded_at, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._hit_ages = deque(maxlen=1000)
+        self.stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "invalidations": 0,
+            "evictions": 0
+        }
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """
+        Return a cached record, loading it on a miss
+
+        Args:
+            key: Cache key
+            loader: Coroutine function that fetches the record (None if missing)
+
+        Returns:
+            The record, or None if it does not exist
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, loaded_at, expires_at = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._hit_ages.append(now - loaded_at)
+                if value is _MISSING:
+                    self.stats["negative_hits"] += 1
+                    return None
+                self.stats["hits"] += 1
+                return value
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Waiters re-raise it; don't warn when there are none
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        else:
+            # An invalidation during the load drops the in-flight marker: don't cache stale data
+            if self.enabled and self._inflight.get(key) is future:
+                self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _store(self, key: str, value: Optional[Any]) -> None:
+        """Cache a loaded value (or its absence) and enforce the size bound"""
+        now = time.monotonic()
+        if value is None:
+            if self.negative_ttl <= 0:
+                return
+            self._entries[key] = (_MISSING, now, now + self.negative_ttl)
+        else:
+            self._entries[key] = (value, now, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key: str) -> None:
+        """Drop a key, including any load of it that is still in flight"""
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+        self.stats["invalidations"] += 1
+        logger.debug(f"Invalidated {self.name} cache entry: {key}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, the hit rate and the age of served entries"""
+        # Coalesced lookups count as hits: they did not start a query of their own
+        hits = self.stats["hits"] + self.stats["negative_hits"] + self.stats["coalesced"]
+        lookups = hits + self.stats["misses"]
+        ages = sorted(self._hit_ages)
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "ttl": self.ttl,
+            # Staleness: how old cached records were when served
+            "hit_age_p50": round(ages[len(ages) // 2], 3) if ages else 0.0,
+            "hit_age_max": round(ages[-1], 3) if ages else 0.0
+        }
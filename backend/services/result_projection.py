@@ -0,0 +1,142 @@
+import json
+import hashlib
+import logging
+from typing import Dict, Any, AsyncIterator, Iterable, Optional, Tuple
+
+# Conditionally import the incremental JSON parser
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+    logging.warning("ijson not available. Analysis results will be parsed whole and then projected.")
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ResultProjection:
+    """The parts of an analyzeResult a document processor reads
+
+    Paths are dotted, relative to analyzeResult, with "item" for array
+    elements and "*" for any object key, e.g. "pages.item.lines.item.content"
+    or "documents.item.fields.*.content". Everything not on a path (words,
+    spans, polygons, ...) is skipped while the response is parsed.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths = tuple(sorted(set(paths)))
+        self._leaves = [path.split(".") for path in self.paths]
+        self._allowed: Dict[str, bool] = {}
+
+    @property
+    def key(self) -> str:
+        """Short stable identifier of the projection, for cache keys"""
+        return hashlib.sha1(",".join(self.paths).encode("utf-8")).hexdigest()[:12]
+
+    def allows(self, path: str) -> bool:
+        """Whether a path is on the way to, or inside, a projected path"""
+        allowed = self._allowed.get(path)
+        if allowed is None:
+            segments = path.split(".")
+            allowed = any(
+                all(leaf_segment in ("*", segment) for leaf_segment, segment in zip(leaf, segments))
+                for leaf in self._leaves
+            )
+            self._allowed[path] = allowed
+        return allowed
+
+    def apply(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Project an already-parsed analyzeResult
+
+        Args:
+            result: The full analyzeResult
+
+        Returns:
+            A new dict with only the projected paths
+        """
+        return self._prune(result, "")
+
+    def _prune(self, value: Any, path: str) -> Any:
+        if isinstance(value, dict):
+            pruned = {}
+            for key, item in value.items():
+                child = f"{path}.{key}" if path else key
+                if self.allows(child):
+                    pruned[key] = self._prune(item, child)
+            return pruned
+        if isinstance(value, list):
+            child = f"{path}.item" if path else "item"
+            return [self._prune(item, child) for item in value]
+        return value
+
+    async def parse_operation(self, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Incrementally parse an analyze operation response
+
+        Top-level fields (status, error, ...) are kept; inside analyzeResult
+        only the projected paths are materialized.
+
+        Args:
+            chunks: The response body as an async byte stream
+
+        Returns:
+            The operation object with a projected analyzeResult
+        """
+        if not IJSON_AVAILABLE:
+            body = b"".join([chunk async for chunk in chunks])
+            operation = json.loads(body) if body else {}
+            if "analyzeResult" in operation:
+                operation["analyzeResult"] = self.apply(operation["analyzeResult"])
+            return operation
+
+        builder = ObjectBuilder()
+        skipping: Optional[str] = None
+        async for prefix, event, value in ijson.parse_async(_ByteStream(chunks), use_float=True):
+            if skipping is not None:
+                if prefix == skipping or prefix.startswith(skipping + "."):
+                    continue
+                skipping = None
+
+            if event == "map_key" and (prefix == "analyzeResult" or prefix.startswith("analyzeResult.")):
+                path = f"{prefix}.{value}"[len("analyzeResult."):]
+                if not self.allows(path):
+                    skipping = f"{prefix}.{value}"
+                    continue
+            builder.event(event, value)
+
+        return builder.value if isinstance(getattr(builder, "value", None), dict) else {}
+
+
+class _ByteStream:
+    """File-like adapter that lets ijson read from an async byte iterator"""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._buffer = b""
+
+    async def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += await self._chunks.__anext__()
+            except StopAsyncIteration:
+                break
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+# Path groups used by the form schemas
+PAGE_TEXT_PATHS: Tuple[str, ...] = ("pages.item.pageNumber", "pages.item.lines.item.content")
+KEY_VALUE_PATHS: Tuple[str, ...] = ("keyValuePairs.item.key.content", "keyValuePairs.item.value.content")
+DOCUMENT_FIELD_PATHS: Tuple[str, ...] = ("documents.item.fields.*.content",)
+TABLE_PATHS: Tuple[str, ...] = (
+    "tables.item.rowCount", "tables.item.columnCount", "tables.item.cells.item.rowIndex",
+    "tables.item.cells.item.columnIndex", "tables.item.cells.item.rowSpan",
+    "tables.item.cells.item.columnSpan", "tables.item.cells.item.content"
+)
+
@@ -0,0 +1,259 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, unquote
+from dotenv import load_dotenv
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+# Conditionally import Azure services
+try:
+    from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
+    BLOB_SDK_AVAILABLE = True
+except ImportError:
+    BLOB_SDK_AVAILABLE = False
+    logging.warning("Azure Blob Storage SDK not available. Document URLs will not be signed.")
+
+try:
+    from azure.identity import DefaultAzureCredential
+    IDENTITY_AVAILABLE = True
+except ImportError:
+    IDENTITY_AVAILABLE = False
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# SAS start times are backdated, so clocks slightly behind the service's still accept them
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+class SignedUrlService:
+    """Read-only SAS URLs for document blobs
+
+    Signing a SAS is a local HMAC over the blob name; the only service call
+    is fetching a user-delegation key, when the account is reached with an
+    Entra ID credential instead of an account key. That key is cached until
+    shortly before it expires, and each signed URL is memoized until shortly
+    before its own expiry, so listing a page of documents signs only the
+    blobs not seen recently, all in one pass.
+    """
+
+    def __init__(self):
+        """Initialize the signer from environment settings"""
+        self.connection_string = os.getenv("AZURE_BLOB_CONNECTION_STRING") or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+        # Used with an Entra ID credential when there is no connection string
+        self.account_url = os.getenv("AZURE_BLOB_ACCOUNT_URL")
+        self.container_name = os.getenv("AZURE_BLOB_CONTAINER_NAME") or os.getenv("AZURE_STORAGE_CONTAINER_NAME", "documents")
+        # How long a signed URL is valid
+        self.url_ttl = float(os.getenv("SIGNED_URL_TTL", "3600"))
+        # Cached URLs and keys are replaced this long before they expire
+        self.refresh_margin = float(os.getenv("SIGNED_URL_REFRESH_MARGIN", "300"))
+        # How long a user-delegation key is requested for (at most 7 days)
+        self.delegation_key_ttl = float(os.getenv("SIGNED_URL_DELEGATION_KEY_TTL", "86400"))
+        self.max_entries = int(os.getenv("SIGNED_URL_CACHE_MAX_ENTRIES", "10000"))
+
+        self._service_client: Optional["BlobServiceClient"] = None
+        self._credential = None
+        self._account_key: Optional[str] = None
+        self._delegation_key = None
+        self._delegation_key_expiry = 0.0
+        self._key_lock = asyncio.Lock()
+        # blob name -> (signed URL, epoch seconds it expires at)
+        self._urls: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.stats = {
+            "signed": 0,
+            "memo_hits": 0,
+            "delegation_key_fetches": 0
+        }
+
+        if not BLOB_SDK_AVAILABLE:
+            self.mode = None
+        elif self.connection_string:
+            # Account key connection strings (including Azurite's) sign without any service call
+            self.mode = "account_key" if self._parse_account_key() else None
+        elif self.account_url and IDENTITY_AVAILABLE:
+            self.mode = "user_delegation"
+        else:
+            self.mode = None
+
+    @property
+    def available(self) -> bool:
+        """Whether document URLs can be signed"""
+        return self.mode is not None
+
+    def _parse_account_key(self) -> bool:
+        """Read the account key out of the connection string (no network round trip)"""
+        try:
+            self._service_client = BlobServiceClient.from_connection_string(self.connection_string)
+        except ValueError as e:
+            logger.error(f"Invalid Azure Blob Storage connection string: {str(e)}")
+            return False
+        self._account_key = getattr(self._service_client.credential, "account_key", None)
+        return bool(self._account_key)
+
+    @property
+    def service_client(self) -> "BlobServiceClient":
+        """Blob service client, created on first use"""
+        if self._service_client is None:
+            self._credential = DefaultAzureCredential()
+            self._service_client = BlobServiceClient(self.account_url, credential=self._credential)
+        return self._service_client
+
+    @property
+    def base_url(self) -> str:
+        """URL of the documents container"""
+        return f"{self.service_client.url.rstrip('/')}/{self.container_name}"
+
+    async def _get_delegation_key(self) -> Tuple[Any, float]:
+        """Return the cached user-delegation key and its expiry, fetching a new one when it runs out"""
+        if time.time() < self._delegation_key_expiry - self.refresh_margin:
+            return self._delegation_key, self._delegation_key_expiry
+        async with self._key_lock:
+            # Another request may have refreshed the key while this one waited
+            if time.time() < self._delegation_key_expiry - self.refresh_margin:
+                return self._delegation_key, self._delegation_key_expiry
+            now = datetime.now(timezone.utc)
+            expiry = now + timedelta(seconds=self.delegation_key_ttl)
+            self._delegation_key = await asyncio.to_thread(
+                self.service_client.get_user_delegation_key,
+                key_start_time=now - CLOCK_SKEW,
+                key_expiry_time=expiry
+            )
+            self._delegation_key_expiry = expiry.timestamp()
+            self.stats["delegation_key_fetches"] += 1
+            logger.info(f"Fetched a user delegation key valid until {expiry.isoformat()}")
+            return self._delegation_key, self._delegation_key_expiry
+
+    async def sign_blobs(self, blob_names: Iterable[str]) -> Dict[str, str]:
+        """
+        Sign read-only URLs for a batch of blobs
+
+        Args:
+            blob_names: Names of blobs in the documents container
+
+        Returns:
+            Signed URL by blob name
+        """
+        now = time.time()
+        signed: Dict[str, str] = {}
+        missing: List[str] = []
+        for blob_name in dict.fromkeys(blob_names):
+            entry = self._urls.get(blob_name)
+            if entry is not None and now < entry[1] - self.refresh_margin:
+                self._urls.move_to_end(blob_name)
+                signed[blob_name] = entry[0]
+                self.stats["memo_hits"] += 1
+            else:
+                missing.append(blob_name)
+        if not missing:
+            return signed
+
+        # One credential and one expiry for the whole batch
+        expiry = now + self.url_ttl
+        if self.mode == "user_delegation":
+            delegation_key, key_expiry = await self._get_delegation_key()
+            credential = {"user_delegation_key": delegation_key}
+            # A SAS cannot outlive the key that signed it
+            expiry = min(expiry, key_expiry)
+        else:
+            credential = {"account_key": self._account_key}
+        start_time = datetime.fromtimestamp(now, timezone.utc) - CLOCK_SKEW
+        expiry_time = datetime.fromtimestamp(expiry, timezone.utc)
+
+        account_name = self.service_client.account_name
+        base_url = self.base_url
+        for blob_name in missing:
+            sas = generate_blob_sas(
+                account_name, self.container_name, blob_name,
+                permission=BlobSasPermissions(read=True),
+                start=start_time,
+                expiry=expiry_time,
+                **credential
+            )
+            url = f"{base_url}/{quote(blob_name, safe='/~')}?{sas}"
+            self._urls[blob_name] = (url, expiry)
+            self._urls.move_to_end(blob_name)
+            signed[blob_name] = url
+        self.stats["signed"] += len(missing)
+
+        while len(self._urls) > self.max_entries:
+            self._urls.popitem(last=False)
+        return signed
+
+    def blob_name_from_url(self, url: Optional[str]) -> Optional[str]:
+        """Blob name of an unsigned URL in the documents container (None for other URLs)"""
+        prefix = f"{self.base_url}/"
+        if not url or not url.startswith(prefix):
+            return None
+        return unquote(url[len(prefix):].split("?", 1)[0])
+
+    async def sign_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add signed file and thumbnail URLs to a page of document metadata
+
+        Documents record the URL of their blob as `blob_url` (files kept by
+        the local store have file:// URLs and are left as they are); older
+        documents without one are assumed to be stored under
+        `{client_id}/{id}/{original_file_name}`.
+
+        Args:
+            documents: Document metadata from Cosmos DB
+
+        Returns:
+            Copies of the documents (cached documents are shared between
+            requests) with `file_url` and `thumbnail_url` signed
+        """
+        if not self.available or not documents:
+            return documents
+
+        file_blobs = []
+        thumbnail_blobs = []
+        for doc in documents:
+            blob_name = self.blob_name_from_url(doc.get("blob_url"))
+            if blob_name is None and not doc.get("blob_url") and doc.get("original_file_name"):
+                blob_name = f"{doc.get('client_id')}/{doc.get('id')}/{os.path.basename(doc['original_file_name'])}"
+            file_blobs.append(blob_name)
+            thumbnail_blobs.append(self.blob_name_from_url(doc.get("thumbnail_url")))
+
+        signed = await self.sign_blobs(name for name in file_blobs + thumbnail_blobs if name)
+
+        results = []
+        for doc, blob_name, thumbnail_blob in zip(documents, file_blobs, thumbnail_blobs):
+            doc = dict(doc)
+            if blob_name:
+                doc["file_url"] = signed[blob_name]
+            if thumbnail_blob:
+                doc["thumbnail_url"] = signed[thumbnail_blob]
+            results.append(doc)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return signing counters and the number of memoized URLs"""
+        return {
+            **self.stats,
+            "mode": self.mode,
+            "entries": len(self._urls),
+            "url_ttl": self.url_ttl
+        }
+
+    def close(self) -> None:
+        """Release the Entra ID credential, if one was created"""
+        if self._credential is not None:
+            self._credential.close()
+            self._credential = None
+
+
+_signed_url_service: Optional[SignedUrlService] = None
+
+
+def get_signed_url_service() -> SignedUrlService:
+    """Return the process-wide signed URL service"""
+    global _signed_url_service
+    if _signed_url_service is None:
+        _signed_url_service = SignedUrlService()
+    return _signed_url_service
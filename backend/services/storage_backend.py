@@ -0,0 +1,108 @@
+import os
+import logging
+from dotenv import load_dotenv
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend:
+    """Data access for clients and document metadata
+
+    Implemented by the Cosmos DB store (`services/cosmos_store.py`) and the
+    local SQLite store (`services/local_store.py`); `STORAGE_BACKEND`
+    selects one per process. Lists can be read whole, a page at a time
+    (resuming from an opaque continuation token), or streamed.
+    """
+
+    # Backend name, reported in /metrics
+    name = ""
+    # Human-readable name, used in log and error messages
+    title = ""
+    # Value of "source" in API responses served from this backend
+    source = ""
+    # Whether document files are kept by the backend when Blob Storage is not configured
+    stores_files = False
+
+    @property
+    def available(self) -> bool:
+        """Whether the backend is configured and can be used"""
+        raise NotImplementedError
+
+    async def list_clients(self) -> List[Dict[str, Any]]:
+        """Get all clients"""
+        raise NotImplementedError
+
+    async def list_clients_page(self, limit: Optional[int] = None,
+                                continuation: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of clients, returning the continuation token of the next page or None"""
+        raise NotImplementedError
+
+    def iter_clients(self, continuation: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all clients, starting after a continuation token"""
+        raise NotImplementedError
+
+    async def get_client(self, client_id: str) -> Optional[Dict[str, Any]]:
+        """Get a specific client, or None if it does not exist"""
+        raise NotImplementedError
+
+    async def upsert_client(self, client: Dict[str, Any]) -> None:
+        """Insert or replace a client record"""
+        raise NotImplementedError
+
+    async def get_client_documents(self, client_id: str) -> List[Dict[str, Any]]:
+        """Get the document metadata of a client"""
+        raise NotImplementedError
+
+    async def get_client_documents_page(self, client_id: str, limit: Optional[int] = None,
+                                        continuation: Optional[str] = None, document_type: Optional[str] = None
+                                        ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of a client's document metadata, optionally of one document type"""
+        raise NotImplementedError
+
+    def iter_client_documents(self, client_id: str, continuation: Optional[str] = None,
+                              document_type: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a client's document metadata, starting after a continuation token"""
+        raise NotImplementedError
+
+    async def get_document(self, client_id: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get the metadata of a specific document, or None if it does not exist"""
+        raise NotImplementedError
+
+    async def upsert_document(self, document: Dict[str, Any]) -> None:
+        """Insert or replace document metadata"""
+        raise NotImplementedError
+
+    async def save_file(self, file_path: str, blob_name: str) -> str:
+        """Keep a copy of a document file, returning its URL (only if stores_files)"""
+        raise NotImplementedError
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return hit rate and staleness of any read caches"""
+        return {}
+
+    async def close(self) -> None:
+        """Release connections"""
+
+
+_backend: Optional[StorageBackend] = None
+
+
+def get_storage_backend() -> StorageBackend:
+    """Return the process-wide storage backend selected by STORAGE_BACKEND (cosmos or local)"""
+    global _backend
+    if _backend is None:
+        backend_name = os.getenv("STORAGE_BACKEND", "cosmos").lower()
+        if backend_name == "local":
+            from services.local_store import get_local_store
+            _backend = get_local_store()
+        else:
+            if backend_name != "cosmos":
+                logger.warning(f"Unknown STORAGE_BACKEND '{backend_name}', using cosmos")
+            from services.cosmos_store import get_cosmos_store
+            _backend = get_cosmos_store()
+    return _backend
@@ -1,13 +1,26 @@
 import os
+import asyncio
 import logging
 import json
 import uuid
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import Dict, Any, List, Optional
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
-from azure.cosmos import CosmosClient, exceptions
-from azure.identity import DefaultAzureCredential
+from typing import Dict, Any, List, Optional, Tuple
+
+# Conditionally import Azure services
+try:
+    from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient, ContentSettings
+    from azure.core.exceptions import ResourceNotFoundError, ResourceExistsError
+    BLOB_SDK_AVAILABLE = True
+except ImportError:
+    BLOB_SDK_AVAILABLE = False
+    logging.warning("Azure Blob Storage SDK not available. File storage will be mocked.")
+
+from services.storage_backend import get_storage_backend
+from services.extraction_cache import hash_file
+from services.provisioning import get_provisioned_marker
+from services.thumbnails import get_thumbnail_renderer, THUMBNAIL_NAME
 
 # Load environment variables
 load_dotenv()
@@ -21,76 +34,81 @@ class StorageService:
     def __init__(self):
         """Initialize the storage service with Azure credentials"""
         # Azure Blob Storage configuration
-        self.blob_connection_string = os.getenv("AZURE_BLOB_CONNECTION_STRING")
-        self.blob_container_name = os.getenv("AZURE_BLOB_CONTAINER_NAME", "documents")
+        self.blob_connection_string = os.getenv("AZURE_BLOB_CONNECTION_STRING") or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+        self.blob_container_name = os.getenv("AZURE_BLOB_CONTAINER_NAME") or os.getenv("AZURE_STORAGE_CONTAINER_NAME", "documents")
+        # Files larger than one block are uploaded block by block, so memory stays bounded
+        self.blob_block_size = int(os.getenv("AZURE_BLOB_BLOCK_SIZE", str(4 * 1024 * 1024)))
+        # Blocks of one file staged in parallel
+        self.blob_max_concurrency = int(os.getenv("AZURE_BLOB_MAX_CONCURRENCY", "4"))
+        # Link re-uploads of bytes the client already has in storage instead of uploading them again
+        self.blob_dedup_enabled = os.getenv("AZURE_BLOB_DEDUP_ENABLED", "true").lower() == "true"
+        # Previews never change once rendered, so browsers may keep them
+        self.thumbnail_cache_control = os.getenv("THUMBNAIL_CACHE_CONTROL", "public, max-age=31536000, immutable")
+        self.thumbnail_renderer = get_thumbnail_renderer()
         
-        # Azure Cosmos DB configuration
-        self.cosmos_endpoint = os.getenv("AZURE_COSMOS_ENDPOINT")
-        self.cosmos_key = os.getenv("AZURE_COSMOS_KEY")
-        self.cosmos_database_name = os.getenv("AZURE_COSMOS_DATABASE_NAME", "job-coach-assistant")
-        self.cosmos_container_name = os.getenv("AZURE_COSMOS_CONTAINER_NAME", "documents")
+        # Document metadata goes through the shared storage backend (Cosmos DB or local SQLite)
+        self.store = get_storage_backend()
         
-        # Initialize Azure Blob Storage client
-        if self.blob_connection_string:
-            try:
-                self.blob_service_client = BlobServiceClient.from_connection_string(self.blob_connection_string)
-                
-                # Create container if it doesn't exist
-                container_exists = False
-                containers = self.blob_service_client.list_containers()
-                for container in containers:
-                    if container.name == self.blob_container_name:
-                        container_exists = True
-                        break
-                
-                if not container_exists:
-                    self.blob_service_client.create_container(self.blob_container_name)
-                
-                self.blob_container_client = self.blob_service_client.get_container_client(self.blob_container_name)
-                logger.info(f"Azure Blob Storage client initialized with container: {self.blob_container_name}")
-            except Exception as e:
-                logger.error(f"Error initializing Azure Blob Storage: {str(e)}")
-                self.blob_service_client = None
-                self.blob_container_client = None
-        else:
+        # Azure Blob Storage clients are created on first use, so construction never waits on the network
+        self.blob_configured = bool(self.blob_connection_string) and BLOB_SDK_AVAILABLE
+        self.provisioned = get_provisioned_marker()
+        self._blob_service_client = None
+        self._blob_container_client = None
+        self._blob_lock = threading.Lock()
+        if not self.blob_configured:
             logger.warning("Azure Blob Storage connection string not found")
-            self.blob_service_client = None
-            self.blob_container_client = None
         
-        # Initialize Azure Cosmos DB client
-        if self.cosmos_endpoint and self.cosmos_key:
-            try:
-                self.cosmos_client = CosmosClient(self.cosmos_endpoint, self.cosmos_key)
-                
-                # Create database if it doesn't exist
-                try:
-                    self.cosmos_database = self.cosmos_client.create_database_if_not_exists(id=self.cosmos_database_name)
-                    logger.info(f"Azure Cosmos DB database initialized: {self.cosmos_database_name}")
-                except exceptions.CosmosResourceExistsError:
-                    self.cosmos_database = self.cosmos_client.get_database_client(self.cosmos_database_name)
-                
-                # Create container if it doesn't exist
-                try:
-                    self.cosmos_container = self.cosmos_database.create_container_if_not_exists(
-                        id=self.cosmos_container_name,
-                        partition_key="/client_id"
-                    )
-                    logger.info(f"Azure Cosmos DB container initialized: {self.cosmos_container_name}")
-                except exceptions.CosmosResourceExistsError:
-                    self.cosmos_container = self.cosmos_database.get_container_client(self.cosmos_container_name)
-            except Exception as e:
-                logger.error(f"Error initializing Azure Cosmos DB: {str(e)}")
-                self.cosmos_client = None
-                self.cosmos_database = None
-                self.cosmos_container = None
-        else:
-            logger.warning("Azure Cosmos DB credentials not found")
-            self.cosmos_client = None
-            self.cosmos_database = None
-            self.cosmos_container = None
+        if not self.store.available:
+            logger.warning(f"{self.store.title} is not configured (STORAGE_BACKEND={self.store.name})")
+    
+    @property
+    def blob_service_client(self) -> "BlobServiceClient":
+        """Blob service client (built from the connection string, no network round trip)"""
+        if self._blob_service_client is None:
+            self._blob_service_client = BlobServiceClient.from_connection_string(
+                self.blob_connection_string,
+                max_single_put_size=self.blob_block_size,
+                max_block_size=self.blob_block_size
+            )
+        return self._blob_service_client
+    
+    @property
+    def blob_container_client(self) -> "ContainerClient":
+        """
+        Documents container client, creating the container on first use
+        
+        Blocking; only use it from a worker thread. The existence check is
+        made against this container only, and skipped once the container is
+        recorded in the provisioned marker.
+        """
+        if self._blob_container_client is None:
+            with self._blob_lock:
+                if self._blob_container_client is None:
+                    container_client = self.blob_service_client.get_container_client(self.blob_container_name)
+                    marker_key = self._blob_marker_key()
+                    if not self.provisioned.is_provisioned(marker_key):
+                        if not container_client.exists():
+                            try:
+                                container_client.create_container()
+                            except ResourceExistsError:
+                                pass
+                        self.provisioned.mark(marker_key)
+                    logger.info(f"Azure Blob Storage client initialized with container: {self.blob_container_name}")
+                    self._blob_container_client = container_client
+        return self._blob_container_client
+    
+    def _blob_marker_key(self) -> str:
+        return f"blob:{self.blob_service_client.account_name}/{self.blob_container_name}"
+    
+    def _reset_blob_container(self) -> None:
+        """Forget the container after it turned out to be missing, so the next use creates it"""
+        with self._blob_lock:
+            self._blob_container_client = None
+            self.provisioned.clear(self._blob_marker_key())
     
     async def save_document_data(self, client_id: str, document_type: str, data: Dict[str, Any], 
-                               original_file_name: str, user_id: str) -> str:
+                               original_file_name: str, user_id: str, document_id: Optional[str] = None,
+                               thumbnail_url: Optional[str] = None, blob_url: Optional[str] = None) -> str:
         """
         Save document data to storage
         
@@ -100,11 +118,14 @@ class StorageService:
             data: Extracted data from the document
             original_file_name: Name of the original document file
             user_id: ID of the user who processed the document
+            document_id: Optional pre-assigned document ID (generated if omitted)
+            thumbnail_url: Optional URL of the document's preview thumbnail
+            blob_url: Optional unsigned URL of the stored document file
             
         Returns:
             Document ID
         """
-        document_id = str(uuid.uuid4())
+        document_id = document_id or str(uuid.uuid4())
         timestamp = datetime.utcnow().isoformat()
         
         # Create metadata
@@ -115,31 +136,41 @@ class StorageService:
             "original_file_name": original_file_name,
             "processed_by": user_id,
             "processed_at": timestamp,
+            "thumbnail_url": thumbnail_url,
+            "blob_url": blob_url,
             "data": data
         }
         
         try:
-            # Save metadata to Cosmos DB
-            if self.cosmos_container:
-                self.cosmos_container.create_item(body=document_metadata)
-                logger.info(f"Document metadata saved to Cosmos DB: {document_id}")
+            # Save metadata to the storage backend
+            if self.store.available:
+                # Upsert, so a job replayed after a restart does not conflict with itself
+                await self.store.upsert_document(document_metadata)
+                logger.info(f"Document metadata saved to {self.store.name} storage: {document_id}")
             else:
-                # For demo purposes, log the metadata if no Cosmos DB connection
-                logger.info(f"[MOCK] Document metadata would be saved to Cosmos DB: {json.dumps(document_metadata)}")
+                # For demo purposes, log the metadata if the storage backend is not configured
+                logger.info(f"[MOCK] Document metadata would be saved to {self.store.title}: {json.dumps(document_metadata)}")
             
             return document_id
         except Exception as e:
             logger.error(f"Error saving document data: {str(e)}")
             raise
     
-    async def save_document_file(self, file_path: str, client_id: str, document_id: str) -> str:
+    async def save_document_file(self, file_path: str, client_id: str, document_id: str,
+                                 report: Optional[Dict[str, Any]] = None) -> str:
         """
-        Save document file to Blob Storage
+        Save document file to Blob Storage, along with a preview thumbnail
+        
+        The file's SHA-256 is stored as blob metadata and indexed per client.
+        When the client already has a blob with the same bytes, that blob (and
+        its thumbnail) is linked instead of uploading the file again.
         
         Args:
             file_path: Path to the document file
             client_id: ID of the client
             document_id: ID of the document
+            report: Optional dict that receives the thumbnail_url (None if the
+                document could not be previewed)
             
         Returns:
             Blob URL
@@ -148,24 +179,152 @@ class StorageService:
             # Generate a blob name using client_id and document_id
             blob_name = f"{client_id}/{document_id}/{os.path.basename(file_path)}"
             
-            if self.blob_container_client:
-                # Upload the file to Blob Storage
-                with open(file_path, "rb") as data:
-                    blob_client = self.blob_container_client.upload_blob(name=blob_name, data=data, overwrite=True)
+            if self.blob_configured:
+                content_hash = await asyncio.to_thread(hash_file, file_path)
+                
+                linked = None
+                if self.blob_dedup_enabled:
+                    linked = await asyncio.to_thread(self._find_blob_by_hash, client_id, content_hash)
+                if linked is not None:
+                    linked_blob_name, thumbnail_blob_name = linked
+                    if report is not None:
+                        report["thumbnail_url"] = self._blob_url(thumbnail_blob_name) if thumbnail_blob_name else None
+                    blob_url = self._blob_url(linked_blob_name)
+                    logger.info(f"Document file already in Blob Storage, linked: {blob_url}")
+                    return blob_url
+                
+                # Upload the file to Blob Storage, streaming it off the event loop,
+                # while the preview renders in the thumbnail process pool
+                _, thumbnail_url = await asyncio.gather(
+                    asyncio.to_thread(self._upload_file, file_path, blob_name, content_hash),
+                    self.save_document_thumbnail(file_path, client_id, document_id)
+                )
+                if report is not None:
+                    report["thumbnail_url"] = thumbnail_url
+                
+                if self.blob_dedup_enabled:
+                    thumbnail_blob_name = f"{client_id}/{document_id}/{THUMBNAIL_NAME}" if thumbnail_url else ""
+                    await asyncio.to_thread(
+                        self._index_blob_hash, client_id, content_hash, blob_name, thumbnail_blob_name
+                    )
                 
                 # Get the blob URL
-                blob_url = f"{self.blob_service_client.url}/{self.blob_container_name}/{blob_name}"
+                blob_url = self._blob_url(blob_name)
                 logger.info(f"Document file saved to Blob Storage: {blob_url}")
                 
                 return blob_url
+            elif self.store.stores_files:
+                # Keep the file and its preview with the local store
+                file_url, thumbnail_url = await asyncio.gather(
+                    self.store.save_file(file_path, blob_name),
+                    self.save_document_thumbnail(file_path, client_id, document_id)
+                )
+                if report is not None:
+                    report["thumbnail_url"] = thumbnail_url
+                logger.info(f"Document file saved to local storage: {file_url}")
+                return file_url
             else:
                 # For demo purposes, log the blob name if no Blob Storage connection
                 logger.info(f"[MOCK] Document file would be saved to Blob Storage: {blob_name}")
+                if report is not None:
+                    report["thumbnail_url"] = f"mock-url/{client_id}/{document_id}/{THUMBNAIL_NAME}"
                 return f"mock-url/{blob_name}"
         except Exception as e:
             logger.error(f"Error saving document file: {str(e)}")
             raise
     
+    async def save_document_thumbnail(self, file_path: str, client_id: str, document_id: str) -> Optional[str]:
+        """
+        Render a document's preview thumbnail and store it next to the document
+        
+        Args:
+            file_path: Path to the document file
+            client_id: ID of the client
+            document_id: ID of the document
+            
+        Returns:
+            Thumbnail URL, or None if no preview could be made
+        """
+        thumbnail_path = await self.thumbnail_renderer.render(file_path)
+        if thumbnail_path is None:
+            return None
+        
+        blob_name = f"{client_id}/{document_id}/{THUMBNAIL_NAME}"
+        try:
+            if self.blob_configured:
+                await asyncio.to_thread(self._upload_thumbnail, thumbnail_path, blob_name)
+                return self._blob_url(blob_name)
+            return await self.store.save_file(thumbnail_path, blob_name)
+        except Exception as e:
+            # A missing preview should never fail the document upload
+            logger.warning(f"Error saving document thumbnail: {str(e)}")
+            return None
+        finally:
+            os.remove(thumbnail_path)
+    
+    def _blob_url(self, blob_name: str) -> str:
+        """URL of a blob in the documents container"""
+        return f"{self.blob_service_client.url.rstrip('/')}/{self.blob_container_name}/{blob_name}"
+    
+    def _find_blob_by_hash(self, client_id: str, content_hash: str) -> Optional[Tuple[str, str]]:
+        """
+        Look up a client's blob with the given content (blocking; run in a worker thread)
+        
+        Returns:
+            (blob name, thumbnail blob name or ""), or None if the client has
+            no blob with these bytes
+        """
+        try:
+            index = self.blob_container_client.get_blob_client(f"{client_id}/_hashes/{content_hash}")
+            metadata = index.get_blob_properties().metadata
+            blob_name = metadata.get("blob_name")
+            if not blob_name:
+                return None
+            # The indexed blob may since have been replaced or deleted
+            blob = self.blob_container_client.get_blob_client(blob_name).get_blob_properties()
+        except ResourceNotFoundError:
+            return None
+        if blob.metadata.get("content_sha256") != content_hash:
+            return None
+        return blob_name, metadata.get("thumbnail_blob_name", "")
+    
+    def _index_blob_hash(self, client_id: str, content_hash: str, blob_name: str, thumbnail_blob_name: str) -> None:
+        """Record which blob holds a client's bytes (blocking; run in a worker thread)"""
+        try:
+            self.blob_container_client.upload_blob(
+                name=f"{client_id}/_hashes/{content_hash}", data=b"", overwrite=True,
+                metadata={"blob_name": blob_name, "thumbnail_blob_name": thumbnail_blob_name}
+            )
+        except Exception as e:
+            # Without the index entry the next identical upload is simply not deduplicated
+            logger.warning(f"Error indexing document file hash: {str(e)}")
+    
+    def _upload_thumbnail(self, thumbnail_path: str, blob_name: str) -> None:
+        """Upload a rendered thumbnail (blocking; run in a worker thread)"""
+        with open(thumbnail_path, "rb") as data:
+            self.blob_container_client.upload_blob(
+                name=blob_name, data=data, overwrite=True,
+                content_settings=ContentSettings(
+                    content_type="image/jpeg", cache_control=self.thumbnail_cache_control
+                )
+            )
+    
+    def _upload_file(self, file_path: str, blob_name: str, content_hash: str) -> None:
+        """Upload a file from disk as blocks staged in parallel (blocking; run in a worker thread)"""
+        for attempt in range(2):
+            try:
+                with open(file_path, "rb") as data:
+                    self.blob_container_client.upload_blob(
+                        name=blob_name, data=data, length=os.path.getsize(file_path), overwrite=True,
+                        max_concurrency=self.blob_max_concurrency, metadata={"content_sha256": content_hash}
+                    )
+                return
+            except ResourceNotFoundError:
+                # The container was deleted after it was marked provisioned: create it and retry once
+                if attempt:
+                    raise
+                self._reset_blob_container()
+    
     async def get_client_documents(self, client_id: str) -> List[Dict[str, Any]]:
         """
         Get all documents for a specific client
@@ -177,48 +336,47 @@ class StorageService:
             List of document metadata
         """
         try:
-            if self.cosmos_container:
-                # Query Cosmos DB for documents with the given client_id
-                query = f"SELECT * FROM c WHERE c.client_id = '{client_id}'"
-                items = list(self.cosmos_container.query_items(query=query, enable_cross_partition_query=True))
+            if self.store.available:
+                # Query the client's partition for its documents
+                items = await self.store.get_client_documents(client_id)
                 
                 logger.info(f"Retrieved {len(items)} documents for client: {client_id}")
                 return items
             else:
-                # Return mock data if no Cosmos DB connection
+                # Return mock data if the storage backend is not configured
                 return self._get_mock_client_documents(client_id)
         except Exception as e:
             logger.error(f"Error retrieving client documents: {str(e)}")
             return self._get_mock_client_documents(client_id)
     
-    async def get_document(self, document_id: str) -> Dict[str, Any]:
+    async def get_document(self, client_id: str, document_id: str) -> Dict[str, Any]:
         """
-        Get a specific document by ID
+        Get a specific document by client and document ID
         
         Args:
+            client_id: ID of the client the document belongs to
             document_id: ID of the document
             
         Returns:
             Document metadata
         """
         try:
-            if self.cosmos_container:
-                # Query Cosmos DB for the document with the given ID
-                query = f"SELECT * FROM c WHERE c.id = '{document_id}'"
-                items = list(self.cosmos_container.query_items(query=query, enable_cross_partition_query=True))
+            if self.store.available:
+                # Point-read the document in its client's partition
+                item = await self.store.get_document(client_id, document_id)
                 
-                if items:
+                if item:
                     logger.info(f"Retrieved document: {document_id}")
-                    return items[0]
+                    return item
                 else:
                     logger.warning(f"Document not found: {document_id}")
                     return {}
             else:
-                # Return mock data if no Cosmos DB connection
-                return self._get_mock_document(document_id)
+                # Return mock data if the storage backend is not configured
+                return self._get_mock_document(client_id, document_id)
         except Exception as e:
             logger.error(f"Error retrieving document: {str(e)}")
-            return self._get_mock_document(document_id)
+            return self._get_mock_document(client_id, document_id)
     
     def _get_mock_client_documents(self, client_id: str) -> List[Dict[str, Any]]:
         """Generate mock client documents for demonstration purposes"""
@@ -237,13 +395,14 @@ class StorageService:
                 "original_file_name": f"{doc_type}_form.pdf",
                 "processed_by": "mock-user-1",
                 "processed_at": timestamp,
+                "thumbnail_url": f"mock-url/{client_id}/{document_id}/{THUMBNAIL_NAME}",
                 "data": self._get_mock_document_data(doc_type)
             })
         
         logger.info(f"[MOCK] Retrieved {len(mock_documents)} documents for client: {client_id}")
         return mock_documents
     
-    def _get_mock_document(self, document_id: str) -> Dict[str, Any]:
+    def _get_mock_document(self, client_id: str, document_id: str) -> Dict[str, Any]:
         """Generate a mock document for demonstration purposes"""
         # Parse the document type from the ID
         if "i9" in document_id:
@@ -261,11 +420,12 @@ class StorageService:
         
         mock_document = {
             "id": document_id,
-            "client_id": "mock-client-1",
+            "client_id": client_id,
             "document_type": doc_type,
             "original_file_name": f"{doc_type}_form.pdf",
             "processed_by": "mock-user-1",
             "processed_at": timestamp,
+            "thumbnail_url": f"mock-url/{client_id}/{document_id}/{THUMBNAIL_NAME}",
             "data": self._get_mock_document_data(doc_type)
         }
         
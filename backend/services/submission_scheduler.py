@@ -0,0 +1,259 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from typing import Dict, Any, Callable, Deque, Optional, Tuple, AsyncIterator
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Priority classes, highest first
+PRIORITIES = ("interactive", "bulk")
+
+# Who the analyses started in the current task are for: (coach_id, priority)
+current_submitter: contextvars.ContextVar[Tuple[str, str]] = contextvars.ContextVar(
+    "current_submitter", default=("anonymous", "interactive")
+)
+
+
+def set_submitter(coach_id: str, priority: str) -> None:
+    """
+    Attribute analyses started by the current task (and its subtasks)
+
+    Args:
+        coach_id: ID of the coach the work is for
+        priority: "interactive" or "bulk"
+    """
+    current_submitter.set((coach_id or "anonymous", priority if priority in PRIORITIES else "interactive"))
+
+
+def next_priority(waiting: Dict[str, "OrderedDict[str, Deque[Any]]"], granted_since_bulk: int,
+                  bulk_every: int) -> Optional[str]:
+    """
+    Pick the priority class to serve next
+
+    Args:
+        waiting: priority -> coach -> waiting items
+        granted_since_bulk: Grants since bulk work was last served
+        bulk_every: One grant in every N goes to bulk work when both classes are waiting
+
+    Returns:
+        "interactive" first, except for bulk's share; None if nothing is waiting
+    """
+    classes = [priority for priority in PRIORITIES if waiting[priority]]
+    if not classes:
+        return None
+    if "bulk" in classes and granted_since_bulk + 1 >= bulk_every:
+        return "bulk"
+    return classes[0]
+
+
+class FairQueue(asyncio.Queue):
+    """asyncio.Queue that hands out items by priority class and coach
+
+    Items are taken the way the submission scheduler grants slots:
+    interactive before bulk, with bulk guaranteed one item in every
+    DOCUMENT_BULK_EVERY, and round-robin across coaches within a class, so
+    one coach's large upload does not delay everyone queued behind it.
+    """
+
+    def __init__(self, maxsize: int = 0, key: Callable[[Any], Tuple[str, str]] = lambda item: item):
+        """
+        Args:
+            maxsize: Maximum number of queued items (0 for no limit)
+            key: Returns the (coach_id, priority) of an item
+        """
+        self.key = key
+        self.bulk_every = int(os.getenv("DOCUMENT_BULK_EVERY", "5"))
+        super().__init__(maxsize)
+
+    # Storage hooks of asyncio.Queue (as overridden by PriorityQueue and LifoQueue)
+    def _init(self, maxsize: int) -> None:
+        self._waiting: Dict[str, "OrderedDict[str, Deque[Any]]"] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._size = 0
+        self._granted_since_bulk = 0
+
+    def qsize(self) -> int:
+        """Number of items in the queue"""
+        return self._size
+
+    def empty(self) -> bool:
+        """Whether the queue has no items"""
+        return self._size == 0
+
+    def _put(self, item: Any) -> None:
+        coach_id, priority = self.key(item)
+        priority = priority if priority in PRIORITIES else "interactive"
+        self._waiting[priority].setdefault(coach_id or "anonymous", deque()).append(item)
+        self._size += 1
+
+    def _get(self) -> Any:
+        priority = next_priority(self._waiting, self._granted_since_bulk, self.bulk_every)
+        coaches = self._waiting[priority]
+        coach_id, items = next(iter(coaches.items()))
+        item = items.popleft()
+        if items:
+            coaches.move_to_end(coach_id)
+        else:
+            del coaches[coach_id]
+        self._size -= 1
+        self._granted_since_bulk = 0 if priority == "bulk" else self._granted_since_bulk + 1
+        return item
+
+    def sizes(self) -> Dict[str, int]:
+        """Number of queued items per priority class"""
+        return {
+            priority: sum(len(items) for items in self._waiting[priority].values()) for priority in PRIORITIES
+        }
+
+
+class SubmissionScheduler:
+    """Admission control for Document Intelligence analyses
+
+    Every analysis holds a slot from submission until its result is polled.
+    Slots are limited by a global concurrency cap and a transactions-per-
+    second cap on submissions, matching the service tier. Waiting analyses
+    are granted slots by priority class (interactive before bulk, with bulk
+    guaranteed a share so it never starves) and round-robin across coaches
+    within a class, so one coach's bulk upload cannot crowd out others.
+    """
+
+    def __init__(self):
+        """Initialize the scheduler from environment settings"""
+        self.max_concurrency = int(os.getenv("DOCUMENT_INTELLIGENCE_MAX_CONCURRENCY", "15"))
+        self.max_tps = float(os.getenv("DOCUMENT_INTELLIGENCE_MAX_TPS", "15"))
+        # One slot in every N goes to bulk work when both classes are waiting
+        self.bulk_every = int(os.getenv("DOCUMENT_BULK_EVERY", "5"))
+
+        self._active = 0
+        self._tokens = self.max_tps
+        self._last_refill = time.monotonic()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._granted_since_bulk = 0
+        # priority -> coach -> waiting futures (coaches rotate round-robin)
+        self._waiting: Dict[str, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._stats = {priority: {"granted": 0, "waits": deque(maxlen=1000)} for priority in PRIORITIES}
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold an analysis slot for the current submitter"""
+        coach_id, priority = current_submitter.get()
+        started = time.perf_counter()
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[priority].setdefault(coach_id, deque()).append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the waiter went away: hand the slot back
+                self._release()
+            else:
+                self._forget(priority, coach_id, future)
+            raise
+
+        self._stats[priority]["waits"].append(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _forget(self, priority: str, coach_id: str, future: asyncio.Future) -> None:
+        """Drop a cancelled waiter, so it is neither counted nor granted"""
+        futures = self._waiting[priority].get(coach_id)
+        if futures is None:
+            return
+        try:
+            futures.remove(future)
+        except ValueError:
+            return
+        if not futures:
+            del self._waiting[priority][coach_id]
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting analyses, within the TPS budget"""
+        while self._active < self.max_concurrency:
+            priority = next_priority(self._waiting, self._granted_since_bulk, self.bulk_every)
+            if priority is None:
+                return
+
+            delay = self._take_token()
+            if delay:
+                # Out of budget: try again once a token has accrued
+                if self._wakeup is None:
+                    self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+                return
+
+            coaches = self._waiting[priority]
+            coach_id, futures = next(iter(coaches.items()))
+            future = futures.popleft()
+            if futures:
+                coaches.move_to_end(coach_id)
+            else:
+                del coaches[coach_id]
+
+            if future.cancelled():
+                # Return the unused token
+                self._tokens += 1
+                continue
+
+            future.set_result(None)
+            self._active += 1
+            self._stats[priority]["granted"] += 1
+            self._granted_since_bulk = 0 if priority == "bulk" else self._granted_since_bulk + 1
+
+    def _take_token(self) -> float:
+        """Consume one submission token, or return the seconds until one is available"""
+        if self.max_tps <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.max_tps, self._tokens + (now - self._last_refill) * self.max_tps)
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.max_tps
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return slot usage and queueing delay per priority class"""
+        stats: Dict[str, Any] = {"active": self._active, "max_concurrency": self.max_concurrency}
+        for priority in PRIORITIES:
+            waits = sorted(self._stats[priority]["waits"])
+            stats[priority] = {
+                "waiting": sum(len(futures) for futures in self._waiting[priority].values()),
+                "granted": self._stats[priority]["granted"],
+                "wait_p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                "wait_p95": round(waits[int(len(waits) * 0.95)], 3) if waits else 0.0
+            }
+        return stats
+
+
+_scheduler: Optional[SubmissionScheduler] = None
+
+
+def get_submission_scheduler() -> SubmissionScheduler:
+    """Return the process-wide submission scheduler"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = SubmissionScheduler()
+    return _scheduler
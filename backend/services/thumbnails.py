@@ -0,0 +1,169 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from typing import Optional
+
+# Conditionally import the imaging libraries
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    logging.warning("Pillow not available. Document thumbnails will not be rendered.")
+
+try:
+    import pypdfium2
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+try:
+    from pypdf import PdfReader
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Name of the preview blob stored next to the document under {client_id}/{document_id}/
+# (the leading underscore keeps it apart from an upload called thumbnail.jpg)
+THUMBNAIL_NAME = "_thumbnail.jpg"
+
+
+def _first_pdf_page(file_path: str, max_dimension: int) -> Optional["Image.Image"]:
+    """
+    First page of a PDF as an image
+
+    Rasterized with pdfium when it is installed; otherwise the largest image
+    embedded in the first page stands in for it, which covers scanned PDFs.
+    """
+    if PDFIUM_AVAILABLE:
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            if len(pdf) == 0:
+                return None
+            page = pdf[0]
+            width, height = page.get_size()
+            # Render straight at thumbnail size rather than downsampling a full page
+            scale = max_dimension / max(width, height, 1)
+            return page.render(scale=scale).to_pil()
+        finally:
+            pdf.close()
+
+    if PYPDF_AVAILABLE:
+        reader = PdfReader(file_path)
+        if not reader.pages:
+            return None
+        images = [embedded.image for embedded in reader.pages[0].images]
+        if images:
+            return max(images, key=lambda image: image.size[0] * image.size[1])
+    return None
+
+
+def render_thumbnail(file_path: str, output_path: str, max_dimension: int, jpeg_quality: int) -> bool:
+    """
+    Render a small JPEG preview of a document's first page
+
+    Runs in a worker process, so it only takes and returns picklable values.
+
+    Args:
+        file_path: Path to the uploaded document
+        output_path: Path to write the JPEG to
+        max_dimension: Longest side of the preview, in pixels
+        jpeg_quality: JPEG quality of the preview
+
+    Returns:
+        Whether a preview was written
+    """
+    with open(file_path, "rb") as f:
+        is_pdf = f.read(5) == b"%PDF-"
+
+    if is_pdf:
+        image = _first_pdf_page(file_path, max_dimension)
+        if image is None:
+            return False
+    else:
+        with Image.open(file_path) as source:
+            # Multi-page TIFFs open on their first frame
+            source.draft("RGB", (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(source)
+
+    image = image.convert("RGB")
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    image.save(output_path, "JPEG", quality=jpeg_quality, optimize=True)
+    return True
+
+
+class ThumbnailRenderer:
+    """Renders document preview thumbnails in a process pool
+
+    Previews are rendered once, when the document file is stored, so listing
+    a client's documents never means downloading the originals.
+    """
+
+    def __init__(self):
+        """Initialize the renderer from environment settings"""
+        self.enabled = PIL_AVAILABLE and os.getenv("THUMBNAIL_ENABLED", "true").lower() == "true"
+        self.workers = int(os.getenv("THUMBNAIL_WORKERS", "1"))
+        self.max_dimension = int(os.getenv("THUMBNAIL_MAX_DIMENSION", "256"))
+        self.jpeg_quality = int(os.getenv("THUMBNAIL_JPEG_QUALITY", "70"))
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def render(self, file_path: str) -> Optional[str]:
+        """
+        Render a preview of a document
+
+        Args:
+            file_path: Path to the uploaded document
+
+        Returns:
+            Path to the JPEG preview (the caller removes it), or None if the
+            document could not be previewed
+        """
+        if not self.enabled:
+            return None
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        output_path = f"{file_path}{THUMBNAIL_NAME}"
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            rendered = await loop.run_in_executor(
+                self._pool, render_thumbnail, file_path, output_path, self.max_dimension, self.jpeg_quality
+            )
+        except Exception as e:
+            logger.warning(f"Thumbnail rendering failed for {os.path.basename(file_path)}: {str(e)}")
+            rendered = False
+
+        if not rendered:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return None
+        logger.info(f"Rendered thumbnail ({os.path.getsize(output_path)} bytes) in {time.perf_counter() - start:.3f}s")
+        return output_path
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_renderer: Optional[ThumbnailRenderer] = None
+
+
+def get_thumbnail_renderer() -> ThumbnailRenderer:
+    """Return the process-wide thumbnail renderer"""
+    global _renderer
+    if _renderer is None:
+        _renderer = ThumbnailRenderer()
+    return _renderer
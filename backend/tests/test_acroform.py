@@ -0,0 +1,142 @@
+import asyncio
+
+from pypdf import PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject, TextStringObject
+
+from services.acroform import AcroFormExtractor, map_acroform_fields, normalize_field_name
+from services.document_service import DocumentService
+from services.pdf_content import PdfContent
+from services.pdf_text_layer import PdfTextLayerExtractor
+from services.form_schemas import extract_with_schema, get_form_schema
+
+
+def write_form(path, values):
+    """Write a one-page PDF whose fields sit under topmostSubform[0].Page1[0], like the USCIS forms"""
+    writer = PdfWriter()
+    page = writer.add_blank_page(612, 792)
+    widgets = ArrayObject()
+    page[NameObject("/Annots")] = widgets
+
+    def add_field(name, value=None, kids=()):
+        field = DictionaryObject({NameObject("/T"): TextStringObject(name)})
+        if value is not None:
+            # A terminal field doubles as its own widget on the page
+            field[NameObject("/FT")] = NameObject("/Tx")
+            field[NameObject("/V")] = TextStringObject(value)
+            field[NameObject("/Subtype")] = NameObject("/Widget")
+        ref = writer._add_object(field)
+        if value is not None:
+            widgets.append(ref)
+        if kids:
+            field[NameObject("/Kids")] = ArrayObject(kids)
+            for kid in kids:
+                kid.get_object()[NameObject("/Parent")] = ref
+        return ref
+
+    page1 = add_field("Page1[0]", kids=[add_field(f"{name}[0]", value) for name, value in values.items()])
+    root = add_field("topmostSubform[0]", kids=[page1])
+    writer._root_object[NameObject("/AcroForm")] = DictionaryObject({
+        NameObject("/Fields"): ArrayObject([root])
+    })
+    writer.write(str(path))
+    return str(path)
+
+
+I9_VALUES = {
+    "Last Name (Family Name)": "Smith",
+    "First Name Given Name": "Jane",
+    "Address Street Number and Name": "123 Main St",
+    "Apt. Number": "4B",
+    "City or Town": "Anytown",
+    "State": "CA",
+    "ZIP Code": "12345",
+    "CB_Alien": "/Off",
+    "Signature of Employee": "Jane Smith"
+}
+
+
+def test_normalize_field_name_keeps_dotted_labels():
+    assert normalize_field_name("Apt. Number[0]") == "aptnumber"
+    assert normalize_field_name("No. of Units") == "noofunits"
+    assert normalize_field_name("Last Name (Family Name)[0]") == "lastnamefamilyname"
+
+
+def open_pdf(path):
+    return PdfContent(path, PdfTextLayerExtractor(), AcroFormExtractor())
+
+
+def test_form_values_strip_only_the_field_hierarchy(tmp_path):
+    values = open_pdf(write_form(tmp_path / "i9.pdf", I9_VALUES)).form_values()
+    assert values["Apt. Number"] == "4B"
+    assert values["Last Name (Family Name)"] == "Smith"
+    assert "CB_Alien" not in values
+
+
+def test_first_page_fields_follow_widgets_to_their_fields(tmp_path):
+    pdf = open_pdf(write_form(tmp_path / "i9.pdf", I9_VALUES))
+    fields = pdf.first_page_fields()
+    assert "Apt. Number" in fields and "ZIP Code" in fields
+    assert "CB_Alien" not in fields
+
+
+def test_non_pdf_uploads_have_no_fields_or_text(tmp_path):
+    path = tmp_path / "scan.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 64)
+    pdf = open_pdf(str(path))
+    assert pdf.form_values() is None
+    assert pdf.page_lines() is None
+    assert pdf.first_page_fields() == []
+
+
+def test_map_acroform_fields_matches_dotted_candidates():
+    mapped, unmapped = map_acroform_fields({"Apt. Number": "4B", "Notes": "x"},
+                                           {"apt_number": ("Apt Number (if any)", "Apt. Number")})
+    assert mapped == {"apt_number": "4B"}
+    assert unmapped == {"Notes": "x"}
+
+
+def read_acroform(schema, path):
+    service = DocumentService()
+    return service._read_acroform(schema, PdfContent(path, service.text_layer, service.acroform))
+
+
+def test_unmapped_fields_are_kept_out_of_schema_fields(tmp_path):
+    schema = get_form_schema("i9")
+    result = read_acroform(schema, write_form(tmp_path / "i9.pdf", I9_VALUES))
+    extracted = extract_with_schema(schema, result)
+    assert extracted["fields"]["apt_number"] == "4B"
+    assert extracted["fields"]["last_name"] == "Smith"
+    assert set(extracted["fields"]) <= set(schema.acroform_fields)
+    assert extracted["unmapped_fields"] == {"Signature of Employee": "Jane Smith"}
+
+
+def test_forms_without_a_template_take_every_field(tmp_path):
+    schema = get_form_schema("schedule_a")
+    letter = {"Applicant Name": "Jane Smith", "Disability": "Hearing impairment", "Signed by": "Dr. Lee"}
+    result = read_acroform(schema, write_form(tmp_path / "letter.pdf", letter))
+    assert extract_with_schema(schema, result) == {
+        "applicant_name": "Jane Smith", "disability": "Hearing impairment", "signed_by": "Dr. Lee"
+    }
+
+
+def test_fillable_form_is_parsed_once_per_document(tmp_path, monkeypatch):
+    import services.pdf_content
+
+    opened = []
+    reader_class = services.pdf_content.PdfReader
+
+    def open_reader(*args, **kwargs):
+        opened.append(args[0])
+        return reader_class(*args, **kwargs)
+
+    monkeypatch.setattr(services.pdf_content, "PdfReader", open_reader)
+
+    path = write_form(tmp_path / "i9.pdf", I9_VALUES)
+    service = DocumentService()
+    service.classifier.enabled = True
+    report = {}
+    result = asyncio.run(service.process_document(path, "generic", report))
+    assert opened == [path]
+    assert report["document_type"] == "i9"
+    assert report["tier"] == "acroform"
+    assert result["fields"]["zip_code"] == "12345"
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.cosmos_store import CosmosStore
+from services.local_store import LocalStore
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def local_store(monkeypatch, tmp_path):
+    store = LocalStore(path=str(tmp_path / "storage.db"), files_dir=str(tmp_path / "files"))
+    monkeypatch.setattr(main, "data_store", store)
+    yield store
+    asyncio.run(store.close())
+
+
+@pytest.fixture
+def unconfigured_store(monkeypatch):
+    monkeypatch.delenv("AZURE_COSMOS_ENDPOINT", raising=False)
+    monkeypatch.delenv("AZURE_COSMOS_KEY", raising=False)
+    monkeypatch.setattr(main, "data_store", CosmosStore())
+
+
+@pytest.mark.parametrize("path", ["/clients", "/clients/client1", "/documents/client1", "/documents/client1/doc1"])
+def test_unconfigured_backend_is_503_outside_demo_mode(client, unconfigured_store, monkeypatch, path):
+    monkeypatch.setenv("DEMO_MODE", "false")
+    response = client.get(path)
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Azure Cosmos DB is not configured (STORAGE_BACKEND=cosmos)"
+
+
+def test_unconfigured_backend_serves_mock_data_in_demo_mode(client, unconfigured_store, monkeypatch):
+    monkeypatch.setenv("DEMO_MODE", "true")
+    assert client.get("/clients").json() == {"clients": main.MOCK_CLIENTS}
+
+
+@pytest.mark.parametrize("demo_mode", ["true", "false"])
+def test_local_backend_is_read_in_demo_mode_too(client, local_store, monkeypatch, demo_mode):
+    monkeypatch.setenv("DEMO_MODE", demo_mode)
+    asyncio.run(local_store.upsert_client({"id": "c1", "name": "Ann"}))
+
+    assert client.get("/clients").json() == {"clients": [{"id": "c1", "name": "Ann"}], "source": "local"}
+    assert client.get("/clients/c1").json() == {"client": {"id": "c1", "name": "Ann"}, "source": "local"}
+
+
+def test_unknown_client_and_document_are_404(client, local_store, monkeypatch):
+    monkeypatch.setenv("DEMO_MODE", "false")
+    response = client.get("/clients/nobody")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Client not found"
+    assert client.get("/documents/nobody/doc1").status_code == 404
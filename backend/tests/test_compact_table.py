@@ -0,0 +1,47 @@
+import json
+
+from services.compact_table import CompactTable
+
+ANALYZE_TABLE = {
+    "rowCount": 3,
+    "columnCount": 3,
+    "cells": [
+        {"rowIndex": 0, "columnIndex": 0, "content": "Week", "rowSpan": 2},
+        {"rowIndex": 0, "columnIndex": 1, "content": "Hours", "columnSpan": 2},
+        {"rowIndex": 1, "columnIndex": 1, "content": "Mon"},
+        {"rowIndex": 1, "columnIndex": 2, "content": "Tue"},
+        {"rowIndex": 2, "columnIndex": 0, "content": "1"},
+        {"rowIndex": 2, "columnIndex": 1, "content": "8"},
+        {"rowIndex": 2, "columnIndex": 2, "content": "7.5"}
+    ]
+}
+
+
+def test_cells_are_laid_out_row_major_with_covered_cells_empty():
+    table = CompactTable.from_analyze_table(ANALYZE_TABLE)
+    assert list(table.rows()) == [["Week", "Hours", ""], ["", "Mon", "Tue"], ["1", "8", "7.5"]]
+    assert table.cell(2, 2) == "7.5"
+    assert table.spans == {0: (2, 1), 1: (1, 2)}
+
+
+def test_json_round_trip_keeps_cells_and_spans():
+    table = CompactTable.from_analyze_table(ANALYZE_TABLE)
+    data = json.loads(json.dumps(table.to_json()))
+    assert data["columns"] == [["Week", "", "1"], ["Hours", "Mon", "8"], ["", "Tue", "7.5"]]
+    assert data["spans"] == [[0, 0, 2, 1], [0, 1, 1, 2]]
+
+    rebuilt = CompactTable.from_json(data)
+    assert (rebuilt.row_count, rebuilt.column_count) == (3, 3)
+    assert rebuilt.cells == table.cells
+    assert rebuilt.spans == table.spans
+
+
+def test_tables_without_spans_or_counts():
+    table = CompactTable.from_analyze_table({"cells": [
+        {"rowIndex": 0, "columnIndex": 0, "content": "a"},
+        {"rowIndex": 1, "columnIndex": 1, "content": "d"}
+    ]})
+    assert list(table.rows()) == [["a", ""], ["", "d"]]
+    assert "spans" not in table.to_json()
+    assert CompactTable.from_json(table.to_json()).cells == table.cells
+    assert CompactTable.from_analyze_table({"cells": []}).to_json() == {"row_count": 0, "column_count": 0, "columns": []}
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from services.document_classifier import DocumentClassifier
+from services.document_service import DocumentService
+
+I9_PAGE = "Employment Eligibility Verification\nDepartment of Homeland Security\nUSCIS Form I-9\n"
+TWO_FORMS_PAGE = "Employment Eligibility Verification\nU.S. Individual Income Tax Return\n"
+
+
+def test_confident_prediction():
+    predicted, scores = DocumentClassifier().classify(I9_PAGE)
+    assert predicted == "i9"
+    assert scores["i9"] == max(scores.values())
+
+
+def test_fillable_form_fields_are_recognized_without_text():
+    predicted, _ = DocumentClassifier().classify("", ["Last Name (Family Name)[0]", "ZIP Code", "State",
+                                                      "US Social Security Number"])
+    assert predicted == "i9"
+
+
+def test_no_prediction_below_the_margin():
+    classifier = DocumentClassifier()
+    predicted, scores = classifier.classify(TWO_FORMS_PAGE)
+    # Both forms score high enough, but neither is far enough ahead
+    assert predicted is None
+    assert scores["i9"] >= classifier.min_score and scores["tax_1040"] >= classifier.min_score
+    assert abs(scores["i9"] - scores["tax_1040"]) < classifier.min_margin
+
+
+@pytest.fixture
+def service():
+    service = DocumentService()
+    service.classifier.enabled = True
+    processed = []
+
+    def processor(document_type):
+        async def process(file_path, report, pdf):
+            processed.append(document_type)
+            return {}
+        return process
+
+    service.document_types = {document_type: processor(document_type) for document_type in service.document_types}
+    service.processed = processed
+    return service
+
+
+def process(service, page_text, document_type, tmp_path):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.7\n")
+    service._first_page_signature = lambda pdf: (page_text, [])
+    report = {}
+    asyncio.run(service.process_document(str(path), document_type, report))
+    return report
+
+
+def test_confident_prediction_overrides_the_requested_type(service, tmp_path):
+    report = process(service, I9_PAGE, "generic", tmp_path)
+    assert service.processed == ["i9"]
+    assert report["document_type"] == "i9"
+    assert report["requested_type"] == "generic"
+
+
+def test_unsure_prediction_keeps_the_requested_type(service, tmp_path):
+    report = process(service, TWO_FORMS_PAGE, "tax_1040", tmp_path)
+    assert service.processed == ["tax_1040"]
+    assert report["classifier"]["predicted"] is None
+    assert "requested_type" not in report
+
+
+def test_auto_without_a_prediction_is_generic(service, tmp_path):
+    report = process(service, "Dear hiring manager,\n", "auto", tmp_path)
+    assert service.processed == ["generic"]
+    assert report["document_type"] == "generic"
@@ -0,0 +1,77 @@
+import asyncio
+import struct
+import zlib
+
+import httpx
+import pytest
+
+from services.document_intelligence_client import (
+    DocumentAnalysisError, DocumentIntelligenceClient, estimate_page_count
+)
+
+
+def object_stream_pdf(page_count: int) -> bytes:
+    """A PDF 1.5 file whose page tree sits in a compressed object stream"""
+    page_ids = list(range(4, 4 + page_count))
+    objects = [b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % i for i in page_ids)
+               + b"] /Count %d >>" % page_count]
+    objects += [b"<< /Type /Page /Parent 3 0 R /MediaBox [0 0 612 792] >>"] * page_count
+    offsets, body = [], b""
+    for obj in objects:
+        offsets.append(len(body))
+        body += obj + b" "
+    header = b" ".join(b"%d %d" % (3 + i, offset) for i, offset in enumerate(offsets)) + b" "
+    packed = zlib.compress(header + body)
+
+    pdf = b"%PDF-1.5\n"
+    xref = [(0, 0, 0)]
+    xref.append((1, len(pdf), 0))
+    pdf += b"1 0 obj << /Type /Catalog /Pages 3 0 R >> endobj\n"
+    xref.append((1, len(pdf), 0))
+    pdf += (b"2 0 obj << /Type /ObjStm /N %d /First %d /Filter /FlateDecode /Length %d >> stream\n"
+            % (len(objects), len(header), len(packed)) + packed + b"\nendstream endobj\n")
+    xref += [(2, 2, index) for index in range(len(objects))]
+    xref_offset = len(pdf)
+    xref.append((1, xref_offset, 0))
+    rows = zlib.compress(b"".join(struct.pack(">BIH", *row) for row in xref))
+    pdf += (b"%d 0 obj << /Type /XRef /Size %d /W [1 4 2] /Root 1 0 R /Filter /FlateDecode /Length %d >> stream\n"
+            % (len(xref) - 1, len(xref), len(rows)) + rows + b"\nendstream endobj\n")
+    return pdf + b"startxref\n%d\n%%%%EOF\n" % xref_offset
+
+
+def make_client(handler) -> DocumentIntelligenceClient:
+    client = DocumentIntelligenceClient(endpoint="https://example.test", key="key")
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_submit_returns_operation_location():
+    client = make_client(lambda request: httpx.Response(
+        202, headers={"Operation-Location": "https://example.test/operations/1"}))
+    assert asyncio.run(client.submit("prebuilt-read", b"%PDF")) == "https://example.test/operations/1"
+
+
+def test_submit_without_operation_location_raises_analysis_error():
+    client = make_client(lambda request: httpx.Response(202))
+    with pytest.raises(DocumentAnalysisError):
+        asyncio.run(client.submit("prebuilt-read", b"%PDF"))
+
+
+def test_page_count_reads_compressed_page_trees(tmp_path):
+    document = object_stream_pdf(3)
+    # A byte scan cannot see the page objects
+    assert b"/Type /Page" not in document
+    path = tmp_path / "compressed.pdf"
+    path.write_bytes(document)
+    assert estimate_page_count(document) == 3
+    assert estimate_page_count(str(path)) == 3
+
+
+def test_page_count_falls_back_to_scanning_unreadable_pdfs(tmp_path):
+    document = b"%PDF-1.4\n" + b"1 0 obj << /Type /Page >> endobj\n" * 2 + b"3 0 obj << /Type /Pages >> endobj\n"
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(document)
+    assert estimate_page_count(document) == 2
+    assert estimate_page_count(str(path)) == 2
+    assert estimate_page_count(b"\x89PNG\r\n") == 1
+    assert estimate_page_count(document, "1-3,5") == 4
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from services.document_intelligence_client import DocumentAnalysisError
+from services.document_service import DocumentService
+from services.extraction_cache import ExtractionCache
+from services.form_schemas import get_form_schema
+from services.pdf_content import PdfContent
+
+
+@pytest.fixture
+def scan(tmp_path):
+    path = tmp_path / "scan.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 64)
+    return str(path)
+
+
+def test_analysis_failure_is_raised_not_mocked(scan):
+    service = DocumentService()
+    service.use_azure = True
+
+    async def failing_analyze(*args, **kwargs):
+        raise DocumentAnalysisError("service unavailable")
+
+    service.analyze = failing_analyze
+    report = {}
+    with pytest.raises(DocumentAnalysisError):
+        asyncio.run(service.process_document(scan, "i9", report))
+    assert report.get("tier") != "mock"
+
+
+def test_unconfigured_service_returns_mock_data(scan):
+    service = DocumentService()
+    service.use_azure = False
+    report = {}
+    result = asyncio.run(service.process_document(scan, "i9", report))
+    assert report["tier"] == "mock"
+    assert result == service._get_mock_data("i9")
+
+
+def test_failed_page_range_cancels_its_siblings():
+    service = DocumentService()
+    service.page_range_size = 10
+    cancelled = []
+    whole_document = []
+
+    async def submit_and_poll(content_hash, model_id, document, pages=None, projection=None):
+        if pages is None:
+            # The other ranges are already stopped when the whole document is resubmitted
+            whole_document.append(sorted(cancelled))
+            return {"pages": []}
+        if pages == "1-10":
+            await asyncio.sleep(0.01)
+            raise DocumentAnalysisError("bad page range")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(pages)
+            raise
+
+    service._submit_and_poll = submit_and_poll
+    result = asyncio.run(service._analyze_page_ranges(b"%PDF", "prebuilt-layout", 30, "hash"))
+    assert result == {"pages": []}
+    assert whole_document == [["11-20", "21-30"]]
+
+
+def test_only_sparse_pages_are_sent_for_analysis(scan):
+    service = DocumentService()
+    service.use_azure = True
+    dense_page = [f"Line {i}: " + "x" * 40 for i in range(6)]
+    pdf = PdfContent(scan, service.text_layer, service.acroform)
+    pdf.page_lines = lambda page_limit=None: [dense_page, ["scanned"], dense_page, []]
+    calls = []
+
+    async def analyze(document, model_id, report=None, projection=None, pages=None):
+        calls.append(pages)
+        return {"modelId": model_id, "pages": [{"pageNumber": 2, "lines": []}, {"pageNumber": 4, "lines": []}]}
+
+    service.analyze = analyze
+    schema = get_form_schema("generic")
+    report = {}
+    result = asyncio.run(service._read_text_layer(scan, pdf, schema, report))
+    assert calls == ["2,4"]
+    assert [page["pageNumber"] for page in result["pages"]] == [1, 2, 3, 4]
+    assert report["text_layer_pages"] == 2
+
+
+def test_partly_local_documents_get_a_mixed_tier(tmp_path):
+    service = DocumentService()
+    service.use_azure = True
+    service.cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    path = tmp_path / "mixed.pdf"
+    path.write_bytes(b"%PDF-1.7\n")
+    dense_page = [f"Line {i}: " + "x" * 40 for i in range(6)]
+    submitted = []
+
+    async def submit_and_poll(content_hash, model_id, document, pages=None, projection=None):
+        submitted.append(pages)
+        return {"pages": [{"pageNumber": 2, "lines": []}]}
+
+    service._submit_and_poll = submit_and_poll
+    schema = get_form_schema("generic")
+    tiers = []
+    for _ in range(2):
+        pdf = PdfContent(str(path), service.text_layer, service.acroform)
+        pdf.page_lines = lambda page_limit=None: [dense_page, ["scanned"], dense_page]
+        report = {}
+        asyncio.run(service._read_text_layer(str(path), pdf, schema, report))
+        tiers.append(report["tier"])
+
+    assert submitted == ["2"]
+    assert tiers == ["text_layer+azure", "text_layer+cache"]
+    assert service.tier_counts["text_layer+azure"] == 1
+    assert service.tier_counts["text_layer+cache"] == 1
+    assert service.tier_counts["azure"] == service.tier_counts["cache"] == 0
+    assert service.text_layer_pages == 4
@@ -0,0 +1,43 @@
+from pypdf import PdfReader, PdfWriter
+
+from services.document_splitter import classify_page, find_segments, write_segment
+
+I9_PAGE = "Employment Eligibility Verification\nDepartment of Homeland Security\n"
+SCHEDULE_A_PAGE = "Schedule A Letter\nTo whom it may concern,\n"
+TAX_PAGE = "Form 1040 U.S. Individual Income Tax Return 2023\n"
+
+
+def test_classify_page_reads_form_titles_in_the_header():
+    assert classify_page(I9_PAGE) == "i9"
+    assert classify_page(TAX_PAGE) == "tax_1040"
+    assert classify_page("Section 2. Employer Review and Verification\n") is None
+    # A title far down the page is a reference to the form, not its start
+    assert classify_page("x" * 2000 + "Employment Eligibility Verification") is None
+
+
+def test_find_segments_splits_a_packet_into_forms():
+    pages = ["Cover letter\n", I9_PAGE, "Section 2\n", SCHEDULE_A_PAGE, TAX_PAGE, "Schedule 1\n", TAX_PAGE]
+    assert find_segments(pages) == [
+        {"document_type": "generic", "first_page": 1, "last_page": 1},
+        {"document_type": "i9", "first_page": 2, "last_page": 3},
+        {"document_type": "schedule_a", "first_page": 4, "last_page": 4},
+        # A repeated title continues the same form
+        {"document_type": "tax_1040", "first_page": 5, "last_page": 7}
+    ]
+
+
+def test_single_form_is_one_segment():
+    assert find_segments([I9_PAGE, "Section 2\n"]) == [{"document_type": "i9", "first_page": 1, "last_page": 2}]
+    assert find_segments([]) == []
+
+
+def test_write_segment_copies_the_page_range(tmp_path):
+    writer = PdfWriter()
+    for width in (100, 200, 300, 400):
+        writer.add_blank_page(width, 100)
+    source = tmp_path / "packet.pdf"
+    with open(source, "wb") as f:
+        writer.write(f)
+
+    output = write_segment(str(source), 2, 3, str(tmp_path / "segment.pdf"))
+    assert [float(page.mediabox.width) for page in PdfReader(output).pages] == [200, 300]
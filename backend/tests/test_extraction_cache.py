@@ -0,0 +1,79 @@
+import asyncio
+import os
+
+from services.extraction_cache import CACHE_KEY_VERSION, ExtractionCache, hash_bytes, hash_file
+
+CONTENT_HASH = "ab" + "0" * 62
+
+
+def test_entries_of_older_key_versions_are_removed(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path))
+    asyncio.run(cache.put(CONTENT_HASH, "prebuilt-layout", {"pages": []}))
+    shard = tmp_path / CONTENT_HASH[:2]
+    # Written before keys were versioned
+    (shard / f"prebuilt-layout-{CONTENT_HASH}.json").write_text("{}")
+    stale_tmp = shard / f"prebuilt-layout-{CONTENT_HASH}.json.0123.tmp"
+    stale_tmp.write_text("{")
+    os.utime(stale_tmp, (0, 0))
+
+    removed = asyncio.run(cache.remove_stale_entries())
+    assert removed == 2
+    assert [entry.name for entry in shard.iterdir()] == [f"{CACHE_KEY_VERSION}-prebuilt-layout-{CONTENT_HASH}.json"]
+    assert asyncio.run(ExtractionCache(cache_dir=str(tmp_path)).get(CONTENT_HASH, "prebuilt-layout")) == {"pages": []}
+
+
+def test_results_are_keyed_by_content_hash_and_model(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    first = tmp_path / "first.pdf"
+    renamed = tmp_path / "renamed.pdf"
+    first.write_bytes(b"%PDF-1.7 same bytes")
+    renamed.write_bytes(b"%PDF-1.7 same bytes")
+    content_hash = hash_file(str(first))
+    assert content_hash == hash_bytes(first.read_bytes())
+
+    assert asyncio.run(cache.get(content_hash, "prebuilt-layout")) is None
+    asyncio.run(cache.put(content_hash, "prebuilt-layout", {"content": "layout"}))
+
+    # The same bytes under another name are a hit; another model or other bytes are not
+    assert asyncio.run(cache.get(hash_file(str(renamed)), "prebuilt-layout")) == {"content": "layout"}
+    assert asyncio.run(cache.get(content_hash, "prebuilt-read")) is None
+    assert asyncio.run(cache.get(hash_bytes(b"other bytes"), "prebuilt-layout")) is None
+
+    stats = cache.get_stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"], stats["stores"]) == (1, 0, 3, 1)
+    assert stats["hit_rate"] == 0.25
+
+
+def test_disk_entries_are_hits_for_a_new_instance(tmp_path):
+    asyncio.run(ExtractionCache(cache_dir=str(tmp_path)).put(CONTENT_HASH, "prebuilt-layout", {"pages": [1]}))
+
+    cache = ExtractionCache(cache_dir=str(tmp_path))
+    assert asyncio.run(cache.get(CONTENT_HASH, "prebuilt-layout")) == {"pages": [1]}
+    assert asyncio.run(cache.get(CONTENT_HASH, "prebuilt-layout")) == {"pages": [1]}
+    stats = cache.get_stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+    assert stats["memory_entries"] == 1
+
+
+def test_hits_are_copies_of_the_cached_result(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path))
+    result = {"pages": [{"pageNumber": 1, "lines": []}]}
+    asyncio.run(cache.put(CONTENT_HASH, "prebuilt-layout", result))
+    # Changes by the caller that stored the result, or by one that read it, stay out of the cache
+    result["pages"].append({"pageNumber": 2})
+    asyncio.run(cache.get(CONTENT_HASH, "prebuilt-layout"))["pages"][0]["lines"].append({"content": "x"})
+
+    assert asyncio.run(cache.get(CONTENT_HASH, "prebuilt-layout")) == {"pages": [{"pageNumber": 1, "lines": []}]}
+    assert cache.get_stats()["memory_hits"] == 2
+
+
+def test_default_locations_do_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    from services import extraction_cache, job_journal
+
+    monkeypatch.delenv("EXTRACTION_CACHE_DIR", raising=False)
+    monkeypatch.delenv("DOCUMENT_JOB_JOURNAL_PATH", raising=False)
+    monkeypatch.chdir(tmp_path)
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(extraction_cache.__file__)))
+    assert ExtractionCache().cache_dir == os.path.join(backend_dir, "cache", "extractions")
+    assert job_journal.JobJournal().path == os.path.join(backend_dir, "cache", "document_jobs.db")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,62 @@
+import re
+
+import pytest
+
+from services.form_schemas import FormSchema, document_text, get_form_schema, page_text
+
+
+def legacy_search(schema, text):
+    """One re.search per field: the behaviour scan must reproduce"""
+    fields = {}
+    for field, pattern in schema.field_patterns.items():
+        match = re.search(pattern, text)
+        if match:
+            fields[field] = match.group(1).strip()
+    return fields
+
+
+def test_first_match_wins():
+    schema = FormSchema("test", "Test", text_fields={"zip_code": ("ZIP", r"\d{5}")})
+    assert schema.scan("ZIP none\nZIP 11111\nZIP 22222\n") == {"zip_code": "11111"}
+
+
+def test_prefix_sharing_labels_are_both_tried():
+    schema = FormSchema("test", "Test", text_fields={
+        "phone": ("Phone", r"\d{3}-\d{4}"),
+        "phone_type": ("Phone Type", r"(?:mobile|home)\b")
+    })
+    # At the first offset only the shorter label's value is there
+    assert schema.scan("Phone Type 555-1234\nPhone Type home\n") == {
+        "phone": "555-1234",
+        "phone_type": "home"
+    }
+
+
+def test_labels_nested_in_or_overlapping_other_labels_are_found():
+    schema = FormSchema("test", "Test", text_fields={
+        "email": ("E-mail Address", r"\S+@\S+"),
+        "address": ("Address", r"\d+ [A-Za-z ]+"),
+        "code": ("ss Code", r"\d{3}")
+    })
+    text = "E-mail Address 12 Main St\nE-mail Address ann@example.com\nAddress Code 042\n"
+    assert schema.scan(text) == {"address": "12 Main St", "email": "ann@example.com", "code": "042"}
+    assert schema.scan(text) == legacy_search(schema, text)
+
+
+def test_missing_fields_are_left_out():
+    schema = get_form_schema("i9")
+    assert schema.scan("Last Name Doe\nZIP Code none\n") == {"last_name": "Doe"}
+    assert FormSchema("test", "Test").scan("Last Name Doe") == {}
+
+
+@pytest.mark.parametrize("lines", [
+    ["Last Name Doe First Name John Middle Initial Q"],
+    ["Address 1 Elm St", "E-mail Address john@example.com Address 9 Oak Ave City Springfield State IL"],
+    ["Telephone Number 555-123-4567 Social Security Number 123-45-6789 ZIP Code 62701"]
+])
+def test_scan_matches_per_field_search(lines):
+    schema = get_form_schema("i9")
+    pages = [{"lines": [{"content": line} for line in lines]}, {"lines": []}]
+    text = document_text(pages)
+    assert text == "".join(page_text(page) for page in pages)
+    assert schema.scan(text) == legacy_search(schema, text)
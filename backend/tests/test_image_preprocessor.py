@@ -0,0 +1,54 @@
+import asyncio
+import os
+
+from PIL import Image
+from pypdf import PdfReader
+
+from services.image_preprocessor import ImagePreprocessor, preprocess_file
+
+
+def noise_image(width, height, mode="RGB"):
+    return Image.frombytes(mode, (width, height), os.urandom(width * height * len(mode)))
+
+
+def test_photo_becomes_a_smaller_grayscale_jpeg(tmp_path):
+    source = tmp_path / "photo.png"
+    noise_image(1200, 800).save(source)
+
+    stats = preprocess_file(str(source), str(tmp_path / "photo.prepared"), 600, 80, True)
+    assert stats["format"] == "PNG"
+    assert stats["pages"] == 1
+    assert stats["output_path"] == str(tmp_path / "photo.prepared.jpg")
+    assert stats["output_bytes"] == os.path.getsize(stats["output_path"]) < stats["input_bytes"]
+    with Image.open(stats["output_path"]) as output:
+        assert output.format == "JPEG"
+        assert output.mode == "L"
+        assert output.size == (600, 400)
+
+
+def test_multi_page_tiff_becomes_a_pdf(tmp_path):
+    source = tmp_path / "scan.tiff"
+    pages = [noise_image(1000, 1400) for _ in range(3)]
+    pages[0].save(source, save_all=True, append_images=pages[1:])
+
+    stats = preprocess_file(str(source), str(tmp_path / "scan.prepared"), 700, 80, True)
+    assert stats["format"] == "TIFF"
+    assert stats["output_path"].endswith(".pdf")
+    assert len(PdfReader(stats["output_path"]).pages) == 3
+
+
+def test_output_that_is_not_smaller_is_discarded(tmp_path):
+    source = tmp_path / "small.jpg"
+    noise_image(100, 100, "L").save(source, quality=20)
+
+    stats = preprocess_file(str(source), str(tmp_path / "small.prepared"), 2500, 95, True)
+    assert stats["output_path"] is None
+    assert not os.path.exists(tmp_path / "small.prepared.jpg")
+
+
+def test_small_uploads_are_analyzed_as_they_are(tmp_path):
+    source = tmp_path / "small.png"
+    noise_image(50, 50).save(source)
+    preprocessor = ImagePreprocessor()
+    preprocessor.min_bytes = os.path.getsize(source) + 1
+    assert asyncio.run(preprocessor.preprocess(str(source))) == (str(source), None)
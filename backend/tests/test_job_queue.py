@@ -0,0 +1,220 @@
+import os
+import asyncio
+
+import pytest
+
+from services.job_journal import JobJournal
+from services.job_queue import DocumentJobQueue
+
+
+class FakeDocumentService:
+    """Stands in for DocumentService; fails the first `failures` analyses"""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+
+    async def process_document(self, file_path, document_type, report=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise RuntimeError("analysis failed")
+        return {"name": "Jane Smith"}
+
+
+class FakeStorageService:
+    def __init__(self):
+        self.saved = []
+
+    async def save_document_file(self, file_path, client_id, document_id, partial):
+        return f"file:///{client_id}/{document_id}"
+
+    async def save_document_data(self, client_id, document_type, extracted_fields, original_file_name,
+                                 processed_by, document_id=None, thumbnail_url=None, blob_url=None):
+        self.saved.append(document_id)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    journal.enabled = True
+    yield journal
+    journal.close()
+
+
+@pytest.fixture
+def upload(tmp_path):
+    def make(name: str = "form.pdf") -> str:
+        directory = tmp_path / "uploads" / name
+        directory.mkdir(parents=True)
+        path = directory / name
+        path.write_bytes(b"%PDF-1.4")
+        return str(path)
+    return make
+
+
+def make_queue(journal, document_service=None, **settings) -> DocumentJobQueue:
+    queue = DocumentJobQueue(document_service or FakeDocumentService(), FakeStorageService(), workers=2)
+    queue.journal = journal
+    for name, value in settings.items():
+        setattr(queue, name, value)
+    return queue
+
+
+def test_get_job_falls_back_to_the_journal(journal, upload):
+    async def scenario():
+        queue = make_queue(journal)
+        job = await queue.submit(upload(), "client1", "i9", "form.pdf", "coach1")
+        finished = await queue.wait(job["job_id"], timeout=5)
+        await queue.stop()
+
+        queue._forget(job["job_id"])
+        return finished, await queue.get_job(job["job_id"])
+
+    finished, journaled = asyncio.run(scenario())
+    assert finished["status"] == "succeeded"
+    assert journaled["job_id"] == finished["job_id"]
+    assert journaled["status"] == "succeeded"
+
+
+def test_cancelled_batch_jobs_are_journaled(journal, upload):
+    async def scenario():
+        queue = make_queue(journal, FakeDocumentService(delay=10))
+        uploads = [{"file_path": upload(f"form{i}.pdf"), "client_id": "client1", "document_type": "i9",
+                    "original_file_name": f"form{i}.pdf", "user_id": "coach1"} for i in range(2)]
+        batch = queue.run_batch(uploads)
+        consumer = asyncio.create_task(batch.__anext__())
+        while len(queue._jobs) < 2:
+            await asyncio.sleep(0.01)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        await batch.aclose()
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        return [job for job in queue._jobs.values()]
+
+    jobs = asyncio.run(scenario())
+    assert len(jobs) == 2
+    for job in jobs:
+        assert job["status"] == "cancelled"
+        assert journal.get_job(job["job_id"])["status"] == "cancelled"
+
+
+def test_batch_left_while_jobs_are_created_cancels_them_all(journal, upload):
+    async def scenario():
+        queue = make_queue(journal, FakeDocumentService(delay=10))
+        uploads = [{"file_path": upload(f"form{i}.pdf"), "client_id": "client1", "document_type": "i9",
+                    "original_file_name": f"form{i}.pdf", "user_id": "coach1"} for i in range(5)]
+        batch = queue.run_batch(uploads)
+        consumer = asyncio.create_task(batch.__anext__())
+        # Leave as soon as the first job exists, before the rest are started
+        while not queue._jobs:
+            await asyncio.sleep(0)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        await batch.aclose()
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        return list(queue._jobs.values()), uploads
+
+    jobs, uploads = asyncio.run(scenario())
+    assert jobs
+    for job in jobs:
+        assert job["status"] == "cancelled"
+        assert journal.get_job(job["job_id"])["status"] == "cancelled"
+    assert not any(os.path.exists(item["file_path"]) for item in uploads)
+
+
+def test_failing_analysis_retries_with_back_off_then_dead_letters(journal, upload, monkeypatch):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def recording_sleep(delay, *args, **kwargs):
+        if delay:
+            delays.append(delay)
+        await real_sleep(0)
+
+    async def scenario():
+        document_service = FakeDocumentService(failures=10)
+        queue = make_queue(journal, document_service, max_attempts=3, retry_delay=5)
+        monkeypatch.setattr(asyncio, "sleep", recording_sleep)
+        file_path = upload()
+        job = await queue.submit(file_path, "client1", "i9", "form.pdf", "coach1")
+        finished = await queue.wait(job["job_id"], timeout=5)
+        await queue.stop()
+        return finished, document_service.calls, file_path
+
+    finished, calls, file_path = asyncio.run(scenario())
+    assert calls == 3
+    assert delays == [5, 10]
+    assert finished["status"] == "dead_letter"
+    assert finished["attempts"] == 3
+    assert finished["error"] == "analysis failed"
+    assert journal.get_job(finished["job_id"])["status"] == "dead_letter"
+    assert journal.unfinished_jobs() == []
+
+
+def test_retry_succeeds_after_a_transient_failure(journal, upload):
+    async def scenario():
+        queue = make_queue(journal, FakeDocumentService(failures=1), retry_delay=0.01)
+        job = await queue.submit(upload(), "client1", "i9", "form.pdf", "coach1")
+        finished = await queue.wait(job["job_id"], timeout=5)
+        await queue.stop()
+        return finished
+
+    finished = asyncio.run(scenario())
+    assert finished["status"] == "succeeded"
+    assert finished["attempts"] == 2
+    assert finished["error"] is None
+
+
+def test_unfinished_jobs_resume_from_their_checkpoint(journal, upload):
+    file_path = upload()
+    job = {
+        "job_id": "job1", "status": "running", "stage": "save_data", "client_id": "client1",
+        "document_type": "i9", "original_file_name": "form.pdf", "processed_by": "coach1",
+        "priority": "interactive", "created_at": "2024-01-01T00:00:00", "completed_at": None,
+        "attempts": 1, "timings": {}, "analysis": {}, "result": None, "error": None
+    }
+    # Interrupted after the analysis and the upload had finished
+    journal.save_job(job, file_path, {"document_id": "doc1", "extracted_fields": {"name": "Jane Smith"},
+                                      "document_type": "i9", "file_url": "file:///doc1"})
+
+    async def scenario():
+        document_service = FakeDocumentService()
+        queue = make_queue(journal, document_service)
+        await queue.start()
+        finished = await queue.wait("job1", timeout=5)
+        await queue.stop()
+        return finished, document_service.calls, queue.storage_service.saved
+
+    finished, calls, saved = asyncio.run(scenario())
+    assert finished["status"] == "succeeded"
+    assert finished["attempts"] == 2
+    assert calls == 0
+    assert saved == ["doc1"]
+    assert finished["result"]["extracted_fields"] == {"name": "Jane Smith"}
+    assert journal.unfinished_jobs() == []
+
+
+def test_jobs_interrupted_too_often_are_dead_lettered_on_resume(journal, upload):
+    file_path = upload()
+    job = {
+        "job_id": "job2", "status": "running", "stage": "analyze", "client_id": "client1",
+        "document_type": "i9", "original_file_name": "form.pdf", "processed_by": "coach1",
+        "priority": "interactive", "created_at": "2024-01-01T00:00:00", "completed_at": None,
+        "attempts": 3, "timings": {}, "analysis": {}, "result": None, "error": None
+    }
+    journal.save_job(job, file_path)
+
+    async def scenario():
+        queue = make_queue(journal, max_attempts=3)
+        await queue.start()
+        await queue.stop()
+        return await queue.get_job("job2")
+
+    resumed = asyncio.run(scenario())
+    assert resumed["status"] == "dead_letter"
+    assert resumed["error"] == "Interrupted 3 times"
+    assert journal.get_job("job2")["status"] == "dead_letter"
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from services.local_store import LocalStore
+from services.pagination import InvalidCursorError
+
+
+def make_store(tmp_path):
+    return LocalStore(path=str(tmp_path / "storage.db"), files_dir=str(tmp_path / "files"))
+
+
+def seed_documents(store, client_id, count):
+    async def seed():
+        for i in range(count):
+            await store.upsert_document({
+                "id": f"doc{i}",
+                "client_id": client_id,
+                "document_type": "i9" if i % 2 else "resume",
+                "processed_at": f"2024-01-{i % 5 + 1:02d}T00:00:00"
+            })
+    asyncio.run(seed())
+
+
+def read_all_pages(read_page):
+    items = []
+    token = None
+    while True:
+        page, token = asyncio.run(read_page(token))
+        items.extend(page)
+        if token is None:
+            return items
+
+
+def test_clients_are_paged_by_id(tmp_path):
+    store = make_store(tmp_path)
+
+    async def seed():
+        for i in (3, 1, 4, 0, 2):
+            await store.upsert_client({"id": f"client{i}", "name": f"Client {i}"})
+    asyncio.run(seed())
+
+    first, token = asyncio.run(store.list_clients_page(2))
+    assert [client["id"] for client in first] == ["client0", "client1"]
+    assert token is not None
+
+    clients = read_all_pages(lambda token: store.list_clients_page(2, token))
+    assert [client["id"] for client in clients] == [f"client{i}" for i in range(5)]
+    asyncio.run(store.close())
+
+
+def test_documents_are_paged_newest_first_without_gaps(tmp_path):
+    store = make_store(tmp_path)
+    # Several documents share a processed_at, so pages must break ties by id
+    seed_documents(store, "client1", 12)
+    seed_documents(store, "client2", 3)
+
+    documents = read_all_pages(lambda token: store.get_client_documents_page("client1", 5, token))
+    keys = [(doc["processed_at"], doc["id"]) for doc in documents]
+    assert len(keys) == 12
+    assert keys == sorted(keys, reverse=True)
+    assert documents == asyncio.run(store.get_client_documents("client1"))
+    asyncio.run(store.close())
+
+
+def test_document_pages_filter_by_type(tmp_path):
+    store = make_store(tmp_path)
+    seed_documents(store, "client1", 12)
+
+    documents = read_all_pages(lambda token: store.get_client_documents_page("client1", 4, token, "i9"))
+    assert sorted(doc["id"] for doc in documents) == sorted(f"doc{i}" for i in range(1, 12, 2))
+    assert {doc["document_type"] for doc in documents} == {"i9"}
+    asyncio.run(store.close())
+
+
+def test_malformed_continuation_token_is_rejected(tmp_path):
+    store = make_store(tmp_path)
+    seed_documents(store, "client1", 3)
+
+    with pytest.raises(InvalidCursorError):
+        asyncio.run(store.get_client_documents_page("client1", 2, "not a token"))
+    asyncio.run(store.close())
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from services.pagination import InvalidCursorError, decode_cursor, encode_cursor, ndjson_lines, paginate
+
+
+def collect(lines):
+    async def read():
+        return [line async for line in lines]
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize("token", [
+    "42",
+    '["2024-01-05T00:00:00", "doc7"]',
+    '{"token":"+RID:~abc==#RT:1#TRC:10","range":{"min":"","max":"FF"}}'
+])
+def test_cursor_round_trip(token):
+    cursor = encode_cursor(token)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == token
+
+
+def test_no_cursor_means_no_more_pages():
+    assert encode_cursor(None) is None
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", "gA"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_paginate_follows_tokens_to_the_end():
+    items = [{"id": str(i)} for i in range(7)]
+    pages = []
+    token = None
+    while True:
+        page, token = paginate(items, 3, decode_cursor(encode_cursor(token)))
+        pages.append([item["id"] for item in page])
+        if token is None:
+            break
+    assert pages == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
+    assert paginate(items, None, None) == (items, None)
+
+
+def test_paginate_rejects_a_foreign_token():
+    with pytest.raises(InvalidCursorError):
+        paginate([{"id": "1"}], 1, '["2024-01-01", "doc1"]')
+
+
+def test_ndjson_writes_one_line_per_item():
+    items = [{"id": "1", "name": "Ann"}, {"id": "2", "note": "line\nbreak"}]
+
+    async def stream():
+        for item in items:
+            yield item
+
+    for source in (items, stream()):
+        lines = collect(ndjson_lines(source))
+        assert all(line.endswith("\n") and "\n" not in line[:-1] for line in lines)
+        assert [json.loads(line) for line in lines] == items
@@ -0,0 +1,64 @@
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from services.acroform import AcroFormExtractor
+from services.document_intelligence_client import format_page_selection
+from services.pdf_content import PdfContent
+from services.pdf_text_layer import PdfTextLayerExtractor
+
+
+def test_sparse_pages_are_judged_per_page():
+    extractor = PdfTextLayerExtractor()
+    extractor.min_chars_per_page = 20
+    page_lines = [["Name: Jane Smith", "Phone: 555-0100"], ["12"], [], ["Position: Cashier at ABC Store"]]
+    assert extractor.sparse_pages(page_lines) == [2, 3]
+
+
+def test_build_result_keeps_page_numbers_of_selected_pages():
+    extractor = PdfTextLayerExtractor()
+    result = extractor.build_result([["Name: Jane Smith"], ["scan"], ["Position: Cashier"]], [1, 3])
+    assert [page["pageNumber"] for page in result["pages"]] == [1, 3]
+    assert [pair["key"]["content"] for pair in result["keyValuePairs"]] == ["Name", "Position"]
+
+
+def test_format_page_selection():
+    assert format_page_selection([9, 1, 2, 3, 7, 10]) == "1-3,7,9-10"
+    assert format_page_selection([4]) == "4"
+
+
+def write_text_pdf(path, pages):
+    """Write a PDF with one page per list of lines, in the standard Helvetica font"""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")
+    }))
+    for lines in pages:
+        page = writer.add_blank_page(612, 792)
+        operators = "".join(f"BT /F1 12 Tf 72 {700 - 20 * i} Td ({line}) Tj ET\n" for i, line in enumerate(lines))
+        content = DecodedStreamObject()
+        content.set_data(operators.encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+    writer.write(str(path))
+    return str(path)
+
+
+def test_page_lines_are_read_incrementally_and_kept(tmp_path):
+    path = write_text_pdf(tmp_path / "resume.pdf", [["Name: Jane Smith", "Phone: 555-0100"], ["Position: Cashier"]])
+    pdf = PdfContent(path, PdfTextLayerExtractor(), AcroFormExtractor())
+    assert pdf.page_lines(page_limit=1) == [["Name: Jane Smith", "Phone: 555-0100"]]
+    assert pdf.page_lines() == [["Name: Jane Smith", "Phone: 555-0100"], ["Position: Cashier"]]
+    # Pages already read survive close()
+    pdf.close()
+    assert pdf.page_lines(page_limit=1) == [["Name: Jane Smith", "Phone: 555-0100"]]
+
+
+def test_documents_over_the_page_limit_are_not_read(tmp_path):
+    path = write_text_pdf(tmp_path / "long.pdf", [["Name: Jane Smith"]] * 3)
+    text_layer = PdfTextLayerExtractor()
+    text_layer.max_pages = 2
+    assert PdfContent(path, text_layer, AcroFormExtractor()).page_lines() is None
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+import services.read_cache
+from services.read_cache import ReadThroughCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(services.read_cache, "time", clock)
+    return clock
+
+
+def make_cache(**kwargs):
+    options = {"ttl": 60, "negative_ttl": 10, "max_entries": 100}
+    options.update(kwargs)
+    return ReadThroughCache("test", **options)
+
+
+class Loader:
+    """Counts loads; each waits until released"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        return self.value
+
+
+def test_concurrent_misses_share_one_load(clock):
+    async def scenario():
+        cache = make_cache()
+        loader = Loader({"id": "c1"})
+        loader.release = asyncio.Event()
+        lookups = [asyncio.create_task(cache.get("c1", loader)) for _ in range(10)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        return cache, loader, await asyncio.gather(*lookups)
+
+    cache, loader, values = asyncio.run(scenario())
+    assert loader.calls == 1
+    assert values == [{"id": "c1"}] * 10
+    stats = cache.get_stats()
+    assert (stats["misses"], stats["coalesced"]) == (1, 9)
+
+
+def test_hits_until_the_ttl_expires(clock):
+    cache = make_cache()
+    loader = Loader({"id": "c1"})
+    asyncio.run(cache.get("c1", loader))
+    clock.now += 59
+    asyncio.run(cache.get("c1", loader))
+    assert loader.calls == 1
+    clock.now += 2
+    asyncio.run(cache.get("c1", loader))
+    assert loader.calls == 2
+    assert cache.get_stats()["hit_age_max"] == 59
+
+
+def test_missing_records_are_cached_for_the_negative_ttl(clock):
+    cache = make_cache()
+    loader = Loader(None)
+    assert asyncio.run(cache.get("nobody", loader)) is None
+    clock.now += 9
+    assert asyncio.run(cache.get("nobody", loader)) is None
+    assert loader.calls == 1
+    assert cache.get_stats()["negative_hits"] == 1
+    clock.now += 2
+    asyncio.run(cache.get("nobody", loader))
+    assert loader.calls == 2
+
+    uncached = make_cache(negative_ttl=0)
+    asyncio.run(uncached.get("nobody", loader))
+    asyncio.run(uncached.get("nobody", loader))
+    assert loader.calls == 4
+
+
+def test_invalidate_drops_the_entry(clock):
+    cache = make_cache()
+    loader = Loader({"id": "c1"})
+    asyncio.run(cache.get("c1", loader))
+    cache.invalidate("c1")
+    asyncio.run(cache.get("c1", loader))
+    assert loader.calls == 2
+    assert cache.get_stats()["invalidations"] == 1
+
+
+def test_load_overlapping_an_invalidation_is_not_cached(clock):
+    async def scenario():
+        cache = make_cache()
+        loader = Loader({"name": "old"})
+        loader.release = asyncio.Event()
+        lookup = asyncio.create_task(cache.get("c1", loader))
+        await asyncio.sleep(0)
+        # A write lands while the old record is being read
+        cache.invalidate("c1")
+        loader.release.set()
+        stale = await lookup
+        loader.value = {"name": "new"}
+        loader.release = None
+        return stale, await cache.get("c1", loader)
+
+    assert asyncio.run(scenario()) == ({"name": "old"}, {"name": "new"})
+
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached(clock):
+    async def scenario():
+        cache = make_cache()
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("query failed")
+
+        lookups = [asyncio.create_task(cache.get("c1", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*lookups, return_exceptions=True)
+        return cache, results
+
+    cache, results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = make_cache(max_entries=2)
+    for key in ("a", "b"):
+        asyncio.run(cache.get(key, Loader(key)))
+    asyncio.run(cache.get("a", Loader("unused")))
+    asyncio.run(cache.get("c", Loader("c")))
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.get_stats()["evictions"] == 1
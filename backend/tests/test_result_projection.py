@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import pytest
+
+import services.result_projection
+from services.result_projection import ResultProjection, KEY_VALUE_PATHS, PAGE_TEXT_PATHS
+
+ANALYZE_RESULT = {
+    "apiVersion": "2024-11-30",
+    "content": "Last Name Doe",
+    "pages": [{
+        "pageNumber": 1,
+        "width": 8.5,
+        "words": [{"content": "Last", "polygon": [0, 0, 1, 1]}],
+        "lines": [{"content": "Last Name Doe", "polygon": [0, 0, 4, 1], "spans": [{"offset": 0, "length": 13}]}]
+    }],
+    "keyValuePairs": [{"key": {"content": "Last Name", "spans": []}, "value": {"content": "Doe"}, "confidence": 0.9}],
+    "documents": [{"fields": {"LastName": {"content": "Doe", "confidence": 0.9}, "City": {"content": "Springfield"}}}]
+}
+
+PROJECTED = {
+    "pages": [{"pageNumber": 1, "lines": [{"content": "Last Name Doe"}]}],
+    "keyValuePairs": [{"key": {"content": "Last Name"}, "value": {"content": "Doe"}}],
+    "documents": [{"fields": {"LastName": {"content": "Doe"}, "City": {"content": "Springfield"}}}]
+}
+
+PROJECTION = ResultProjection(PAGE_TEXT_PATHS + KEY_VALUE_PATHS + ("documents.item.fields.*.content",))
+
+
+def test_apply_keeps_projected_paths_and_drops_the_rest():
+    assert PROJECTION.apply(ANALYZE_RESULT) == PROJECTED
+
+
+def test_allows_paths_on_the_way_to_a_projected_path():
+    assert PROJECTION.allows("pages")
+    assert PROJECTION.allows("pages.item.lines.item.content")
+    assert PROJECTION.allows("documents.item.fields.AnyName.content")
+    assert not PROJECTION.allows("pages.item.words")
+    assert not PROJECTION.allows("documents.item.fields.AnyName.confidence")
+
+
+def test_key_depends_only_on_the_set_of_paths():
+    assert ResultProjection(["b", "a", "a"]).key == ResultProjection(["a", "b"]).key
+    assert ResultProjection(["a"]).key != ResultProjection(["a", "b"]).key
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_parse_operation_materializes_only_projected_paths(monkeypatch, incremental):
+    if not incremental:
+        monkeypatch.setattr(services.result_projection, "IJSON_AVAILABLE", False)
+    body = json.dumps({"status": "succeeded", "analyzeResult": ANALYZE_RESULT}).encode("utf-8")
+
+    async def chunks():
+        for start in range(0, len(body), 64):
+            yield body[start:start + 64]
+
+    operation = asyncio.run(PROJECTION.parse_operation(chunks()))
+    assert operation == {"status": "succeeded", "analyzeResult": PROJECTED}
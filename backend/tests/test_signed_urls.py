@@ -0,0 +1,116 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import services.signed_urls as signed_urls
+from services.signed_urls import SignedUrlService
+
+# Azurite's well-known development account
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(signed_urls, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def signer(monkeypatch):
+    monkeypatch.setenv("AZURE_BLOB_CONNECTION_STRING", AZURITE_CONNECTION_STRING)
+    monkeypatch.setenv("AZURE_BLOB_CONTAINER_NAME", "documents")
+    return SignedUrlService()
+
+
+def test_urls_are_memoized_until_the_refresh_margin(signer, clock):
+    assert signer.mode == "account_key"
+    first = asyncio.run(signer.sign_blobs(["client1/doc1/i9 form.pdf", "client1/doc1/i9 form.pdf"]))
+    url = first["client1/doc1/i9 form.pdf"]
+    assert url.startswith("http://127.0.0.1:10000/devstoreaccount1/documents/client1/doc1/i9%20form.pdf?")
+    assert "sig=" in url and "sp=r" in url
+    assert signer.stats == {"signed": 1, "memo_hits": 0, "delegation_key_fetches": 0}
+
+    clock.now += signer.url_ttl - signer.refresh_margin - 1
+    assert asyncio.run(signer.sign_blobs(["client1/doc1/i9 form.pdf"])) == first
+    assert signer.stats["memo_hits"] == 1
+
+    # Too close to expiry to hand out again
+    clock.now += 2
+    resigned = asyncio.run(signer.sign_blobs(["client1/doc1/i9 form.pdf"]))
+    assert resigned["client1/doc1/i9 form.pdf"] != url
+    assert signer.stats["signed"] == 2
+
+
+def test_memo_is_bounded(signer, clock):
+    signer.max_entries = 2
+    asyncio.run(signer.sign_blobs(["a.pdf", "b.pdf", "c.pdf"]))
+    assert list(signer._urls) == ["b.pdf", "c.pdf"]
+
+
+def test_documents_get_signed_file_and_thumbnail_urls(signer, clock):
+    base_url = signer.base_url
+    documents = [
+        {"id": "doc1", "client_id": "client1", "blob_url": f"{base_url}/client1/doc1/i9.pdf",
+         "thumbnail_url": f"{base_url}/client1/doc1/thumbnail.png"},
+        # Stored before blob_url was recorded
+        {"id": "doc2", "client_id": "client1", "original_file_name": "w2.pdf"},
+        # Kept by the local store
+        {"id": "doc3", "client_id": "client1", "blob_url": "file:///tmp/doc3.pdf", "original_file_name": "doc3.pdf"}
+    ]
+    signed = asyncio.run(signer.sign_documents(documents))
+
+    assert signed[0]["file_url"].startswith(f"{base_url}/client1/doc1/i9.pdf?")
+    assert signed[0]["thumbnail_url"].startswith(f"{base_url}/client1/doc1/thumbnail.png?")
+    assert signed[1]["file_url"].startswith(f"{base_url}/client1/doc2/w2.pdf?")
+    assert "file_url" not in signed[2]
+    # The cached originals are left alone
+    assert "file_url" not in documents[0]
+    assert documents[0]["thumbnail_url"] == f"{base_url}/client1/doc1/thumbnail.png"
+
+
+def test_one_delegation_key_signs_every_batch(monkeypatch, clock):
+    # The key's expiry comes from the wall clock
+    clock.now = time.time()
+    monkeypatch.delenv("AZURE_BLOB_CONNECTION_STRING", raising=False)
+    monkeypatch.delenv("AZURE_STORAGE_CONNECTION_STRING", raising=False)
+    signer = SignedUrlService()
+    key_requests = []
+    signer.mode = "user_delegation"
+    signer._service_client = SimpleNamespace(
+        url="https://account.blob.core.windows.net/",
+        account_name="account",
+        get_user_delegation_key=lambda **kwargs: key_requests.append(kwargs) or "delegation key"
+    )
+    credentials = []
+
+    def generate_blob_sas(account_name, container_name, blob_name, **kwargs):
+        credentials.append(kwargs["user_delegation_key"])
+        return f"sig={blob_name}"
+    monkeypatch.setattr(signed_urls, "generate_blob_sas", generate_blob_sas)
+
+    for batch in (["a.pdf", "b.pdf"], ["c.pdf"], ["d.pdf", "a.pdf"]):
+        asyncio.run(signer.sign_blobs(batch))
+
+    assert signer.stats["delegation_key_fetches"] == 1
+    assert len(key_requests) == 1
+    assert credentials == ["delegation key"] * 4
+
+    # A new key is fetched only as the old one nears expiry
+    clock.now += signer.delegation_key_ttl - signer.refresh_margin + 1
+    asyncio.run(signer.sign_blobs(["e.pdf"]))
+    assert signer.stats["delegation_key_fetches"] == 2
@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+
+from services.extraction_cache import hash_bytes
+from services.storage_service import StorageService
+
+ACCOUNT_URL = "https://account.blob.core.windows.net"
+
+
+class FakeContainer:
+    """In-memory stand-in for the documents container: blob name -> (bytes, metadata)"""
+
+    def __init__(self):
+        self.blobs = {}
+        self.uploads = []
+
+    def upload_blob(self, name, data, overwrite=False, metadata=None, **kwargs):
+        content = data if isinstance(data, bytes) else data.read()
+        self.blobs[name] = (content, dict(metadata or {}))
+        self.uploads.append(name)
+
+    def get_blob_client(self, name):
+        def get_blob_properties():
+            if name not in self.blobs:
+                raise ResourceNotFoundError("The specified blob does not exist.")
+            return SimpleNamespace(metadata=self.blobs[name][1])
+        return SimpleNamespace(get_blob_properties=get_blob_properties)
+
+
+@pytest.fixture
+def service():
+    service = StorageService()
+    service.blob_configured = True
+    service.blob_dedup_enabled = True
+    service.thumbnail_renderer = SimpleNamespace(render=lambda file_path: asyncio.sleep(0))
+    service._blob_service_client = SimpleNamespace(url=ACCOUNT_URL, account_name="account")
+    service._blob_container_client = FakeContainer()
+    return service
+
+
+def upload(service, path, client_id, document_id):
+    report = {}
+    url = asyncio.run(service.save_document_file(str(path), client_id, document_id, report))
+    return url, report
+
+
+def test_same_bytes_for_a_client_are_linked_not_uploaded(service, tmp_path):
+    first = tmp_path / "i9.pdf"
+    first.write_bytes(b"%PDF-1.7 form")
+    again = tmp_path / "i9 (1).pdf"
+    again.write_bytes(b"%PDF-1.7 form")
+
+    url, _ = upload(service, first, "client1", "doc1")
+    linked_url, report = upload(service, again, "client1", "doc2")
+
+    assert url == linked_url == f"{ACCOUNT_URL}/documents/client1/doc1/i9.pdf"
+    container = service._blob_container_client
+    assert container.uploads == ["client1/doc1/i9.pdf", f"client1/_hashes/{hash_bytes(b'%PDF-1.7 form')}"]
+    assert container.blobs["client1/doc1/i9.pdf"][1] == {"content_sha256": hash_bytes(b"%PDF-1.7 form")}
+    assert report["thumbnail_url"] is None
+
+
+def test_other_clients_and_other_bytes_are_uploaded(service, tmp_path):
+    path = tmp_path / "i9.pdf"
+    path.write_bytes(b"%PDF-1.7 form")
+    upload(service, path, "client1", "doc1")
+    upload(service, path, "client2", "doc2")
+    path.write_bytes(b"%PDF-1.7 corrected form")
+    upload(service, path, "client1", "doc3")
+
+    uploaded = [name for name in service._blob_container_client.uploads if "/_hashes/" not in name]
+    assert uploaded == ["client1/doc1/i9.pdf", "client2/doc2/i9.pdf", "client1/doc3/i9.pdf"]
+
+
+def test_replaced_blob_is_not_linked(service, tmp_path):
+    path = tmp_path / "i9.pdf"
+    path.write_bytes(b"%PDF-1.7 form")
+    upload(service, path, "client1", "doc1")
+    # The indexed blob was overwritten with other content since
+    service._blob_container_client.upload_blob("client1/doc1/i9.pdf", b"other",
+                                               metadata={"content_sha256": hash_bytes(b"other")})
+
+    url, _ = upload(service, path, "client1", "doc2")
+    assert url == f"{ACCOUNT_URL}/documents/client1/doc2/i9.pdf"
+
+
+def test_dedup_can_be_turned_off(service, tmp_path):
+    service.blob_dedup_enabled = False
+    path = tmp_path / "i9.pdf"
+    path.write_bytes(b"%PDF-1.7 form")
+    upload(service, path, "client1", "doc1")
+    upload(service, path, "client1", "doc2")
+    assert service._blob_container_client.uploads == ["client1/doc1/i9.pdf", "client1/doc2/i9.pdf"]
@@ -0,0 +1,96 @@
+import asyncio
+
+from services.submission_scheduler import FairQueue, SubmissionScheduler, set_submitter
+
+
+def drain(queue: FairQueue):
+    return [queue.get_nowait() for _ in range(queue.qsize())]
+
+
+def test_interactive_items_are_taken_before_bulk_with_a_bulk_share():
+    async def scenario():
+        queue = FairQueue(key=lambda item: ("coach1", item[0]))
+        queue.bulk_every = 3
+        for index in range(3):
+            queue.put_nowait(("bulk", index))
+        for index in range(4):
+            queue.put_nowait(("interactive", index))
+        return drain(queue)
+
+    order = asyncio.run(scenario())
+    assert order == [
+        ("interactive", 0), ("interactive", 1), ("bulk", 0),
+        ("interactive", 2), ("interactive", 3), ("bulk", 1), ("bulk", 2)
+    ]
+
+
+def test_coaches_take_turns_within_a_class():
+    async def scenario():
+        queue = FairQueue(key=lambda item: (item[0], "bulk"))
+        for index in range(3):
+            queue.put_nowait(("coach1", index))
+        queue.put_nowait(("coach2", 0))
+        queue.put_nowait(("coach3", 0))
+        return drain(queue)
+
+    order = asyncio.run(scenario())
+    assert order == [("coach1", 0), ("coach2", 0), ("coach3", 0), ("coach1", 1), ("coach1", 2)]
+
+
+def test_bounded_like_asyncio_queue():
+    async def scenario():
+        queue = FairQueue(2, key=lambda item: item)
+        queue.put_nowait(("coach1", "interactive"))
+        queue.put_nowait(("coach1", "bulk"))
+        try:
+            queue.put_nowait(("coach2", "interactive"))
+        except asyncio.QueueFull:
+            full = True
+        else:
+            full = False
+        waiter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        return full, queue.sizes(), await waiter
+
+    full, sizes, first = asyncio.run(scenario())
+    assert full
+    assert sizes == {"interactive": 0, "bulk": 1}
+    assert first == ("coach1", "interactive")
+
+
+def test_cancelled_waiters_leave_the_queue():
+    async def scenario():
+        scheduler = SubmissionScheduler()
+        scheduler.max_concurrency = 1
+        scheduler.max_tps = 0
+        release = asyncio.Event()
+        granted = []
+
+        async def analyze(coach_id):
+            set_submitter(coach_id, "bulk")
+            async with scheduler.slot():
+                granted.append(coach_id)
+                await release.wait()
+
+        holder = asyncio.create_task(analyze("coach1"))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(analyze(coach_id)) for coach_id in ("coach2", "coach2", "coach3")]
+        await asyncio.sleep(0)
+        queued = scheduler.get_stats()["bulk"]["waiting"]
+
+        waiters[0].cancel()
+        waiters[2].cancel()
+        await asyncio.gather(*waiters[::2], return_exceptions=True)
+        stats = scheduler.get_stats()
+        coaches = list(scheduler._waiting["bulk"])
+
+        release.set()
+        await asyncio.gather(holder, waiters[1])
+        return queued, stats, coaches, granted
+
+    queued, stats, coaches, granted = asyncio.run(scenario())
+    assert queued == 3
+    assert stats["bulk"]["waiting"] == 1
+    assert stats["active"] == 1
+    assert coaches == ["coach2"]
+    assert granted == ["coach1", "coach2"]
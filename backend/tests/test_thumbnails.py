@@ -0,0 +1,54 @@
+import asyncio
+import os
+
+from PIL import Image
+
+import services.thumbnails
+from services.thumbnails import THUMBNAIL_NAME, ThumbnailRenderer, render_thumbnail
+
+
+def test_image_preview_is_a_small_jpeg(tmp_path):
+    source = tmp_path / "photo.png"
+    Image.new("RGB", (1200, 900), "white").save(source)
+    output = tmp_path / "photo.jpg"
+
+    assert render_thumbnail(str(source), str(output), 256, 70)
+    with Image.open(output) as preview:
+        assert preview.format == "JPEG"
+        assert preview.size == (256, 192)
+
+
+def test_photo_preview_follows_exif_orientation(tmp_path):
+    source = tmp_path / "portrait.jpg"
+    exif = Image.Exif()
+    # Orientation 6: the camera was turned, the stored pixels are landscape
+    exif[0x0112] = 6
+    Image.new("RGB", (400, 300), "white").save(source, exif=exif)
+    output = tmp_path / "portrait_preview.jpg"
+
+    assert render_thumbnail(str(source), str(output), 200, 70)
+    with Image.open(output) as preview:
+        assert preview.size == (150, 200)
+
+
+def test_scanned_pdf_preview_without_pdfium(tmp_path, monkeypatch):
+    monkeypatch.setattr(services.thumbnails, "PDFIUM_AVAILABLE", False)
+    source = tmp_path / "scan.pdf"
+    Image.new("L", (850, 1100), 200).save(source, "PDF")
+    output = tmp_path / "scan.jpg"
+
+    assert render_thumbnail(str(source), str(output), 128, 70)
+    with Image.open(output) as preview:
+        assert max(preview.size) == 128
+
+
+def test_renderer_returns_none_for_documents_it_cannot_preview(tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_text("not an image")
+    renderer = ThumbnailRenderer()
+    renderer.enabled = True
+    try:
+        assert asyncio.run(renderer.render(str(source))) is None
+    finally:
+        renderer.close()
+    assert not os.path.exists(f"{source}{THUMBNAIL_NAME}")
@@ -316,6 +316,8 @@ const DocumentProcessor = () => {
       formData.append('file', file);
       formData.append('document_type', documentType);
       formData.append('client_id', selectedClient.id);
+      // Hold the request until the background job finishes
+      formData.append('wait', 'true');
       
       const response = await axios.post(
         `${apiConfig.baseUrl}${apiConfig.endpoints.documents}/process`,
@@ -0,0 +1,170 @@
+"""Benchmark form extraction on large synthetic analyzeResult payloads.
+
+Compares the form-schema engine against the previous per-field approach
+(string += concatenation and one re.search per field pattern), both for the
+whole extraction and for the text field search alone (one re.search per
+field against the schema's single-pass scan), and the compact columnar
+tables against the previous one-dict-per-cell tables.
+
+Usage:
+    python scripts/benchmark_extraction.py [pages ...]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from services.form_schemas import get_form_schema, extract_with_schema, extract_tables, document_text  # noqa: E402
+
+WORDS = ["employment", "eligibility", "verification", "section", "employee", "information",
+         "attestation", "document", "signature", "date", "employer", "review", "Name", "Number"]
+
+
+def make_result(pages: int, lines_per_page: int = 50, pairs: int = 200) -> dict:
+    """Build a synthetic analyzeResult with the I-9 section 1 on the last page"""
+    rng = random.Random(pages)
+    result_pages = []
+    for page_number in range(1, pages + 1):
+        lines = [{"content": " ".join(rng.choice(WORDS) for _ in range(10))} for _ in range(lines_per_page)]
+        result_pages.append({"pageNumber": page_number, "lines": lines})
+    result_pages[-1]["lines"] += [
+        {"content": "Last Name Doe First Name John Middle Initial Q"},
+        {"content": "Address 123 Main St Apt. Number 4 City Springfield State IL ZIP Code 62701"},
+        {"content": "Social Security Number 123-45-6789 E-mail Address john@example.com"},
+        {"content": "Telephone Number (555) 123-4567"},
+    ]
+    return {
+        "pages": result_pages,
+        "keyValuePairs": [
+            {"key": {"content": f"Field {i}"}, "value": {"content": f"value {i}"}} for i in range(pairs)
+        ],
+        "tables": [
+            {"cells": [{"rowIndex": r, "columnIndex": c, "content": f"{r}:{c}"} for r in range(20) for c in range(5)]}
+        ],
+    }
+
+
+def legacy_patterns() -> dict:
+    return {
+        field: r"%s.{0,50}?(%s)" % (re.escape(label), value)
+        for field, (label, value) in get_form_schema("i9").text_fields.items()
+    }
+
+
+def legacy_search(field_patterns: dict, text: str) -> dict:
+    """One re.search per field, as the extraction loop previously did"""
+    fields = {}
+    for field, pattern in field_patterns.items():
+        match = re.search(pattern, text)
+        if match:
+            fields[field] = match.group(1).strip()
+    return fields
+
+
+def legacy_extract(result: dict) -> dict:
+    """The extraction loop previously inlined in _process_i9_form"""
+    field_patterns = legacy_patterns()
+    extracted = {"fields_detected": 0, "fields": {}, "tables": []}
+    all_text = ""
+    for page in result["pages"]:
+        for line in page["lines"]:
+            all_text += line["content"] + "\n"
+    for field, pattern in field_patterns.items():
+        match = re.search(pattern, all_text)
+        if match:
+            extracted["fields"][field] = match.group(1).strip()
+            extracted["fields_detected"] += 1
+    for table in result["tables"]:
+        extracted["tables"].append([
+            {"row_index": cell["rowIndex"], "column_index": cell["columnIndex"], "content": cell["content"]}
+            for cell in table["cells"]
+        ])
+    for pair in result["keyValuePairs"]:
+        key = pair["key"]["content"].strip().replace(" ", "_").lower()
+        if key and pair["value"]["content"]:
+            extracted["fields"][key] = pair["value"]["content"].strip()
+            extracted["fields_detected"] += 1
+    return extracted
+
+
+def make_tables(tables: int, rows: int = 200, columns: int = 8) -> dict:
+    """Build a synthetic analyzeResult with timesheet-like tables"""
+    return {
+        "tables": [
+            {
+                "rowCount": rows,
+                "columnCount": columns,
+                "cells": [
+                    {"rowIndex": r, "columnIndex": c, "content": f"{r * c % 97}.00"}
+                    for r in range(rows) for c in range(columns)
+                ]
+            }
+            for _ in range(tables)
+        ]
+    }
+
+
+def legacy_tables(result: dict) -> list:
+    """The one-dict-per-cell table layout previously produced for the I-9"""
+    return [
+        [
+            {"row_index": cell["rowIndex"], "column_index": cell["columnIndex"], "content": cell["content"]}
+            for cell in table["cells"]
+        ]
+        for table in result["tables"]
+    ]
+
+
+def peak_memory_kb(func, *args) -> float:
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def best_of(func, *args, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    page_counts = [int(arg) for arg in sys.argv[1:]] or [10, 100, 500]
+    i9 = get_form_schema("i9")
+    generic = get_form_schema("generic")
+
+    print(f"{'pages':>6} {'legacy i9 ms':>14} {'schema i9 ms':>14} {'schema generic ms':>18} "
+          f"{'legacy search ms':>17} {'scan ms':>8}")
+    for pages in page_counts:
+        result = make_result(pages)
+        assert legacy_extract(result)["fields"] == extract_with_schema(i9, result)["fields"]
+        text = document_text(result["pages"])
+        field_patterns = legacy_patterns()
+        assert legacy_search(field_patterns, text) == i9.scan(text)
+        print(f"{pages:>6} {best_of(legacy_extract, result):>14.2f} "
+              f"{best_of(extract_with_schema, i9, result):>14.2f} "
+              f"{best_of(extract_with_schema, generic, result):>18.2f} "
+              f"{best_of(legacy_search, field_patterns, text):>17.2f} "
+              f"{best_of(i9.scan, text):>8.2f}")
+
+    print()
+    print(f"{'tables':>6} {'legacy KB json':>15} {'compact KB json':>16} {'legacy KB peak':>15} {'compact KB peak':>16}")
+    for tables in (1, 10, 50):
+        result = make_tables(tables)
+        legacy_size = len(json.dumps(legacy_tables(result))) / 1024
+        compact_size = len(json.dumps(extract_tables(result))) / 1024
+        print(f"{tables:>6} {legacy_size:>15.1f} {compact_size:>16.1f} "
+              f"{peak_memory_kb(legacy_tables, result):>15.1f} {peak_memory_kb(extract_tables, result):>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Exercise document file uploads against Azurite (or any storage account).
+
+Uploads a generated file with several block concurrencies and timings,
+then uploads the same bytes again for the same client and checks that the
+existing blob is linked instead of being uploaded a second time.
+
+Start Azurite first, e.g.:
+    azurite-blob --location /tmp/azurite
+
+Usage:
+    python scripts/check_blob_uploads.py [size_mb]
+
+The connection string defaults to Azurite's (UseDevelopmentStorage=true);
+set AZURE_BLOB_CONNECTION_STRING to use another account.
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+os.environ.setdefault("AZURE_BLOB_CONNECTION_STRING", "UseDevelopmentStorage=true")
+os.environ.setdefault("AZURE_BLOB_CONTAINER_NAME", "upload-check")
+os.environ.setdefault("THUMBNAIL_ENABLED", "false")
+
+from services.storage_service import StorageService  # noqa: E402
+
+
+async def main(size_mb: int) -> None:
+    storage = StorageService()
+    if not storage.blob_configured:
+        sys.exit("Blob Storage is not configured (is the azure-storage-blob package installed?)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "document.bin")
+        with open(file_path, "wb") as f:
+            f.write(os.urandom(size_mb * 1024 * 1024))
+
+        client_id = f"check-{uuid.uuid4().hex[:8]}"
+        storage.blob_dedup_enabled = False
+        for concurrency in (1, 4, 8):
+            storage.blob_max_concurrency = concurrency
+            start = time.perf_counter()
+            await storage.save_document_file(file_path, client_id, str(uuid.uuid4()))
+            print(f"{size_mb} MB, max_concurrency={concurrency}: {time.perf_counter() - start:.2f}s")
+
+        storage.blob_dedup_enabled = True
+        first = await storage.save_document_file(file_path, client_id, "first")
+        start = time.perf_counter()
+        second = await storage.save_document_file(file_path, client_id, "second")
+        print(f"Re-upload of identical bytes: {time.perf_counter() - start:.2f}s")
+        assert second == first, f"expected {first} to be linked, got {second}"
+        print(f"Linked to existing blob: {second}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 32))
@@ -0,0 +1,114 @@
+"""Load-test the local SQLite storage backend at full volume on one machine.
+
+Seeds a database with generated clients and documents, then runs
+concurrent first-page, deep-page, document-type and point-read lookups
+(the queries behind /documents/{client_id} and
+/documents/{client_id}/{document_id}) and prints latency percentiles
+and throughput.
+
+Usage:
+    python scripts/load_test_local_store.py [clients] [documents_per_client] [concurrency]
+
+The database is written to a temporary directory unless LOCAL_STORAGE_PATH
+is set, in which case an existing database there is reused as is.
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from services.local_store import LocalStore  # noqa: E402
+
+DOCUMENT_TYPES = ["i9", "schedule_a", "resume", "id_card", "pay_stub"]
+
+
+async def seed(store: LocalStore, clients: int, documents_per_client: int) -> None:
+    start = time.perf_counter()
+    began = datetime(2023, 1, 1)
+    for c in range(clients):
+        client_id = f"client{c}"
+        await store.upsert_client({"id": client_id, "name": f"Client {c}"})
+        for d in range(documents_per_client):
+            await store.upsert_document({
+                "id": str(uuid.uuid4()),
+                "client_id": client_id,
+                "document_type": random.choice(DOCUMENT_TYPES),
+                "original_file_name": f"document{d}.pdf",
+                "processed_at": (began + timedelta(minutes=random.randrange(500000))).isoformat(),
+                "data": {"field": "x" * 200}
+            })
+    total = clients * documents_per_client
+    elapsed = time.perf_counter() - start
+    print(f"Seeded {clients} clients, {total} documents in {elapsed:.1f}s ({total / elapsed:.0f} writes/s)")
+
+
+async def measure(name: str, lookup, concurrency: int, requests: int) -> None:
+    latencies = []
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            start = time.perf_counter()
+            await lookup()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"{name:<28} p50 {p50:6.2f} ms  p95 {p95:6.2f} ms  {len(latencies) / elapsed:8.0f} req/s")
+
+
+async def deep_page(store: LocalStore, tokens):
+    client_id, token = random.choice(tokens)
+    return await store.get_client_documents_page(client_id, 50, token)
+
+
+async def main(clients: int, documents_per_client: int, concurrency: int) -> None:
+    path = os.getenv("LOCAL_STORAGE_PATH")
+    directory = None
+    if not path:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "storage.db")
+    store = LocalStore(path=path, files_dir=os.path.join(os.path.dirname(path), "files"))
+
+    try:
+        existing, _ = await store.list_clients_page(1)
+        if not existing:
+            await seed(store, clients, documents_per_client)
+        client_ids = [client["id"] for client in await store.list_clients()]
+
+        # A cursor part way through each client's documents
+        deep_tokens = {}
+        for client_id in client_ids[:20]:
+            token = None
+            for _ in range(5):
+                _, token = await store.get_client_documents_page(client_id, 50, token)
+            deep_tokens[client_id] = token
+        sample = [(client_id, document["id"]) for client_id in client_ids[:20]
+                  for document in (await store.get_client_documents_page(client_id, 20))[0]]
+
+        requests = concurrency * 50
+        await measure("first page (50)", lambda: store.get_client_documents_page(
+            random.choice(client_ids), 50), concurrency, requests)
+        await measure("page 6 (50)", lambda: deep_page(store, list(deep_tokens.items())), concurrency, requests)
+        await measure("first page by type (50)", lambda: store.get_client_documents_page(
+            random.choice(client_ids), 50, None, random.choice(DOCUMENT_TYPES)), concurrency, requests)
+        await measure("point read", lambda: store.get_document(*random.choice(sample)), concurrency, requests)
+    finally:
+        await store.close()
+        if directory is not None:
+            directory.cleanup()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    defaults = [100, 1000, 32]
+    asyncio.run(main(*(args + defaults[len(args):])))